@@ -1,18 +1,15 @@
 import streamlit as st
 import pandas as pd
 import os
-from glob import glob
 import datetime as dt
 import traceback
 
-# ==============================
-# 유틸: 컬럼 자동 탐지 함수
-# ==============================
-def find_column(df, target_names):
-    for col in df.columns:
-        if col.strip().lower() in [name.lower() for name in target_names]:
-            return col
-    return None
+from derived_features import expand_derived_calls
+from condition_index import load_condition_index
+from feature_loader import load_features, list_feature_codes, strategy_columns
+from feature_registry import load_feature_registry
+from market_hold import load_market_hold
+from point_in_time import PointInTime
 
 # ==============================
 # 종목 코드 → 회사명 매핑
@@ -79,8 +76,7 @@ interval_days_map = {
 eval_cycle = st.selectbox("Evaluation Interval", list(interval_days_map.keys()))
 eval_days = interval_days_map[eval_cycle]
 
-file_paths = sorted(glob(os.path.join(DATA_FOLDER, "*_features.csv")))
-stock_codes = [os.path.basename(p).split("_")[0] for p in file_paths]
+stock_codes = list_feature_codes(DATA_FOLDER)
 stock_names = [f"{CODE_TO_NAME.get(code, code)} ({code})" for code in stock_codes]
 selected_stocks = st.multiselect("Select Stocks", options=stock_names)
 selected_codes = [name.split("(")[-1][:-1] for name in selected_stocks]
@@ -102,18 +98,21 @@ for i in range(num_conditions):
     cond = cols[0].text_input(f"Condition {i+1}", key=f"cond_{i}", placeholder="Example: sma20 > sma60")
     required = cols[1].checkbox("Required", key=f"req_{i}")
     if cond.strip():
-        conditions.append(cond.strip())
+        conditions.append(expand_derived_calls(cond.strip()))
         required_flags.append(required)
 
 max_stock_count = st.number_input("Max Number of Stocks to Hold", min_value=1, max_value=10, value=3, step=1)
 
 if selected_codes:
-    try:
-        df_sample = pd.read_csv(os.path.join(DATA_FOLDER, f"{selected_codes[0]}_features.csv"))
+    # 컬럼 정보는 파일 헤더/캐시 메타데이터만으로 조회 (row 데이터를 읽지 않음)
+    feature_registry = load_feature_registry(DATA_FOLDER)
+    if selected_codes[0] in feature_registry.codes:
         with st.expander("Available Features"):
-            st.write(", ".join(df_sample.columns))
-    except Exception as e:
-        st.warning(f"Error loading file: {e}")
+            st.write(", ".join(feature_registry.columns(selected_codes[0])))
+    else:
+        st.warning(f"Error loading file: {selected_codes[0]}_features.csv")
+    for message in feature_registry.validate(conditions + [market_hold_condition], selected_codes):
+        st.warning(f"조건 확인: {message}")
 
 if st.button("Run Analysis"):
     if not selected_codes or not conditions:
@@ -126,6 +125,19 @@ if st.button("Run Analysis"):
             date_ranges.append((current_start, current_end))
             current_start = current_end + dt.timedelta(days=1)
 
+        # 분석 종료일까지 읽기 (사이클 직전 종가는 거래정지·상장 직후에도 찾을 수 있게 첫 행부터)
+        # 조건식이 참조하는 컬럼과 OHLC 만 읽기
+        strategy_cols = strategy_columns(conditions)
+        market_cols = strategy_columns([market_hold_condition])
+
+        # 조건식 비트셋 색인 (numpy 로 계산할 수 없는 조건식이 있으면 None → 종목별 query 로 평가)
+        try:
+            condition_index = load_condition_index(conditions, DATA_FOLDER, selected_codes, columns=strategy_cols)
+        except Exception:
+            condition_index = None  # 읽을 수 없는 종목은 종목별 평가에서 오류를 보여준다
+        required_conditions = [cond for cond, req in zip(conditions, required_flags) if req]
+        optional_conditions = [cond for cond, req in zip(conditions, required_flags) if not req]
+
         all_results = []
         equity_curve = []
         cycle_returns = []
@@ -142,13 +154,13 @@ if st.button("Run Analysis"):
             if market_hold_condition.strip():
                 try:
                     sample_code = selected_codes[0]
-                    df_sample = pd.read_csv(os.path.join(DATA_FOLDER, f"{sample_code}_features.csv"))
-                    date_col = find_column(df_sample, ['date', 'Date', '날짜'])
-                    df_sample[date_col] = pd.to_datetime(df_sample[date_col])
-                    df_cycle_sample = df_sample[(df_sample[date_col] >= pd.to_datetime(d_start)) & (df_sample[date_col] <= pd.to_datetime(d_end))].copy()
+                    # 첫 종목 전체 이력에 대해 한 번만 계산해 둔 시장 보유 여부
+                    hold = load_market_hold(market_hold_condition, sample_code, DATA_FOLDER, columns=market_cols, prefix="")
+                    date_col = "date"
+                    sample_pit = PointInTime(hold.df)
+                    df_cycle_sample = sample_pit.window(d_start, d_end)
                     if len(df_cycle_sample) > 0:
-                        local_dict = {col: df_cycle_sample.iloc[0][col] for col in df_cycle_sample.columns}
-                        market_hold = eval(market_hold_condition, {}, local_dict)
+                        market_hold = hold.at(df_cycle_sample.iloc[:1])
                 except Exception as e:
                     st.warning(f"Market hold condition error: {e}")
                     market_hold = False
@@ -159,17 +171,26 @@ if st.button("Run Analysis"):
                 cycle_returns.append(0.0)
                 continue
 
+            # 사이클 기간에 한 행이라도 조건을 만족한 종목과 선택 조건 만족 개수 (색인이 있으면 종목별 query 대신)
+            candidates = None
+            if condition_index is not None:
+                candidates = dict(condition_index.select_between(d_start, d_end, required_conditions, optional_conditions))
+
             for code in selected_codes:
                 try:
-                    df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                    date_col = find_column(df, ['date', 'Date', '날짜'])
-                    df[date_col] = pd.to_datetime(df[date_col])
-                    
-                    df_cycle = df[(df[date_col] >= pd.to_datetime(d_start)) & (df[date_col] <= pd.to_datetime(d_end))].copy()
+                    df = load_features(code, DATA_FOLDER, end=end_date, columns=strategy_cols)
+                    date_col = "date"
+                    pit = PointInTime(df)
 
-                    required_satisfied = True
-                    for cond, req in zip(conditions, required_flags):
-                        if req:
+                    df_cycle = pit.window(d_start, d_end)
+
+                    if candidates is not None:
+                        if code not in candidates:
+                            continue
+                        satisfied_count = candidates[code] if optional_conditions else 100
+                    else:
+                        required_satisfied = True
+                        for cond in required_conditions:
                             try:
                                 if len(df_cycle.query(cond)) == 0:
                                     required_satisfied = False
@@ -177,31 +198,28 @@ if st.button("Run Analysis"):
                             except Exception:
                                 required_satisfied = False
                                 break
-                    if not required_satisfied:
-                        continue
+                        if not required_satisfied:
+                            continue
 
-                    satisfied_count = 0
-                    non_required_conditions = [(cond, req) for cond, req in zip(conditions, required_flags) if not req]
-                    if len(non_required_conditions) == 0:
-                        satisfied_count = 100
-                    else:
-                        for cond, req in non_required_conditions:
-                            try:
-                                if len(df_cycle.query(cond)) > 0:
-                                    satisfied_count += 1
-                            except Exception:
-                                pass
+                        satisfied_count = 0
+                        if len(optional_conditions) == 0:
+                            satisfied_count = 100
+                        else:
+                            for cond in optional_conditions:
+                                try:
+                                    if len(df_cycle.query(cond)) > 0:
+                                        satisfied_count += 1
+                                except Exception:
+                                    pass
 
-                    df_sorted = df_cycle.sort_values(by=date_col)
-                    if len(df_sorted) >= 1:
-                        start_price = df_sorted.iloc[0]["close"]
-                        if len(df_sorted) >= 2:
-                            end_price = df_sorted.iloc[-1]["close"]
+                    if len(df_cycle) >= 1:
+                        start_price = df_cycle.iloc[0]["close"]
+                        if len(df_cycle) >= 2:
+                            end_price = df_cycle.iloc[-1]["close"]
                         else:
-                            df_before_cycle = df[df[date_col] < pd.to_datetime(d_start)].copy()
+                            df_before_cycle = pit.asof(d_start, inclusive=False)
                             if len(df_before_cycle) > 0:
-                                df_before_sorted = df_before_cycle.sort_values(by=date_col)
-                                end_price = df_before_sorted.iloc[-1]["close"]
+                                end_price = df_before_cycle.iloc[-1]["close"]
                             else:
                                 end_price = start_price
                         prices[code] = {
@@ -316,21 +334,19 @@ if st.button("Run Analysis"):
                 # 각 종목의 가격 정보 수집
                 for code in selected_codes:
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        df[date_col] = pd.to_datetime(df[date_col])
-                        df_cycle = df[(df[date_col] >= pd.to_datetime(d_start)) & (df[date_col] <= pd.to_datetime(d_end))]
-                        df_sorted = df_cycle.sort_values(by=date_col)
+                        df = load_features(code, DATA_FOLDER, end=end_date, columns=strategy_cols)
+                        date_col = "date"
+                        pit = PointInTime(df)
+                        df_cycle = pit.window(d_start, d_end)
                         
-                        if len(df_sorted) >= 1:
-                            start_price = df_sorted.iloc[0]["close"]
-                            if len(df_sorted) >= 2:
-                                end_price = df_sorted.iloc[-1]["close"]
+                        if len(df_cycle) >= 1:
+                            start_price = df_cycle.iloc[0]["close"]
+                            if len(df_cycle) >= 2:
+                                end_price = df_cycle.iloc[-1]["close"]
                             else:
-                                df_before_cycle = df[df[date_col] < pd.to_datetime(d_start)]
+                                df_before_cycle = pit.asof(d_start, inclusive=False)
                                 if len(df_before_cycle) > 0:
-                                    df_before_sorted = df_before_cycle.sort_values(by=date_col)
-                                    end_price = df_before_sorted.iloc[-1]["close"]
+                                    end_price = df_before_cycle.iloc[-1]["close"]
                                 else:
                                     end_price = start_price
                             cycle_prices[code] = {"start": start_price, "end": end_price}
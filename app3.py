@@ -1,18 +1,15 @@
 import streamlit as st
 import pandas as pd
 import os
-from glob import glob
 import datetime as dt
 import traceback
 
-# ==============================
-# 유틸: 컬럼 자동 탐지 함수
-# ==============================
-def find_column(df, target_names):
-    for col in df.columns:
-        if col.strip().lower() in [name.lower() for name in target_names]:
-            return col
-    return None
+from derived_features import expand_derived_calls
+from condition_index import load_condition_index
+from feature_loader import load_features, list_feature_codes, strategy_columns, condition_selectivity, order_by_selectivity, KODEX_CODE
+from feature_registry import load_feature_registry
+from market_hold import load_market_hold
+from point_in_time import PointInTime
 
 # ==============================
 # 종목 코드 → 회사명 매핑
@@ -79,8 +76,7 @@ interval_days_map = {
 eval_cycle = st.selectbox("Evaluation Interval", list(interval_days_map.keys()))
 eval_days = interval_days_map[eval_cycle]
 
-file_paths = sorted(glob(os.path.join(DATA_FOLDER, "*_features.csv")))
-stock_codes = [os.path.basename(p).split("_")[0] for p in file_paths]
+stock_codes = list_feature_codes(DATA_FOLDER)
 stock_names = [f"{CODE_TO_NAME.get(code, code)} ({code})" for code in stock_codes]
 selected_stocks = st.multiselect("Select Stocks", options=stock_names)
 selected_codes = [name.split("(")[-1][:-1] for name in selected_stocks]
@@ -107,14 +103,16 @@ else:
     market_hold_condition = ""
 
 # KODEX 200 사용 가능한 변수들 표시
-try:
-    df_kodex_sample = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
+kodex_registry = load_feature_registry(DATA_FOLDER)
+if KODEX_CODE in kodex_registry.codes:
     with st.expander("Available KODEX 200 Features (use with 'kodex_' prefix)"):
-        kodex_features = [f"kodex_{col}" for col in df_kodex_sample.columns]
+        kodex_features = [f"kodex_{col}" for col in kodex_registry.columns(KODEX_CODE)]
         st.write(", ".join(kodex_features))
         st.info("💡 **Note**: Use 'kodex_' prefix for KODEX 200 variables in Market Hold Condition")
-except Exception as e:
-    st.warning(f"Error loading KODEX 200 file: {e}")
+    for message in kodex_registry.validate([market_hold_condition], [KODEX_CODE], prefix="kodex_"):
+        st.warning(f"Market Hold 조건 확인: {message}")
+else:
+    st.warning(f"Error loading KODEX 200 file: {KODEX_CODE}_features.csv")
 
 st.subheader("Strategy Conditions")
 conditions = []
@@ -126,7 +124,7 @@ for i in range(num_conditions):
     cond = cols[0].text_input(f"Condition {i+1}", key=f"cond_{i}", placeholder="Example: sma20 > sma60")
     required = cols[1].checkbox("Required", key=f"req_{i}")
     if cond.strip():
-        conditions.append(cond.strip())
+        conditions.append(expand_derived_calls(cond.strip()))
         required_flags.append(required)
 
 max_stock_count = st.number_input("Max Number of Stocks to Hold", min_value=1, max_value=10, value=3, step=1)
@@ -147,12 +145,15 @@ else:
     st.info("💡 **Note**: 선택 조건이 없으므로 모든 종목이 보유 대상입니다.")
 
 if selected_codes:
-    try:
-        df_sample = pd.read_csv(os.path.join(DATA_FOLDER, f"{selected_codes[0]}_features.csv"))
+    # 컬럼 정보는 파일 헤더/캐시 메타데이터만으로 조회 (row 데이터를 읽지 않음)
+    feature_registry = load_feature_registry(DATA_FOLDER)
+    if selected_codes[0] in feature_registry.codes:
         with st.expander("Available Features"):
-            st.write(", ".join(df_sample.columns))
-    except Exception as e:
-        st.warning(f"Error loading file: {e}")
+            st.write(", ".join(feature_registry.columns(selected_codes[0])))
+    else:
+        st.warning(f"Error loading file: {selected_codes[0]}_features.csv")
+    for message in feature_registry.validate(conditions, selected_codes):
+        st.warning(f"조건 확인: {message}")
 
 if st.button("Run Analysis"):
     if not selected_codes or not conditions:
@@ -165,6 +166,23 @@ if st.button("Run Analysis"):
             date_ranges.append((current_start, current_end))
             current_start = current_end + dt.timedelta(days=1)
 
+        # 조건식이 참조하는 컬럼과 OHLC 만 읽기 (KODEX 200 은 kodex_ 접두어 기준)
+        strategy_cols = strategy_columns(conditions)
+        kodex_cols = strategy_columns([market_hold_condition], prefix="kodex_")
+
+        # 조건식 비트셋 색인 (numpy 로 계산할 수 없는 조건식이 있으면 None → 종목별 query 로 평가)
+        try:
+            condition_index = load_condition_index(conditions, DATA_FOLDER, selected_codes, columns=strategy_cols)
+        except Exception:
+            condition_index = None  # 읽을 수 없는 종목은 종목별 평가에서 오류를 보여준다
+        required_conditions = [cond for cond, req in zip(conditions, required_flags) if req]
+        optional_conditions = [cond for cond, req in zip(conditions, required_flags) if not req]
+        if condition_index is None:
+            # 필수 조건은 많이 걸러내는 것부터 평가하고, 선택 조건은 필수 조건을 모두 통과한 종목만 센다
+            # (통과율은 종목/행 표본으로만 추정 - 종목별 평가는 전체 이력 마스크를 쓰지 않는다)
+            selectivity = condition_selectivity(selected_codes, conditions, DATA_FOLDER, columns=strategy_cols)
+            required_conditions = order_by_selectivity(required_conditions, selectivity)
+
         equity_curve = []
         cycle_returns = []
         portfolio_value = 100000000
@@ -179,43 +197,30 @@ if st.button("Run Analysis"):
             market_hold = False
             if market_hold_condition.strip():
                 try:
-                    df_kodex = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
-                    date_col = find_column(df_kodex, ['date', 'Date', '날짜'])
-                    df_kodex[date_col] = pd.to_datetime(df_kodex[date_col])
+                    # KODEX 200 전체 이력에 대해 한 번만 계산해 둔 시장 보유 여부
+                    hold = load_market_hold(market_hold_condition, KODEX_CODE, DATA_FOLDER, columns=kodex_cols)
+                    date_col = "date"
+                    kodex_pit = PointInTime(hold.df)
                     
                     # 이전 사이클의 KODEX 200 데이터 사용
                     if i > 0:  # 첫 번째 사이클이 아닌 경우
                         prev_end = date_ranges[i-1][1]  # 이전 사이클 종료일
-                        df_prev_kodex = df_kodex[df_kodex[date_col] == pd.to_datetime(prev_end)].copy()
+                        df_prev_kodex = kodex_pit.on(prev_end)
                         if len(df_prev_kodex) == 0:
                             # 이전 사이클 종료일 데이터가 없으면 이전 사이클 기간의 마지막 데이터 사용
                             prev_start = date_ranges[i-1][0]
-                            df_prev_cycle_kodex = df_kodex[(df_kodex[date_col] >= pd.to_datetime(prev_start)) & (df_kodex[date_col] <= pd.to_datetime(prev_end))].copy()
-                            if len(df_prev_cycle_kodex) > 0:
-                                df_prev_sorted_kodex = df_prev_cycle_kodex.sort_values(by=date_col)
-                                df_prev_kodex = df_prev_sorted_kodex.iloc[-1:].copy()
+                            df_prev_kodex = kodex_pit.window(prev_start, prev_end).iloc[-1:]
                     else:  # 첫 번째 사이클인 경우
                         # 현재 사이클 시작일 이전의 마지막 데이터 사용
-                        df_prev_kodex = df_kodex[df_kodex[date_col] < pd.to_datetime(d_start)].copy()
-                        if len(df_prev_kodex) > 0:
-                            df_prev_sorted_kodex = df_prev_kodex.sort_values(by=date_col)
-                            df_prev_kodex = df_prev_sorted_kodex.iloc[-1:].copy()
+                        df_prev_kodex = kodex_pit.asof(d_start, inclusive=False)
                     
                     if len(df_prev_kodex) > 0:
-                        # KODEX 200 관련 변수들을 계산하여 추가
-                        local_dict = {col: df_prev_kodex.iloc[0][col] for col in df_prev_kodex.columns}
-                        
-                        # 컬럼명에 kodex_ 접두사 추가
-                        kodex_local_dict = {}
-                        for key, value in local_dict.items():
-                            kodex_local_dict[f'kodex_{key}'] = value
-                        
-                        # 안전한 eval 실행
+                        # 해당 행의 시장 보유 여부 (컴파일할 수 없는 식만 kodex_ 변수로 eval)
                         try:
-                            market_hold = eval(market_hold_condition, {}, kodex_local_dict)
+                            market_hold = hold.at(df_prev_kodex)
                         except NameError as e:
                             st.warning(f"Variable not found in KODEX 200 data: {e}")
-                            st.warning(f"Available variables: {list(kodex_local_dict.keys())}")
+                            st.warning(f"Available variables: {list(hold.variables(df_prev_kodex).keys())}")
                             market_hold = False
                         except Exception as e:
                             st.warning(f"Error evaluating market hold condition: {e}")
@@ -230,36 +235,43 @@ if st.button("Run Analysis"):
                 cycle_returns.append(0.0)
                 continue
 
+            # 평가 행(이전 사이클 마지막 행 / 첫 사이클은 시작일 전 마지막 행)에서 조건을 만족한 종목 (색인이 있으면 종목별 query 대신)
+            candidates = None
+            if condition_index is not None:
+                if i > 0:
+                    rows = condition_index.last_rows(date_ranges[i-1][0], date_ranges[i-1][1])
+                else:
+                    rows = condition_index.last_rows(None, d_start - dt.timedelta(days=1))
+                candidates = dict(condition_index.select_at(rows, required_conditions, optional_conditions))
+
             for code in selected_codes:
                 try:
-                    df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                    date_col = find_column(df, ['date', 'Date', '날짜'])
-                    df[date_col] = pd.to_datetime(df[date_col])
+                    df = load_features(code, DATA_FOLDER, columns=strategy_cols)
+                    date_col = "date"
+                    pit = PointInTime(df)
+
+                    if candidates is not None:
+                        if code not in candidates:
+                            continue
+                        satisfied_count = candidates[code]
+                    else:
+                        # 이전 사이클의 데이터로 조건 평가
+                        if i > 0:  # 첫 번째 사이클이 아닌 경우
+                            prev_end = date_ranges[i-1][1]  # 이전 사이클 종료일
+                            df_prev = pit.on(prev_end)
+                            if len(df_prev) == 0:
+                                # 이전 사이클 종료일 데이터가 없으면 이전 사이클 기간의 마지막 데이터 사용
+                                prev_start = date_ranges[i-1][0]
+                                df_prev = pit.window(prev_start, prev_end).iloc[-1:]
+                        else:  # 첫 번째 사이클인 경우
+                            # 현재 사이클 시작일 이전의 마지막 데이터 사용
+                            df_prev = pit.asof(d_start, inclusive=False)
                     
-                    # 이전 사이클의 데이터로 조건 평가
-                    if i > 0:  # 첫 번째 사이클이 아닌 경우
-                        prev_end = date_ranges[i-1][1]  # 이전 사이클 종료일
-                        df_prev = df[df[date_col] == pd.to_datetime(prev_end)].copy()
                         if len(df_prev) == 0:
-                            # 이전 사이클 종료일 데이터가 없으면 이전 사이클 기간의 마지막 데이터 사용
-                            prev_start = date_ranges[i-1][0]
-                            df_prev_cycle = df[(df[date_col] >= pd.to_datetime(prev_start)) & (df[date_col] <= pd.to_datetime(prev_end))].copy()
-                            if len(df_prev_cycle) > 0:
-                                df_prev_sorted = df_prev_cycle.sort_values(by=date_col)
-                                df_prev = df_prev_sorted.iloc[-1:].copy()
-                    else:  # 첫 번째 사이클인 경우
-                        # 현재 사이클 시작일 이전의 마지막 데이터 사용
-                        df_prev = df[df[date_col] < pd.to_datetime(d_start)].copy()
-                        if len(df_prev) > 0:
-                            df_prev_sorted = df_prev.sort_values(by=date_col)
-                            df_prev = df_prev_sorted.iloc[-1:].copy()
-                    
-                    if len(df_prev) == 0:
-                        continue  # 데이터가 없으면 스킵
+                            continue  # 데이터가 없으면 스킵
 
-                    required_satisfied = True
-                    for cond, req in zip(conditions, required_flags):
-                        if req:
+                        required_satisfied = True
+                        for cond in required_conditions:
                             try:
                                 if len(df_prev.query(cond)) == 0:
                                     required_satisfied = False
@@ -267,13 +279,12 @@ if st.button("Run Analysis"):
                             except Exception:
                                 required_satisfied = False
                                 break
-                    if not required_satisfied:
-                        continue
+                        if not required_satisfied:
+                            continue
 
-                    satisfied_count = 0
-                    # 선택 조건만 카운트 (필수 조건은 이미 확인됨)
-                    for cond, req in zip(conditions, required_flags):
-                        if not req:  # 선택 조건만
+                        satisfied_count = 0
+                        # 선택 조건만 카운트 (필수 조건은 이미 확인됨)
+                        for cond in optional_conditions:
                             try:
                                 if len(df_prev.query(cond)) > 0:
                                     satisfied_count += 1
@@ -282,13 +293,10 @@ if st.button("Run Analysis"):
                                 pass
 
                     # 가격 계산: 현재 사이클 시작 시점의 가격 사용 (매수 가격)
-                    df_current_start = df[df[date_col] == pd.to_datetime(d_start)].copy()
+                    df_current_start = pit.on(d_start)
                     if len(df_current_start) == 0:
-                        df_before_cycle = df[df[date_col] < pd.to_datetime(d_start)].copy()
-                        if len(df_before_cycle) > 0:
-                            df_before_sorted = df_before_cycle.sort_values(by=date_col)
-                            df_current_start = df_before_sorted.iloc[-1:].copy()
-                        else:
+                        df_current_start = pit.asof(d_start, inclusive=False)
+                        if len(df_current_start) == 0:
                             continue
                     
                     start_price = df_current_start.iloc[0]["close"]
@@ -316,36 +324,30 @@ if st.button("Run Analysis"):
             # 현재 사이클의 종료 가격 설정
             for code in selected_codes:
                 try:
-                    df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                    date_col = find_column(df, ['date', 'Date', '날짜'])
-                    df[date_col] = pd.to_datetime(df[date_col])
+                    df = load_features(code, DATA_FOLDER, columns=strategy_cols)
+                    date_col = "date"
+                    pit = PointInTime(df)
                     
                     if i < len(date_ranges) - 1:  # 마지막 사이클이 아닌 경우
                         # 다음 사이클 시작 시점의 가격을 현재 사이클의 종료 가격으로 설정
                         next_start = date_ranges[i + 1][0]
-                        df_next_start = df[df[date_col] == pd.to_datetime(next_start)].copy()
+                        df_next_start = pit.on(next_start)
                         if len(df_next_start) == 0:
                             # 다음 사이클 시작일 데이터가 없으면 현재 사이클 종료일 데이터 사용
-                            df_cycle_end = df[df[date_col] == pd.to_datetime(d_end)].copy()
+                            df_cycle_end = pit.on(d_end)
                             if len(df_cycle_end) == 0:
                                 # 종료일 데이터가 없으면 마지막 사용 가능한 데이터 사용
-                                df_before_end = df[df[date_col] <= pd.to_datetime(d_end)].copy()
-                                if len(df_before_end) > 0:
-                                    df_before_end_sorted = df_before_end.sort_values(by=date_col)
-                                    df_cycle_end = df_before_end_sorted.iloc[-1:].copy()
+                                df_cycle_end = pit.asof(d_end)
                             if len(df_cycle_end) > 0 and code in prices:
                                 prices[code]["end"] = df_cycle_end.iloc[0]["close"]
                         elif len(df_next_start) > 0 and code in prices:
                             prices[code]["end"] = df_next_start.iloc[0]["close"]
                     else:  # 마지막 사이클인 경우
                         # 마지막 사이클 종료 시점의 가격 설정
-                        df_cycle_end = df[df[date_col] == pd.to_datetime(d_end)].copy()
+                        df_cycle_end = pit.on(d_end)
                         if len(df_cycle_end) == 0:
                             # 종료일 데이터가 없으면 마지막 사용 가능한 데이터 사용
-                            df_before_end = df[df[date_col] <= pd.to_datetime(d_end)].copy()
-                            if len(df_before_end) > 0:
-                                df_before_end_sorted = df_before_end.sort_values(by=date_col)
-                                df_cycle_end = df_before_end_sorted.iloc[-1:].copy()
+                            df_cycle_end = pit.asof(d_end)
                         
                         if len(df_cycle_end) > 0 and code in prices:
                             prices[code]["end"] = df_cycle_end.iloc[0]["close"]
@@ -408,38 +410,29 @@ if st.button("Run Analysis"):
                 # 모든 후보 종목의 이번 사이클 수익률 계산 (보유 여부와 관계없이)
                 for code in selected_codes:
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        df[date_col] = pd.to_datetime(df[date_col])
+                        df = load_features(code, DATA_FOLDER, columns=strategy_cols)
+                        date_col = "date"
+                        pit = PointInTime(df)
                         
                         # 사이클 시작 가격
-                        df_cycle_start = df[df[date_col] == pd.to_datetime(d_start)].copy()
+                        df_cycle_start = pit.on(d_start)
                         if len(df_cycle_start) == 0:
-                            df_before_cycle = df[df[date_col] < pd.to_datetime(d_start)].copy()
-                            if len(df_before_cycle) > 0:
-                                df_before_sorted = df_before_cycle.sort_values(by=date_col)
-                                df_cycle_start = df_before_sorted.iloc[-1:].copy()
+                            df_cycle_start = pit.asof(d_start, inclusive=False)
                         
                         # 사이클 종료 가격
                         if i < len(date_ranges) - 1:  # 마지막 사이클이 아닌 경우
                             next_start = date_ranges[i + 1][0]
-                            df_cycle_end = df[df[date_col] == pd.to_datetime(next_start)].copy()
+                            df_cycle_end = pit.on(next_start)
                             if len(df_cycle_end) == 0:
-                                df_cycle_end_alt = df[df[date_col] == pd.to_datetime(d_end)].copy()
+                                df_cycle_end_alt = pit.on(d_end)
                                 if len(df_cycle_end_alt) == 0:
-                                    df_before_end = df[df[date_col] <= pd.to_datetime(d_end)].copy()
-                                    if len(df_before_end) > 0:
-                                        df_before_end_sorted = df_before_end.sort_values(by=date_col)
-                                        df_cycle_end = df_before_end_sorted.iloc[-1:].copy()
+                                    df_cycle_end = pit.asof(d_end)
                                 else:
                                     df_cycle_end = df_cycle_end_alt
                         else:  # 마지막 사이클인 경우
-                            df_cycle_end = df[df[date_col] == pd.to_datetime(d_end)].copy()
+                            df_cycle_end = pit.on(d_end)
                             if len(df_cycle_end) == 0:
-                                df_before_end = df[df[date_col] <= pd.to_datetime(d_end)].copy()
-                                if len(df_before_end) > 0:
-                                    df_before_end_sorted = df_before_end.sort_values(by=date_col)
-                                    df_cycle_end = df_before_end_sorted.iloc[-1:].copy()
+                                df_cycle_end = pit.asof(d_end)
                         
                         if len(df_cycle_start) > 0 and len(df_cycle_end) > 0:
                             start_price = df_cycle_start.iloc[0]["close"]
@@ -460,43 +453,35 @@ if st.button("Run Analysis"):
                                 # 실제 투자 결정과 동일한 방식으로 조건 평가
                                 if i > 0:  # 첫 번째 사이클이 아닌 경우
                                     prev_end = date_ranges[i-1][1]  # 이전 사이클 종료일
-                                    df_prev = df[df[date_col] == pd.to_datetime(prev_end)].copy()
+                                    df_prev = pit.on(prev_end)
                                     if len(df_prev) == 0:
                                         # 이전 사이클 종료일 데이터가 없으면 이전 사이클 기간의 마지막 데이터 사용
                                         prev_start = date_ranges[i-1][0]
-                                        df_prev_cycle = df[(df[date_col] >= pd.to_datetime(prev_start)) & (df[date_col] <= pd.to_datetime(prev_end))].copy()
-                                        if len(df_prev_cycle) > 0:
-                                            df_prev_sorted = df_prev_cycle.sort_values(by=date_col)
-                                            df_prev = df_prev_sorted.iloc[-1:].copy()
+                                        df_prev = pit.window(prev_start, prev_end).iloc[-1:]
                                 else:  # 첫 번째 사이클인 경우
                                     # 현재 사이클 시작일 이전의 마지막 데이터 사용
-                                    df_prev = df[df[date_col] < pd.to_datetime(d_start)].copy()
-                                    if len(df_prev) > 0:
-                                        df_prev_sorted = df_prev.sort_values(by=date_col)
-                                        df_prev = df_prev_sorted.iloc[-1:].copy()
+                                    df_prev = pit.asof(d_start, inclusive=False)
                                 
                                 if len(df_prev) > 0:
                                     # 필수 조건 확인
                                     required_satisfied = True
-                                    for cond, req in zip(conditions, required_flags):
-                                        if req:  # 필수 조건
-                                            try:
-                                                if len(df_prev.query(cond)) == 0:
-                                                    required_satisfied = False
-                                                    break
-                                            except Exception:
+                                    for cond in required_conditions:
+                                        try:
+                                            if len(df_prev.query(cond)) == 0:
                                                 required_satisfied = False
                                                 break
+                                        except Exception:
+                                            required_satisfied = False
+                                            break
                                     
                                     if required_satisfied:
                                         # 선택 조건만 카운트
-                                        for cond, req in zip(conditions, required_flags):
-                                            if not req:  # 선택 조건만
-                                                try:
-                                                    if len(df_prev.query(cond)) > 0:
-                                                        satisfied_conditions += 1
-                                                except Exception:
-                                                    pass
+                                        for cond in optional_conditions:
+                                            try:
+                                                if len(df_prev.query(cond)) > 0:
+                                                    satisfied_conditions += 1
+                                            except Exception:
+                                                pass
                             except Exception as e:
                                 satisfied_conditions = 0
                             
@@ -544,29 +529,23 @@ if st.button("Run Analysis"):
                 
                 # KODEX 200과의 비교
                 try:
-                    df_kodex = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
-                    date_col = find_column(df_kodex, ['date', 'Date', '날짜'])
-                    df_kodex[date_col] = pd.to_datetime(df_kodex[date_col])
+                    df_kodex = load_features(KODEX_CODE, DATA_FOLDER, columns=kodex_cols)
+                    date_col = "date"
+                    kodex_pit = PointInTime(df_kodex)
                     
                     # KODEX 200 시작 가격
-                    df_kodex_start = df_kodex[df_kodex[date_col] == pd.to_datetime(d_start)].copy()
+                    df_kodex_start = kodex_pit.on(d_start)
                     if len(df_kodex_start) == 0:
-                        df_kodex_before = df_kodex[df_kodex[date_col] < pd.to_datetime(d_start)].copy()
-                        if len(df_kodex_before) > 0:
-                            df_kodex_before_sorted = df_kodex_before.sort_values(by=date_col)
-                            df_kodex_start = df_kodex_before_sorted.iloc[-1:].copy()
+                        df_kodex_start = kodex_pit.asof(d_start, inclusive=False)
                     
                     # KODEX 200 종료 가격
                     if i < len(date_ranges) - 1:  # 마지막 사이클이 아닌 경우
                         next_start = date_ranges[i + 1][0]
-                        df_kodex_end = df_kodex[df_kodex[date_col] == pd.to_datetime(next_start)].copy()
+                        df_kodex_end = kodex_pit.on(next_start)
                         if len(df_kodex_end) == 0:
-                            df_kodex_cycle_end = df_kodex[df_kodex[date_col] == pd.to_datetime(d_end)].copy()
+                            df_kodex_cycle_end = kodex_pit.on(d_end)
                             if len(df_kodex_cycle_end) == 0:
-                                df_kodex_before_end = df_kodex[df_kodex[date_col] <= pd.to_datetime(d_end)].copy()
-                                if len(df_kodex_before_end) > 0:
-                                    df_kodex_before_end_sorted = df_kodex_before_end.sort_values(by=date_col)
-                                    df_kodex_cycle_end = df_kodex_before_end_sorted.iloc[-1:].copy()
+                                df_kodex_cycle_end = kodex_pit.asof(d_end)
                             if len(df_kodex_cycle_end) > 0:
                                 kodex_end_price = df_kodex_cycle_end.iloc[0]["close"]
                             else:
@@ -574,12 +553,9 @@ if st.button("Run Analysis"):
                         else:
                             kodex_end_price = df_kodex_end.iloc[0]["close"]
                     else:  # 마지막 사이클인 경우
-                        df_kodex_cycle_end = df_kodex[df_kodex[date_col] == pd.to_datetime(d_end)].copy()
+                        df_kodex_cycle_end = kodex_pit.on(d_end)
                         if len(df_kodex_cycle_end) == 0:
-                            df_kodex_before_end = df_kodex[df_kodex[date_col] <= pd.to_datetime(d_end)].copy()
-                            if len(df_kodex_before_end) > 0:
-                                df_kodex_before_end_sorted = df_kodex_before_end.sort_values(by=date_col)
-                                df_kodex_cycle_end = df_kodex_before_end_sorted.iloc[-1:].copy()
+                            df_kodex_cycle_end = kodex_pit.asof(d_end)
                         if len(df_kodex_cycle_end) > 0:
                             kodex_end_price = df_kodex_cycle_end.iloc[0]["close"]
                         else:
@@ -671,18 +647,15 @@ if st.button("Run Analysis"):
                 # 각 종목의 가격 정보 수집 (시작 시점만)
                 for code in selected_codes:
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        df[date_col] = pd.to_datetime(df[date_col])
+                        df = load_features(code, DATA_FOLDER, columns=strategy_cols)
+                        date_col = "date"
+                        pit = PointInTime(df)
                         
                         # 사이클 시작 시점의 가격만 사용
-                        df_cycle_start = df[df[date_col] == pd.to_datetime(d_start)].copy()
+                        df_cycle_start = pit.on(d_start)
                         if len(df_cycle_start) == 0:
-                            df_before_cycle = df[df[date_col] < pd.to_datetime(d_start)].copy()
-                            if len(df_before_cycle) > 0:
-                                df_before_sorted = df_before_cycle.sort_values(by=date_col)
-                                df_cycle_start = df_before_sorted.iloc[-1:].copy()
-                            else:
+                            df_cycle_start = pit.asof(d_start, inclusive=False)
+                            if len(df_cycle_start) == 0:
                                 continue
                         
                         start_price = df_cycle_start.iloc[0]["close"]
@@ -693,36 +666,30 @@ if st.button("Run Analysis"):
                 # 현재 사이클의 종료 가격 설정
                 for code in selected_codes:
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        df[date_col] = pd.to_datetime(df[date_col])
+                        df = load_features(code, DATA_FOLDER, columns=strategy_cols)
+                        date_col = "date"
+                        pit = PointInTime(df)
                         
                         if i < len(date_ranges) - 1:  # 마지막 사이클이 아닌 경우
                             # 다음 사이클 시작 시점의 가격을 현재 사이클의 종료 가격으로 설정
                             next_start = date_ranges[i + 1][0]
-                            df_next_start = df[df[date_col] == pd.to_datetime(next_start)].copy()
+                            df_next_start = pit.on(next_start)
                             if len(df_next_start) == 0:
                                 # 다음 사이클 시작일 데이터가 없으면 현재 사이클 종료일 데이터 사용
-                                df_cycle_end = df[df[date_col] == pd.to_datetime(d_end)].copy()
+                                df_cycle_end = pit.on(d_end)
                                 if len(df_cycle_end) == 0:
                                     # 종료일 데이터가 없으면 마지막 사용 가능한 데이터 사용
-                                    df_before_end = df[df[date_col] <= pd.to_datetime(d_end)].copy()
-                                    if len(df_before_end) > 0:
-                                        df_before_end_sorted = df_before_end.sort_values(by=date_col)
-                                        df_cycle_end = df_before_end_sorted.iloc[-1:].copy()
+                                    df_cycle_end = pit.asof(d_end)
                                 if len(df_cycle_end) > 0 and code in cycle_prices:
                                     cycle_prices[code]["end"] = df_cycle_end.iloc[0]["close"]
                             elif len(df_next_start) > 0 and code in cycle_prices:
                                 cycle_prices[code]["end"] = df_next_start.iloc[0]["close"]
                         else:  # 마지막 사이클인 경우
                             # 마지막 사이클 종료 시점의 가격 설정
-                            df_cycle_end = df[df[date_col] == pd.to_datetime(d_end)].copy()
+                            df_cycle_end = pit.on(d_end)
                             if len(df_cycle_end) == 0:
                                 # 종료일 데이터가 없으면 마지막 사용 가능한 데이터 사용
-                                df_before_end = df[df[date_col] <= pd.to_datetime(d_end)].copy()
-                                if len(df_before_end) > 0:
-                                    df_before_end_sorted = df_before_end.sort_values(by=date_col)
-                                    df_cycle_end = df_before_end_sorted.iloc[-1:].copy()
+                                df_cycle_end = pit.asof(d_end)
                             
                             if len(df_cycle_end) > 0 and code in cycle_prices:
                                 cycle_prices[code]["end"] = df_cycle_end.iloc[0]["close"]
@@ -775,25 +742,19 @@ if st.button("Run Analysis"):
             st.info("💡 **KODEX 200 Benchmark**: 1억원 투자, 0.35% transaction tax")
             
             try:
-                df_kodex_total = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
-                date_col = find_column(df_kodex_total, ['date', 'Date', '날짜'])
-                df_kodex_total[date_col] = pd.to_datetime(df_kodex_total[date_col])
+                df_kodex_total = load_features(KODEX_CODE, DATA_FOLDER, columns=kodex_cols)
+                date_col = "date"
+                kodex_total_pit = PointInTime(df_kodex_total)
                 
                 # 전체 기간 시작 가격
-                df_kodex_total_start = df_kodex_total[df_kodex_total[date_col] == pd.to_datetime(start_date)].copy()
+                df_kodex_total_start = kodex_total_pit.on(start_date)
                 if len(df_kodex_total_start) == 0:
-                    df_kodex_total_before = df_kodex_total[df_kodex_total[date_col] < pd.to_datetime(start_date)].copy()
-                    if len(df_kodex_total_before) > 0:
-                        df_kodex_total_before_sorted = df_kodex_total_before.sort_values(by=date_col)
-                        df_kodex_total_start = df_kodex_total_before_sorted.iloc[-1:].copy()
+                    df_kodex_total_start = kodex_total_pit.asof(start_date, inclusive=False)
                 
                 # 전체 기간 종료 가격
-                df_kodex_total_end = df_kodex_total[df_kodex_total[date_col] == pd.to_datetime(end_date)].copy()
+                df_kodex_total_end = kodex_total_pit.on(end_date)
                 if len(df_kodex_total_end) == 0:
-                    df_kodex_total_before_end = df_kodex_total[df_kodex_total[date_col] <= pd.to_datetime(end_date)].copy()
-                    if len(df_kodex_total_before_end) > 0:
-                        df_kodex_total_before_end_sorted = df_kodex_total_before_end.sort_values(by=date_col)
-                        df_kodex_total_end = df_kodex_total_before_end_sorted.iloc[-1:].copy()
+                    df_kodex_total_end = kodex_total_pit.asof(end_date)
                 
                 if len(df_kodex_total_start) > 0 and len(df_kodex_total_end) > 0:
                     kodex_total_start_price = df_kodex_total_start.iloc[0]["close"]
@@ -1,23 +1,28 @@
 import streamlit as st
 import pandas as pd
 import os
-from glob import glob
 import datetime as dt
+import time
 import traceback
 
-def find_column(df, target_names):
-    for col in df.columns:
-        if col.strip().lower() in [name.lower() for name in target_names]:
-            return col
-    return None
+from condition_compiler import available_engines, condition_dag
+from condition_index import load_condition_index
+from derived_features import expand_derived_calls
+from feature_loader import load_features, load_condition_masks, condition_selectivity, order_by_selectivity, list_feature_codes, strategy_columns, memory_report, ENGINE_COLUMNS
+from feature_panel import load_feature_panel
+from feature_registry import load_feature_registry
+from feature_backend import available_backends, get_backend
+from point_in_time import PointInTime
+from trading_calendar import load_trading_calendar
+from universe_index import load_universe_index
 
 # 재평가일 계산 함수
-def calculate_evaluation_dates(trading_dates, start_date, end_date, eval_type):
+def calculate_evaluation_dates(calendar, start_date, end_date, eval_type):
     """
-    거래일 목록에서 재평가일을 계산하는 함수
+    거래일 달력에서 재평가일을 계산하는 함수
     
     Args:
-        trading_dates: 전체 거래일 목록
+        calendar: TradingCalendar
         start_date: 시작일
         end_date: 종료일
         eval_type: 평가 유형 ("weekly_first", "monthly_1_3_weeks", "monthly_first")
@@ -25,130 +30,40 @@ def calculate_evaluation_dates(trading_dates, start_date, end_date, eval_type):
     Returns:
         evaluation_dates: 재평가일 목록
     """
-    # 선택된 기간의 거래일만 필터링
-    period_dates = [d for d in trading_dates if start_date <= d <= end_date]
+    if eval_type == "weekly_first":
+        # 매주의 첫 거래일
+        return calendar.week_firsts(start_date, end_date)
     
-    if not period_dates:
-        return []
+    if eval_type == "monthly_first":
+        # 매달의 첫 거래일
+        return calendar.month_firsts(start_date, end_date)
     
     evaluation_dates = []
     
-    if eval_type == "weekly_first":
-        # 매주의 첫 거래일
-        current_week_start = None
-        for date in period_dates:
-            # 해당 주의 시작일 (월요일) 계산
-            week_start = date - dt.timedelta(days=date.weekday())
-            
-            if current_week_start != week_start:
-                current_week_start = week_start
-                evaluation_dates.append(date)
-    
-    elif eval_type == "monthly_1_3_weeks":
-        # 매달 1-3주의 첫 거래일
+    if eval_type == "monthly_1_3_weeks":
+        # 매달 1-3주의 첫 거래일 (달력에 미리 계산된 주/월 키 사용)
+        lo, hi = calendar.bounds(start_date, end_date)
         current_month = None
         current_week_in_month = None
         
-        for date in period_dates:
-            month_key = (date.year, date.month)
+        for i in range(lo, hi):
+            date = calendar.dates[i]
+            month_key = calendar.month_keys[i]
             
             if current_month != month_key:
                 current_month = month_key
                 current_week_in_month = 0
             
             # 해당 월의 몇 번째 주인지 계산
-            week_start = date - dt.timedelta(days=date.weekday())
             month_start = date.replace(day=1)
-            week_in_month = ((week_start - month_start).days // 7) + 1
+            week_in_month = ((calendar.week_keys[i] - month_start).days // 7) + 1
             
             if week_in_month <= 3 and week_in_month != current_week_in_month:
                 current_week_in_month = week_in_month
                 evaluation_dates.append(date)
     
-    elif eval_type == "monthly_first":
-        # 매달의 첫 거래일
-        current_month = None
-        
-        for date in period_dates:
-            month_key = (date.year, date.month)
-            
-            if current_month != month_key:
-                current_month = month_key
-                evaluation_dates.append(date)
-    
     return evaluation_dates
 
-# 새로운 feature 계산 함수
-def calculate_recent_high_feature(df, evaluation_date, pct=8):
-    """
-    재평가일 전날 종가가 최근 5일 중 최저값보다 지정된 % 이상 큰지 확인하는 feature
-    
-    Args:
-        df: 주식 데이터프레임
-        evaluation_date: 재평가일
-        pct: 퍼센트 (기본값: 8)
-    
-    Returns:
-        recent_high_Xpct: True/False (조건 만족 여부)
-    """
-    try:
-        date_col = find_column(df, ['date', 'Date', '날짜'])
-        close_col = find_column(df, ['close', 'Close', '종가'])
-        
-        if not date_col or not close_col:
-            return False
-        
-        df[date_col] = pd.to_datetime(df[date_col])
-        
-        # 재평가일 전날
-        yesterday = evaluation_date - dt.timedelta(days=1)
-        
-        # 최근 5일 데이터 (재평가일 기준 -1, -2, -3, -4, -5일)
-        recent_5_days = []
-        for i in range(1, 6):
-            check_date = evaluation_date - dt.timedelta(days=i)
-            day_data = df[df[date_col] == pd.to_datetime(check_date)]
-            if len(day_data) > 0:
-                recent_5_days.append({
-                    'date': check_date,
-                    'close': day_data.iloc[0][close_col]
-                })
-        
-        if len(recent_5_days) < 2:  # 최소 2일 이상의 데이터 필요
-            return False
-        
-        # 전날 종가
-        yesterday_data = df[df[date_col] == pd.to_datetime(yesterday)]
-        if len(yesterday_data) == 0:
-            return False
-        
-        yesterday_close = yesterday_data.iloc[0][close_col]
-        
-        # 최근 5일 중 최저값
-        min_close = min([day['close'] for day in recent_5_days])
-        
-        # 전날 종가가 최저값보다 지정된 % 이상 큰지 확인
-        threshold = min_close * (1 + pct/100)
-        recent_high_pct = yesterday_close >= threshold
-        
-        return recent_high_pct
-        
-    except Exception as e:
-        st.warning(f"Error calculating recent_high_{pct}pct feature: {e}")
-        return False
-
-def calculate_recent_high_8pct(df, evaluation_date):
-    """8% 버전"""
-    return calculate_recent_high_feature(df, evaluation_date, 8)
-
-def calculate_recent_high_5pct(df, evaluation_date):
-    """5% 버전"""
-    return calculate_recent_high_feature(df, evaluation_date, 5)
-
-def calculate_recent_high_3pct(df, evaluation_date):
-    """3% 버전"""
-    return calculate_recent_high_feature(df, evaluation_date, 3)
-
 # 사용 가능한 feature 목록과 설명
 AVAILABLE_FEATURES = {
     # 기본 가격 데이터
@@ -189,10 +104,10 @@ AVAILABLE_FEATURES = {
     "atr": "ATR (평균진폭)",
     "volatility": "변동성",
     
-    # 새로운 feature
-    "recent_high_8pct": "재평가일 전날 종가가 최근 5일 중 최저값보다 8% 이상 큰 상황",
-    "recent_high_5pct": "재평가일 전날 종가가 최근 5일 중 최저값보다 5% 이상 큰 상황",
-    "recent_high_3pct": "재평가일 전날 종가가 최근 5일 중 최저값보다 3% 이상 큰 상황"
+    # 파생 feature (derived_features, 전체 이력에 대해 한 번만 계산)
+    "recent_high_8pct": "종가가 최근 5거래일 중 최저 종가보다 8% 이상 큰 상황 (= recent_high(8, 5))",
+    "recent_high_5pct": "종가가 최근 5거래일 중 최저 종가보다 5% 이상 큰 상황 (= recent_high(5, 5))",
+    "recent_high_3pct": "종가가 최근 5거래일 중 최저 종가보다 3% 이상 큰 상황 (= recent_high(3, 5))"
 }
 
 
@@ -232,40 +147,49 @@ DATA_FOLDER = os.path.dirname(__file__)
 st.set_page_config(page_title="Stock Screening App", layout="wide")
 st.title("Stock Screening App")
 
-# KODEX 200 데이터에서 거래일 추출
-def get_trading_dates():
-    try:
-        df_kodex = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
-        date_col = find_column(df_kodex, ['date', 'Date', '날짜'])
-        if date_col:
-            df_kodex[date_col] = pd.to_datetime(df_kodex[date_col])
-            trading_dates = df_kodex[date_col].dt.date.unique()
-            trading_dates = sorted(trading_dates)
-            return trading_dates
-        else:
-            st.error("날짜 컬럼을 찾을 수 없습니다.")
-            return []
-    except Exception as e:
-        st.error(f"KODEX 200 데이터 로드 중 오류: {e}")
-        return []
+# 계산 백엔드 (CSV 파싱/조건식 마스크 계산, 세션별 선택, 결과는 같고 속도만 다르다)
+st.sidebar.selectbox(
+    "계산 백엔드", available_backends(), key="backend",
+    help="polars 가 설치되어 있으면 선택할 수 있습니다. 결과는 pandas 와 같습니다.",
+)
+backend = get_backend(st.session_state["backend"])
 
-# 거래일 목록 가져오기
-trading_dates = get_trading_dates()
+# 조건식 마스크 계산 엔진 (auto 는 배열이 클 때만 numexpr, 결과는 같다)
+engine = st.sidebar.selectbox(
+    "조건식 계산 엔진", available_engines(), key="engine",
+    help="numexpr 가 설치되어 있으면 선택할 수 있습니다. 결과는 numpy 와 같습니다.",
+)
+
+# 거래일 달력 (KODEX 200 기준, 파일이 없으면 선택한 종목 날짜의 합집합 - 종목 선택 위젯은 아래에 있으므로 세션 값 사용)
+calendar_codes = [name.split("(")[-1][:-1] for name in st.session_state.get("selected_stocks", [])]
+try:
+    calendar = load_trading_calendar(DATA_FOLDER, calendar_codes)
+except Exception as e:
+    st.error(f"거래일 달력 생성 중 오류: {e}")
+    calendar = None
+
+if calendar is not None and calendar.source != "KODEX 200":
+    if calendar_codes:
+        st.warning("KODEX 200 데이터가 없어 선택한 종목의 거래일 합집합을 달력으로 사용합니다.")
+    else:
+        st.warning("KODEX 200 데이터가 없습니다. 종목을 먼저 선택하면 선택한 종목의 거래일로 달력을 만듭니다.")
+
+trading_dates = calendar.dates if calendar is not None else []
 
 if trading_dates:
     # 거래일 범위 계산
-    min_date = min(trading_dates)
-    max_date = max(trading_dates)
+    min_date = calendar.first
+    max_date = calendar.last
     
     # 2019년 1월 1일부터 2025년 6월 30일까지의 거래일 필터링
     start_limit = dt.date(2019, 1, 1)
     end_limit = dt.date(2025, 6, 30)
-    filtered_trading_dates = [d for d in trading_dates if start_limit <= d <= end_limit]
+    filtered_trading_dates = calendar.range(start_limit, end_limit)
     
     if filtered_trading_dates:
-        # 연도별, 월별, 일별로 거래일 그룹화
-        years = sorted(list(set(d.year for d in filtered_trading_dates)))
-        years_str = [str(year) for year in years]
+        # 연도별, 월별, 일별로 거래일 그룹화 (달력 캐시에 미리 계산됨)
+        date_groups = calendar.groups(start_limit, end_limit)
+        years_str = [str(year) for year in date_groups]
         
         # 시작일과 종료일 선택
         st.subheader("📅 기간 선택")
@@ -279,15 +203,13 @@ if trading_dates:
             start_year = st.selectbox("연도", years_str, index=0, key="start_year")
             
             # 시작일 월 선택
-            start_year_dates = [d for d in filtered_trading_dates if d.year == int(start_year)]
-            start_months = sorted(list(set(d.month for d in start_year_dates)))
+            start_months = list(date_groups[int(start_year)])
             start_months_str = [f"{month:02d}월" for month in start_months]
             start_month = st.selectbox("월", start_months_str, key="start_month")
             start_month_num = int(start_month.replace("월", ""))
             
             # 시작일 일 선택
-            start_month_dates = [d for d in start_year_dates if d.month == start_month_num]
-            start_days = sorted(list(set(d.day for d in start_month_dates)))
+            start_days = date_groups[int(start_year)][start_month_num]
             start_days_str = [f"{day:02d}일" for day in start_days]
             start_day = st.selectbox("일", start_days_str, key="start_day")
             start_day_num = int(start_day.replace("일", ""))
@@ -301,15 +223,13 @@ if trading_dates:
             end_year = st.selectbox("연도", years_str, index=len(years_str)-1, key="end_year")
             
             # 종료일 월 선택
-            end_year_dates = [d for d in filtered_trading_dates if d.year == int(end_year)]
-            end_months = sorted(list(set(d.month for d in end_year_dates)))
+            end_months = list(date_groups[int(end_year)])
             end_months_str = [f"{month:02d}월" for month in end_months]
             end_month = st.selectbox("월", end_months_str, index=len(end_months_str)-1, key="end_month")
             end_month_num = int(end_month.replace("월", ""))
             
             # 종료일 일 선택
-            end_month_dates = [d for d in end_year_dates if d.month == end_month_num]
-            end_days = sorted(list(set(d.day for d in end_month_dates)))
+            end_days = date_groups[int(end_year)][end_month_num]
             end_days_str = [f"{day:02d}일" for day in end_days]
             end_day = st.selectbox("일", end_days_str, index=len(end_days_str)-1, key="end_day")
             end_day_num = int(end_day.replace("일", ""))
@@ -331,7 +251,7 @@ if trading_dates:
                     st.write(f"**선택된 기간**: {start_date} ~ {end_date}")
                     
                     # 선택된 기간의 거래일 수 계산
-                    selected_trading_dates = [d for d in filtered_trading_dates if start_date <= d <= end_date]
+                    selected_trading_dates = calendar.range(start_date, end_date)
                     st.write(f"**선택된 기간 거래일 수**: {len(selected_trading_dates)}일")
                     
                     # 선택된 기간의 거래일 목록 표시 (처음 10개와 마지막 10개)
@@ -351,7 +271,7 @@ eval_type = interval_days_map[eval_cycle]
 
 # 재평가일 계산
 if trading_dates and 'start_date' in locals() and 'end_date' in locals():
-    evaluation_dates = calculate_evaluation_dates(trading_dates, start_date, end_date, eval_type)
+    evaluation_dates = calculate_evaluation_dates(calendar, start_date, end_date, eval_type)
     
     # 재평가일 정보 표시
     with st.expander("📊 재평가일 정보"):
@@ -382,12 +302,17 @@ if trading_dates and 'start_date' in locals() and 'end_date' in locals():
 # ==============================
 st.subheader("📈 주식 종목 선택")
 
-file_paths = sorted(glob(os.path.join(DATA_FOLDER, "*_features.csv")))
-stock_codes = [os.path.basename(p).split("_")[0] for p in file_paths]
+stock_codes = list_feature_codes(DATA_FOLDER)
 stock_names = [f"{CODE_TO_NAME.get(code, code)} ({code})" for code in stock_codes]
-selected_stocks = st.multiselect("Select Stocks", options=stock_names)
+selected_stocks = st.multiselect("Select Stocks", options=stock_names, key="selected_stocks")
 selected_codes = [name.split("(")[-1][:-1] for name in selected_stocks]
 
+# 종목 메타데이터 색인 (첫/마지막 날짜, 행 수, 지표 warm-up 길이 - 데이터를 읽지 않음)
+universe = load_universe_index(DATA_FOLDER, stock_codes)
+if selected_codes:
+    with st.expander("종목 정보"):
+        st.dataframe(universe.summary(selected_codes, CODE_TO_NAME), hide_index=True)
+
 # ==============================
 # UI 확장: 필수조건, 최대 보유 종목 수
 # ==============================
@@ -402,7 +327,7 @@ for i in range(num_conditions):
     cond = cols[0].text_input(f"Condition {i+1}", key=f"cond_{i}", placeholder="Example: sma20 > sma60")
     required = cols[1].checkbox("Required", key=f"req_{i}")
     if cond.strip():
-        conditions.append(cond.strip())
+        conditions.append(expand_derived_calls(cond.strip()))
         required_flags.append(required)
 
 max_stock_count = st.number_input("Max Number of Stocks to Hold", min_value=1, max_value=10, value=3, step=1)
@@ -472,7 +397,7 @@ for i in range(num_sell_conditions):
     sell_cond = cols[0].text_input(f"Sell Condition {i+1}", key=f"sell_cond_{i}", placeholder="Example: rsi > 80")
     sell_required = cols[1].checkbox("Required", key=f"sell_req_{i}")
     if sell_cond.strip():
-        sell_conditions.append(sell_cond.strip())
+        sell_conditions.append(expand_derived_calls(sell_cond.strip()))
         sell_required_flags.append(sell_required)
 
 # 매도 조건 만족 시 최소 조건 수 설정
@@ -522,12 +447,26 @@ with st.expander("📋 매도 조건 설정 요약"):
         st.write("- 설정된 매도 조건 없음")
 
 if selected_codes:
-    try:
-        df_sample = pd.read_csv(os.path.join(DATA_FOLDER, f"{selected_codes[0]}_features.csv"))
+    # 컬럼 정보는 파일 헤더/캐시 메타데이터만으로 조회 (row 데이터를 읽지 않음)
+    feature_registry = load_feature_registry(DATA_FOLDER)
+    if selected_codes[0] in feature_registry.codes:
         with st.expander("Available Features"):
-            st.write(", ".join(df_sample.columns))
-    except Exception as e:
-        st.warning(f"Error loading file: {e}")
+            st.write(", ".join(feature_registry.columns(selected_codes[0])))
+        with st.expander("Feature 스키마 (dtype / 종목 커버리지 / 첫 유효일)"):
+            st.dataframe(feature_registry.coverage(selected_codes), hide_index=True)
+    else:
+        st.warning(f"Error loading file: {selected_codes[0]}_features.csv")
+    for message in feature_registry.validate(conditions + sell_conditions, selected_codes):
+        st.warning(f"조건 확인: {message}")
+
+with st.expander("💾 종목별 메모리 사용량"):
+    if st.button("메모리 사용량 계산", key="memory_report"):
+        report = memory_report(selected_codes, DATA_FOLDER)
+        if len(report) > 0:
+            st.dataframe(report, hide_index=True)
+            total_mb = report["메모리(MB)"].sum()
+            baseline_mb = report["float64 기준(MB)"].sum()
+            st.write(f"**합계**: {total_mb:.2f} MB (float64 기준 {baseline_mb:.2f} MB)")
 
 # ==============================
 # 사용 가능한 Feature 목록
@@ -542,7 +481,7 @@ feature_categories = {
     "기술적 지표": ["rsi", "macd", "macd_signal", "macd_histogram", "bb_upper", "bb_middle", "bb_lower", "bb_width", "bb_position"],
     "거래량 지표": ["volume_sma5", "volume_sma20", "volume_ratio"],
     "변동성 지표": ["atr", "volatility"],
-    "새로운 Feature": ["recent_high_8pct"]
+    "파생 Feature": ["recent_high_8pct", "recent_high_5pct", "recent_high_3pct"]
 }
 
 for category, features in feature_categories.items():
@@ -554,15 +493,15 @@ for category, features in feature_categories.items():
                 st.write(f"**{feature}**: 설명 없음")
 
 # 새로운 feature 상세 설명
-with st.expander("🆕 새로운 Feature 상세 설명"):
-    st.write("### recent_high_8pct")
-    st.write("**설명**: 재평가일 전날 종가가 최근 5일 중 최저값보다 8% 이상 큰 상황")
+with st.expander("🆕 파생 Feature 상세 설명"):
+    st.write("### recent_high(pct, window)")
+    st.write("**설명**: 종가가 최근 window 거래일 중 최저 종가보다 pct% 이상 큰 상황")
     st.write("**계산 방법**:")
-    st.write("1. 재평가일 기준 -1, -2, -3, -4, -5일의 종가 수집")
-    st.write("2. 이 5일 중 최저값 계산")
-    st.write("3. 재평가일 전날 종가가 최저값의 1.08배(8% 증가) 이상인지 확인")
-    st.write("**사용 예시**: `recent_high_8pct == True`")
-    st.write("**의미**: 최근 5일 중 저점이 있었고, 현재 가격이 그 저점보다 8% 이상 회복된 상황")
+    st.write("1. 당일을 포함한 최근 window 거래일 종가의 최저값 계산 (rolling min, 최소 2거래일)")
+    st.write("2. 종가가 최저값의 (1 + pct/100)배 이상인지 확인")
+    st.write("3. 전체 이력에 대해 종목·데이터 버전별로 한 번만 계산하고, 재평가일 전날(D-1까지의 마지막 거래일) 값으로 평가")
+    st.write("**사용 예시**: `recent_high(8, 5) == True`, `recent_high(pct=3, window=10) == True`, `recent_high_8pct == True`")
+    st.write("**의미**: 최근 window 거래일 중 저점이 있었고, 현재 가격이 그 저점보다 pct% 이상 회복된 상황")
 
 # ==============================
 # 분석 실행 버튼
@@ -573,6 +512,7 @@ if st.button("Run Analysis"):
     if not selected_codes or not conditions:
         st.warning("Please select stocks and enter at least one condition.")
     else:
+        run_started = time.perf_counter()
         st.write("**선택된 종목**:", selected_codes)
         st.write("**설정된 조건**:", conditions)
         st.write("**재평가일 수**:", len(evaluation_dates) if 'evaluation_dates' in locals() else 0)
@@ -591,6 +531,26 @@ if st.button("Run Analysis"):
             
             # 현금 보유 변수 추가
             cash_holding = False
+
+            # 가격 조회용 날짜 × 종목 패널 (선택한 종목의 OHLC 만)
+            panel = load_feature_panel(DATA_FOLDER, selected_codes, ENGINE_COLUMNS)
+
+            # 조건 평가용 데이터는 매수/매도 조건이 참조하는 컬럼과 OHLC 만 읽기
+            strategy_cols = strategy_columns(conditions, sell_conditions)
+            # 매수/매도 조건식 마스크는 함께 계산 (공통 부분식은 종목마다 한 번만)
+            strategy_conditions = conditions + sell_conditions
+
+            # 매수 조건 비트셋 색인 (numpy 로 계산할 수 없는 조건식이 있으면 None → 종목별 평가)
+            condition_index = load_condition_index(conditions, DATA_FOLDER, selected_codes, columns=strategy_cols, shared=sell_conditions, engine=engine)
+            required_conditions = [cond for cond, req in zip(conditions, required_flags) if req]
+            optional_conditions = [cond for cond, req in zip(conditions, required_flags) if not req]
+            if condition_index is None:
+                # 종목별 평가: 필수 조건은 많이 걸러내는 것부터 (색인은 자체적으로 같은 순서로 AND)
+                # 종목별 평가에서 전체 이력 마스크를 쓰므로 통과율도 그 마스크로 재서 재사용
+                selectivity = condition_selectivity(selected_codes, strategy_conditions, DATA_FOLDER, columns=strategy_cols, rows=None)
+                required_conditions = order_by_selectivity(required_conditions, selectivity)
+            # 필수 조건을 모두 통과한 종목만 선택 조건을 센다
+            ordered_conditions = [(cond, True) for cond in required_conditions] + [(cond, False) for cond in optional_conditions]
             
             # 각 사이클별 상세 결과 저장
             cycle_details = []
@@ -612,7 +572,7 @@ if st.button("Run Analysis"):
                 buy_executed = False
                 
                 # 사이클 내 모든 거래일에서 매수 조건 체크
-                cycle_trading_dates = [d for d in trading_dates if cycle_start <= d < cycle_end]
+                cycle_trading_dates = calendar.range(cycle_start, cycle_end, include_end=False)
                 
                 for check_date in cycle_trading_dates:
                     if buy_executed:  # 이미 매수했으면 더 이상 체크하지 않음
@@ -624,66 +584,41 @@ if st.button("Run Analysis"):
                     # 각 종목별 조건 만족 개수 계산
                     stock_condition_counts = []
                     
-                    for code in selected_codes:
+                    # 아직 데이터가 시작되지 않은 종목은 파일을 열지 않고 건너뜀
+                    listed_codes = universe.listed_codes(selected_codes, yesterday)
+                    if condition_index is not None:
+                        # 필수 조건 AND / 선택 조건 개수를 비트 연산으로 한 번에 계산
+                        for code, count in condition_index.select(yesterday, required_conditions, optional_conditions, min_satisfied_conditions, listed_codes):
+                            stock_condition_counts.append({
+                                'code': code,
+                                'name': CODE_TO_NAME.get(code, code),
+                                'conditions_satisfied': count,
+                                'required_satisfied': True
+                            })
+                        listed_codes = []  # 종목별 평가 생략
+                    for code in listed_codes:
                         try:
-                            df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                            date_col = find_column(df, ['date', 'Date', '날짜'])
-                            df[date_col] = pd.to_datetime(df[date_col])
+                            df = load_features(code, DATA_FOLDER, columns=strategy_cols, backend=backend)
+                            # 조건식별 전체 이력 마스크 (종목·조건식·데이터 버전별로 한 번만 계산)
+                            masks = load_condition_masks(code, strategy_conditions, DATA_FOLDER, columns=strategy_cols, backend=backend, engine=engine)
+                            date_col = "date"
                             
                             # D-1까지의 데이터로 조건 평가
-                            df_until_yesterday = df[df[date_col] <= pd.to_datetime(yesterday)].copy()
+                            df_until_yesterday = PointInTime(df).until(yesterday)
                             if len(df_until_yesterday) > 0:
                                 # 조건 평가
                                 conditions_satisfied = 0
                                 required_satisfied = True
                                 
-                                for cond, req in zip(conditions, required_flags):
+                                for cond, req in ordered_conditions:
                                     try:
-                                        # recent_high_Xpct feature들은 실시간 계산
-                                        if 'recent_high_8pct' in cond:
-                                            # 실시간으로 recent_high_8pct 계산
-                                            recent_high_8pct_value = calculate_recent_high_8pct(df, check_date)
-                                            
-                                            # 조건 평가 (recent_high_8pct == True 또는 recent_high_8pct == recent_high_8pct)
-                                            if 'recent_high_8pct == True' in cond or 'recent_high_8pct == recent_high_8pct' in cond:
-                                                condition_satisfied = recent_high_8pct_value
-                                            else:
-                                                condition_satisfied = not recent_high_8pct_value
-                                        elif 'recent_high_5pct' in cond:
-                                            # 실시간으로 recent_high_5pct 계산
-                                            recent_high_5pct_value = calculate_recent_high_5pct(df, check_date)
-                                            
-                                            # 조건 평가
-                                            if 'recent_high_5pct == True' in cond or 'recent_high_5pct == recent_high_5pct' in cond:
-                                                condition_satisfied = recent_high_5pct_value
-                                            else:
-                                                condition_satisfied = not recent_high_5pct_value
-                                        elif 'recent_high_3pct' in cond:
-                                            # 실시간으로 recent_high_3pct 계산
-                                            recent_high_3pct_value = calculate_recent_high_3pct(df, check_date)
-                                            
-                                            # 조건 평가
-                                            if 'recent_high_3pct == True' in cond or 'recent_high_3pct == recent_high_3pct' in cond:
-                                                condition_satisfied = recent_high_3pct_value
-                                            else:
-                                                condition_satisfied = not recent_high_3pct_value
-                                            
-                                            if req:  # 필수 조건
-                                                if not condition_satisfied:
-                                                    required_satisfied = False
-                                                    break
-                                            else:  # 선택 조건
-                                                if condition_satisfied:
-                                                    conditions_satisfied += 1
-                                        else:
-                                            # 기존 방식으로 조건 평가
-                                            if req:  # 필수 조건
-                                                if len(df_until_yesterday.query(cond)) == 0:
-                                                    required_satisfied = False
-                                                    break
-                                            else:  # 선택 조건
-                                                if len(df_until_yesterday.query(cond)) > 0:
-                                                    conditions_satisfied += 1
+                                        if req:  # 필수 조건
+                                            if not masks.any(df_until_yesterday, cond):
+                                                required_satisfied = False
+                                                break
+                                        else:  # 선택 조건
+                                            if masks.any(df_until_yesterday, cond):
+                                                conditions_satisfied += 1
                                     except Exception as e:
                                         st.warning(f"Error evaluating condition '{cond}' for {code}: {e}")
                                         if req:
@@ -728,11 +663,9 @@ if st.button("Run Analysis"):
                          st.write(f"📊 조건 만족 개수: {max_conditions}개")
                          
                          # 다음 거래일 찾기 (다음 리밸런싱일과 겹치지 않도록)
-                         next_trading_day = None
-                         for trading_date in trading_dates:
-                             if trading_date > check_date and trading_date < cycle_end:
-                                 next_trading_day = trading_date
-                                 break
+                         next_trading_day = calendar.next(check_date)
+                         if next_trading_day is not None and next_trading_day >= cycle_end:
+                             next_trading_day = None
                          
                          if next_trading_day:
                              # 다음날 시가로 매수
@@ -743,13 +676,8 @@ if st.button("Run Analysis"):
                              
                              for code in buy_codes:
                                  try:
-                                     df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                                     date_col = find_column(df, ['date', 'Date', '날짜'])
-                                     open_col = find_column(df, ['open', 'Open', '시가'])
-                                     df[date_col] = pd.to_datetime(df[date_col])
-                                     df_buy = df[df[date_col] == pd.to_datetime(next_trading_day)]
-                                     if len(df_buy) > 0:
-                                         open_price = df_buy.iloc[0][open_col]
+                                     open_price = panel.value(next_trading_day, code, "open")
+                                     if open_price is not None:
                                          shares = invest_per_stock / open_price if open_price > 0 else 0
                                          
                                          # 디버깅 로그 추가
@@ -818,7 +746,7 @@ if st.button("Run Analysis"):
                 total_sell = 0
                 
                 # 사이클 내 모든 거래일에서 매도 조건 체크
-                cycle_trading_dates = [d for d in trading_dates if cycle_start <= d < cycle_end]
+                cycle_trading_dates = calendar.range(cycle_start, cycle_end, include_end=False)
                 sold_codes = set()  # 이미 매도된 종목들
                 
                 for check_date in cycle_trading_dates:
@@ -827,17 +755,16 @@ if st.button("Run Analysis"):
                             continue
                             
                         try:
-                            df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                            date_col = find_column(df, ['date', 'Date', '날짜'])
-                            close_col = find_column(df, ['close', 'Close', '종가'])
-                            df[date_col] = pd.to_datetime(df[date_col])
+                            df = load_features(code, DATA_FOLDER, columns=strategy_cols, backend=backend)
+                            # 조건식별 전체 이력 마스크 (종목·조건식·데이터 버전별로 한 번만 계산)
+                            sell_masks = load_condition_masks(code, strategy_conditions, DATA_FOLDER, columns=strategy_cols, backend=backend, engine=engine)
+                            date_col = "date"
                             
                             # 해당 날짜의 데이터
-                            df_check = df[df[date_col] == pd.to_datetime(check_date)]
-                            if len(df_check) == 0:
+                            current_close = panel.value(check_date, code, "close")
+                            if current_close is None:
                                 continue
                             
-                            current_close = df_check.iloc[0][close_col]
                             position = stock_positions.get(code, {})
                             buy_price = position.get('buy_price', 0)
                             shares = position.get('shares', 0)
@@ -933,7 +860,7 @@ if st.button("Run Analysis"):
                             
                             # 보유 기간 중 매도 조건 체크
                             if sell_conditions:
-                                df_until_check = df[df[date_col] <= pd.to_datetime(check_date)].copy()
+                                df_until_check = PointInTime(df).until(check_date)
                                 if len(df_until_check) > 0:
                                     sell_conditions_satisfied = 0
                                     sell_required_satisfied = True
@@ -941,11 +868,11 @@ if st.button("Run Analysis"):
                                     for sell_cond, sell_req in zip(sell_conditions, sell_required_flags):
                                         try:
                                             if sell_req:  # 필수 매도 조건
-                                                if len(df_until_check.query(sell_cond)) == 0:
+                                                if not sell_masks.any(df_until_check, sell_cond):
                                                     sell_required_satisfied = False
                                                     break
                                             else:  # 선택 매도 조건
-                                                if len(df_until_check.query(sell_cond)) > 0:
+                                                if sell_masks.any(df_until_check, sell_cond):
                                                     sell_conditions_satisfied += 1
                                         except Exception:
                                             if sell_req:
@@ -955,18 +882,12 @@ if st.button("Run Analysis"):
                                     # 매도 조건 만족 시 매도 (다음날 시가로 매도)
                                     if sell_required_satisfied and sell_conditions_satisfied >= min_satisfied_sell_conditions:
                                         # 다음 거래일 찾기
-                                        next_trading_day = None
-                                        for trading_date in trading_dates:
-                                            if trading_date > check_date:
-                                                next_trading_day = trading_date
-                                                break
+                                        next_trading_day = calendar.next(check_date)
                                         
                                         if next_trading_day:
                                             # 다음날 시가로 매도
-                                            df_next = df[df[date_col] == pd.to_datetime(next_trading_day)]
-                                            if len(df_next) > 0:
-                                                open_col = find_column(df, ['open', 'Open', '시가'])
-                                                next_open = df_next.iloc[0][open_col]
+                                            next_open = panel.value(next_trading_day, code, "open")
+                                            if next_open is not None:
                                                 sell_price = next_open * (1 - 0.0035)  # 수수료 적용
                                                 profit_pct = ((sell_price - buy_price) / buy_price) * 100
                                                 profit_amount = (sell_price - buy_price) * shares
@@ -997,13 +918,8 @@ if st.button("Run Analysis"):
                 # 리밸런싱일 시가로 남은 종목들 매도
                 for code in held_stocks[:]:
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        open_col = find_column(df, ['open', 'Open', '시가'])
-                        df[date_col] = pd.to_datetime(df[date_col])
-                        df_sell = df[df[date_col] == pd.to_datetime(cycle_end)]
-                        if len(df_sell) > 0:
-                            open_price = df_sell.iloc[0][open_col]
+                        open_price = panel.value(cycle_end, code, "open")
+                        if open_price is not None:
                             sell_price = open_price * (1 - 0.0035)
                             position = stock_positions.get(code, {})
                             buy_price = position.get('buy_price', 0)
@@ -1040,17 +956,11 @@ if st.button("Run Analysis"):
                     current_portfolio_value = 0
                     for code in held_stocks:
                         try:
-                            df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                            date_col = find_column(df, ['date', 'Date', '날짜'])
-                            close_col = find_column(df, ['close', 'Close', '종가'])
-                            df[date_col] = pd.to_datetime(df[date_col])
-                            
                             # 사이클 마지막 거래일의 종가로 계산
-                            last_trading_date = max([d for d in trading_dates if cycle_start <= d < cycle_end])
-                            df_last = df[df[date_col] == pd.to_datetime(last_trading_date)]
+                            last_trading_date = max(calendar.range(cycle_start, cycle_end, include_end=False))
+                            current_close = panel.value(last_trading_date, code, "close")
                             
-                            if len(df_last) > 0:
-                                current_close = df_last.iloc[0][close_col]
+                            if current_close is not None:
                                 position = stock_positions.get(code, {})
                                 shares = position.get('shares', 0)
                                 current_portfolio_value += current_close * shares
@@ -1195,17 +1105,17 @@ if st.button("Run Analysis"):
             kodex_code = "069500"
             for i, rebalancing_date in enumerate(evaluation_dates):
                 try:
-                    df_kodex = pd.read_csv(os.path.join(DATA_FOLDER, f"{kodex_code}_features.csv"))
-                    date_col = find_column(df_kodex, ['date', 'Date', '날짜'])
-                    open_col = find_column(df_kodex, ['open', 'Open', '시가'])
-                    df_kodex[date_col] = pd.to_datetime(df_kodex[date_col])
-                    df_rebal = df_kodex[df_kodex[date_col] == pd.to_datetime(rebalancing_date)]
+                    df_kodex = load_features(kodex_code, DATA_FOLDER, columns=ENGINE_COLUMNS, backend=backend)
+                    date_col = "date"
+                    kodex_pit = PointInTime(df_kodex)
+                    open_col = "open"
+                    df_rebal = kodex_pit.on(rebalancing_date)
                     if len(df_rebal) > 0:
                         open_price = df_rebal.iloc[0][open_col]
                         # 매도 시 수수료 적용 (이전 cycle에서 매도)
                         if i > 0:
                             prev_rebal = evaluation_dates[i-1]
-                            df_prev = df_kodex[df_kodex[date_col] == pd.to_datetime(prev_rebal)]
+                            df_prev = kodex_pit.on(prev_rebal)
                             if len(df_prev) > 0:
                                 prev_open = df_prev.iloc[0][open_col]
                                 # 매도 시 수수료 적용
@@ -1230,66 +1140,40 @@ if st.button("Run Analysis"):
                     yesterday = rebalancing_date - dt.timedelta(days=1)
                     equal_stock_condition_counts = []
                     
-                    for code in selected_codes:
+                    # 아직 데이터가 시작되지 않은 종목은 파일을 열지 않고 건너뜀
+                    listed_codes = universe.listed_codes(selected_codes, yesterday)
+                    if condition_index is not None:
+                        # 필수 조건 AND / 선택 조건 개수를 비트 연산으로 한 번에 계산
+                        for code, count in condition_index.select(yesterday, required_conditions, optional_conditions, min_satisfied_conditions, listed_codes):
+                            equal_stock_condition_counts.append({
+                                'code': code,
+                                'conditions_satisfied': count,
+                                'required_satisfied': True
+                            })
+                        listed_codes = []  # 종목별 평가 생략
+                    for code in listed_codes:
                         try:
-                            df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                            date_col = find_column(df, ['date', 'Date', '날짜'])
-                            df[date_col] = pd.to_datetime(df[date_col])
+                            df = load_features(code, DATA_FOLDER, columns=strategy_cols, backend=backend)
+                            # 조건식별 전체 이력 마스크 (종목·조건식·데이터 버전별로 한 번만 계산)
+                            masks = load_condition_masks(code, strategy_conditions, DATA_FOLDER, columns=strategy_cols, backend=backend, engine=engine)
+                            date_col = "date"
                             
                             # D-1까지의 데이터로 조건 평가
-                            df_until_yesterday = df[df[date_col] <= pd.to_datetime(yesterday)].copy()
+                            df_until_yesterday = PointInTime(df).until(yesterday)
                             if len(df_until_yesterday) > 0:
                                 # 조건 평가
                                 conditions_satisfied = 0
                                 required_satisfied = True
                                 
-                                for cond, req in zip(conditions, required_flags):
+                                for cond, req in ordered_conditions:
                                     try:
-                                        # recent_high_Xpct feature들은 실시간 계산
-                                        if 'recent_high_8pct' in cond:
-                                            # 실시간으로 recent_high_8pct 계산
-                                            recent_high_8pct_value = calculate_recent_high_8pct(df, rebalancing_date)
-                                            
-                                            # 조건 평가 (recent_high_8pct == True 또는 recent_high_8pct == recent_high_8pct)
-                                            if 'recent_high_8pct == True' in cond or 'recent_high_8pct == recent_high_8pct' in cond:
-                                                condition_satisfied = recent_high_8pct_value
-                                            else:
-                                                condition_satisfied = not recent_high_8pct_value
-                                        elif 'recent_high_5pct' in cond:
-                                            # 실시간으로 recent_high_5pct 계산
-                                            recent_high_5pct_value = calculate_recent_high_5pct(df, rebalancing_date)
-                                            
-                                            # 조건 평가
-                                            if 'recent_high_5pct == True' in cond or 'recent_high_5pct == recent_high_5pct' in cond:
-                                                condition_satisfied = recent_high_5pct_value
-                                            else:
-                                                condition_satisfied = not recent_high_5pct_value
-                                        elif 'recent_high_3pct' in cond:
-                                            # 실시간으로 recent_high_3pct 계산
-                                            recent_high_3pct_value = calculate_recent_high_3pct(df, rebalancing_date)
-                                            
-                                            # 조건 평가
-                                            if 'recent_high_3pct == True' in cond or 'recent_high_3pct == recent_high_3pct' in cond:
-                                                condition_satisfied = recent_high_3pct_value
-                                            else:
-                                                condition_satisfied = not recent_high_3pct_value
-                                            
-                                            if req:  # 필수 조건
-                                                if not condition_satisfied:
-                                                    required_satisfied = False
-                                                    break
-                                            else:  # 선택 조건
-                                                if condition_satisfied:
-                                                    conditions_satisfied += 1
-                                        else:
-                                            # 기존 방식으로 조건 평가
-                                            if req:  # 필수 조건
-                                                if len(df_until_yesterday.query(cond)) == 0:
-                                                    required_satisfied = False
-                                                    break
-                                            else:  # 선택 조건
-                                                if len(df_until_yesterday.query(cond)) > 0:
-                                                    conditions_satisfied += 1
+                                        if req:  # 필수 조건
+                                            if not masks.any(df_until_yesterday, cond):
+                                                required_satisfied = False
+                                                break
+                                        else:  # 선택 조건
+                                            if masks.any(df_until_yesterday, cond):
+                                                conditions_satisfied += 1
                                     except Exception as e:
                                         st.warning(f"Error evaluating condition '{cond}' for {code}: {e}")
                                         if req:
@@ -1314,19 +1198,13 @@ if st.button("Run Analysis"):
                     invest_per_stock = equal_equity[-1] / len(codes_this_cycle)
                     total_value = 0
                     for code in codes_this_cycle:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        open_col = find_column(df, ['open', 'Open', '시가'])
-                        df[date_col] = pd.to_datetime(df[date_col])
-                        df_rebal = df[df[date_col] == pd.to_datetime(rebalancing_date)]
-                        if len(df_rebal) > 0:
-                            open_price = df_rebal.iloc[0][open_col]
+                        open_price = panel.value(rebalancing_date, code, "open")
+                        if open_price is not None:
                             # 매도 시 수수료 적용 (이전 cycle에서 매도)
                             if i > 0:
                                 prev_rebal = evaluation_dates[i-1]
-                                df_prev = df[df[date_col] == pd.to_datetime(prev_rebal)]
-                                if len(df_prev) > 0:
-                                    prev_open = df_prev.iloc[0][open_col]
+                                prev_open = panel.value(prev_rebal, code, "open")
+                                if prev_open is not None:
                                     ret = (open_price * (1-0.0035) - prev_open) / prev_open
                                     total_value += invest_per_stock * (1 + ret)
                             else:
@@ -1443,3 +1321,9 @@ if st.button("Run Analysis"):
                     height=300,
                     help="내부 디버깅용 로그입니다"
                 )
+
+        # 백엔드/엔진별 속도 비교용 실행 시간
+        st.sidebar.caption(f"실행 시간: {time.perf_counter() - run_started:.2f}초 ({backend.name}, {engine})")
+        # 공통 부분식 재사용으로 줄어든 조건식 연산 횟수
+        dag = condition_dag(conditions + sell_conditions)
+        st.sidebar.caption(f"공통 부분식: 종목당 연산 {dag.operations}회 → {dag.unique}회 ({dag.saved}회 절약)")
@@ -1,176 +1,19 @@
 import streamlit as st
 import pandas as pd
 import os
-from glob import glob
 import datetime as dt
+import time
 import traceback
 
-def find_column(df, target_names):
-    for col in df.columns:
-        if col.strip().lower() in [name.lower() for name in target_names]:
-            return col
-    return None
-
-def calculate_returns(df, date_col, close_col):
-    """상승률을 계산하는 함수"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df.sort_values(date_col)
-    
-    # 3일, 20일, 60일 상승률 계산
-    df['return_3d'] = df[close_col].pct_change(3) * 100
-    df['return_20d'] = df[close_col].pct_change(20) * 100
-    df['return_60d'] = df[close_col].pct_change(60) * 100
-    
-    return df
-
-def calculate_returns_until_date(df, date_col, close_col, target_date):
-    """특정 날짜까지의 데이터만 사용하여 상승률을 계산하는 함수"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df.sort_values(date_col)
-    
-    # target_date까지의 데이터만 사용
-    df_filtered = df[df[date_col] <= pd.to_datetime(target_date)].copy()
-    
-    if len(df_filtered) == 0:
-        return df
-    
-    # 3일, 20일, 60일 상승률 계산
-    df_filtered['return_3d'] = df_filtered[close_col].pct_change(3) * 100
-    df_filtered['return_20d'] = df_filtered[close_col].pct_change(20) * 100
-    df_filtered['return_60d'] = df_filtered[close_col].pct_change(60) * 100
-    
-    # 원본 데이터프레임에 결과 추가
-    result_df = df.copy()
-    for col in ['return_3d', 'return_20d', 'return_60d']:
-        if col in df_filtered.columns:
-            result_df[col] = df_filtered[col]
-    
-    return result_df
-
-def calculate_relative_momentum(df_stock, df_benchmark, date_col, close_col, periods=[20, 60, 120]):
-    """KODEX 200에 대한 상대 모멘텀을 계산하는 함수"""
-    df = df_stock.copy()
-    df_bm = df_benchmark.copy()
-    
-    # 날짜 컬럼 찾기
-    bm_date_col = find_column(df_bm, ['date', 'Date', '날짜'])
-    bm_close_col = find_column(df_bm, ['close', 'Close', '종가'])
-    
-    df[date_col] = pd.to_datetime(df[date_col])
-    df_bm[bm_date_col] = pd.to_datetime(df_bm[bm_date_col])
-    
-    # 날짜 기준으로 병합
-    merged = pd.merge(
-        df[[date_col, close_col]], 
-        df_bm[[bm_date_col, bm_close_col]].rename(columns={bm_date_col: date_col, bm_close_col: "bm_close"}), 
-        on=date_col, 
-        how="inner"
-    )
-    
-    # 각 기간별 상대 모멘텀 계산
-    for period in periods:
-        merged[f"rel_mom_{period}"] = (
-            (merged[close_col] / merged[close_col].shift(period)) /
-            (merged["bm_close"] / merged["bm_close"].shift(period)) - 1
-        ) * 100  # 백분율로 변환
-    
-    # 원본 데이터프레임에 상대 모멘텀 컬럼 추가 (날짜 기준으로 매핑)
-    result_df = df.copy()
-    for period in periods:
-        # 날짜를 키로 사용하여 매핑
-        merged_subset = merged[[date_col, f"rel_mom_{period}"]].set_index(date_col)
-        result_df[f"rel_mom_{period}"] = result_df[date_col].map(merged_subset[f"rel_mom_{period}"])
-    
-    return result_df
-
-def calculate_relative_momentum_until_date(df_stock, df_benchmark, date_col, close_col, target_date, periods=[20, 60, 120]):
-    """특정 날짜까지의 데이터만 사용하여 KODEX 200에 대한 상대 모멘텀을 계산하는 함수"""
-    df = df_stock.copy()
-    df_bm = df_benchmark.copy()
-    
-    # 날짜 컬럼 찾기
-    bm_date_col = find_column(df_bm, ['date', 'Date', '날짜'])
-    bm_close_col = find_column(df_bm, ['close', 'Close', '종가'])
-    
-    df[date_col] = pd.to_datetime(df[date_col])
-    df_bm[bm_date_col] = pd.to_datetime(df_bm[bm_date_col])
-    
-    # target_date까지의 데이터만 사용
-    df_filtered = df[df[date_col] <= pd.to_datetime(target_date)].copy()
-    df_bm_filtered = df_bm[df_bm[bm_date_col] <= pd.to_datetime(target_date)].copy()
-    
-    if len(df_filtered) == 0 or len(df_bm_filtered) == 0:
-        return df
-    
-    # 날짜 기준으로 병합
-    merged = pd.merge(
-        df_filtered[[date_col, close_col]], 
-        df_bm_filtered[[bm_date_col, bm_close_col]].rename(columns={bm_date_col: date_col, bm_close_col: "bm_close"}), 
-        on=date_col, 
-        how="inner"
-    )
-    
-    # 각 기간별 상대 모멘텀 계산
-    for period in periods:
-        merged[f"rel_mom_{period}"] = (
-            (merged[close_col] / merged[close_col].shift(period)) /
-            (merged["bm_close"] / merged["bm_close"].shift(period)) - 1
-        ) * 100  # 백분율로 변환
-    
-    # 원본 데이터프레임에 상대 모멘텀 컬럼 추가 (날짜 기준으로 매핑)
-    result_df = df.copy()
-    for period in periods:
-        # 날짜를 키로 사용하여 매핑
-        merged_subset = merged[[date_col, f"rel_mom_{period}"]].set_index(date_col)
-        result_df[f"rel_mom_{period}"] = result_df[date_col].map(merged_subset[f"rel_mom_{period}"])
-    
-    return result_df
-
-def calculate_52week_high_low(df, date_col, close_col, high_col, low_col):
-    """52주 고점/저점을 계산하는 함수"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df.sort_values(date_col)
-    
-    # 52주(약 252거래일) 고점/저점 계산
-    df['high_52w'] = df[high_col].rolling(window=252, min_periods=1).max()
-    df['low_52w'] = df[low_col].rolling(window=252, min_periods=1).min()
-    
-    # 현재가 대비 52주 고점/저점 비율
-    df['high_52w_ratio'] = (df[close_col] / df['high_52w']) * 100
-    df['low_52w_ratio'] = (df[close_col] / df['low_52w']) * 100
-    
-    return df
-
-def calculate_52week_high_low_until_date(df, date_col, close_col, high_col, low_col, target_date):
-    """특정 날짜까지의 데이터만 사용하여 52주 고점/저점을 계산하는 함수"""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    df = df.sort_values(date_col)
-    
-    # target_date까지의 데이터만 사용
-    df_filtered = df[df[date_col] <= pd.to_datetime(target_date)].copy()
-    
-    if len(df_filtered) == 0:
-        return df
-    
-    # 52주(약 252거래일) 고점/저점 계산
-    df_filtered['high_52w'] = df_filtered[high_col].rolling(window=252, min_periods=1).max()
-    df_filtered['low_52w'] = df_filtered[low_col].rolling(window=252, min_periods=1).min()
-    
-    # 현재가 대비 52주 고점/저점 비율
-    df_filtered['high_52w_ratio'] = (df_filtered[close_col] / df_filtered['high_52w']) * 100
-    df_filtered['low_52w_ratio'] = (df_filtered[close_col] / df_filtered['low_52w']) * 100
-    
-    # 원본 데이터프레임에 결과 추가
-    result_df = df.copy()
-    for col in ['high_52w', 'low_52w', 'high_52w_ratio', 'low_52w_ratio']:
-        if col in df_filtered.columns:
-            result_df[col] = df_filtered[col]
-    
-    return result_df
+from condition_compiler import available_engines, condition_dag
+from derived_features import expand_derived_calls
+from feature_loader import load_features, load_condition_masks, list_feature_codes, strategy_columns, memory_report, warm_universe, ENGINE_COLUMNS, KODEX_CODE
+from feature_panel import load_feature_panel
+from feature_registry import load_feature_registry
+from feature_backend import available_backends, get_backend
+from point_in_time import PointInTime
+from trading_calendar import load_trading_calendar
+from universe_index import load_universe_index
 
 # 주식 종목 코드와 이름 매핑
 CODE_TO_NAME = {
@@ -207,40 +50,67 @@ DATA_FOLDER = os.path.dirname(__file__)
 st.set_page_config(page_title="Daily Trading Log App", layout="wide")
 st.title("Daily Trading Log App")
 
-# KODEX 200 데이터에서 거래일 추출
-def get_trading_dates():
-    try:
-        df_kodex = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
-        date_col = find_column(df_kodex, ['date', 'Date', '날짜'])
-        if date_col:
-            df_kodex[date_col] = pd.to_datetime(df_kodex[date_col])
-            trading_dates = df_kodex[date_col].dt.date.unique()
-            trading_dates = sorted(trading_dates)
-            return trading_dates
-        else:
-            st.error("날짜 컬럼을 찾을 수 없습니다.")
-            return []
-    except Exception as e:
-        st.error(f"KODEX 200 데이터 로드 중 오류: {e}")
-        return []
+# 계산 백엔드 (CSV 파싱/조건식 마스크 계산, 세션별 선택, 결과는 같고 속도만 다르다)
+st.sidebar.selectbox(
+    "계산 백엔드", available_backends(), key="backend",
+    help="polars 가 설치되어 있으면 선택할 수 있습니다. 결과는 pandas 와 같습니다.",
+)
+backend = get_backend(st.session_state["backend"])
 
-# 거래일 목록 가져오기
-trading_dates = get_trading_dates()
+# 조건식 마스크 계산 엔진 (auto 는 배열이 클 때만 numexpr, 결과는 같다)
+engine = st.sidebar.selectbox(
+    "조건식 계산 엔진", available_engines(), key="engine",
+    help="numexpr 가 설치되어 있으면 선택할 수 있습니다. 결과는 numpy 와 같습니다.",
+)
+
+# 시작 시 전체 종목 파일을 병렬로 미리 읽기 (세션당 한 번, 이후에는 공유 캐시 사용)
+if "warmup_timings" not in st.session_state:
+    warmup_codes = list_feature_codes(DATA_FOLDER)
+    warmup_progress = st.progress(0.0, text="종목 데이터 불러오는 중...")
+    warmup_started = dt.datetime.now()
+    st.session_state["warmup_timings"] = warm_universe(
+        warmup_codes, DATA_FOLDER, columns=ENGINE_COLUMNS, backend=backend,
+        on_progress=lambda done, total, result: warmup_progress.progress(
+            done / total, text=f"종목 데이터 불러오는 중... {done}/{total} ({result['종목']})"
+        ),
+    )
+    st.session_state["warmup_seconds"] = (dt.datetime.now() - warmup_started).total_seconds()
+    warmup_progress.empty()
+
+with st.expander("데이터 로딩 시간"):
+    warmup_timings = pd.DataFrame(st.session_state["warmup_timings"])
+    st.write(f"**전체 소요 시간**: {st.session_state['warmup_seconds']:.2f}초 ({len(warmup_timings)}개 파일)")
+    if len(warmup_timings) > 0:
+        st.dataframe(warmup_timings.sort_values("소요 시간(초)", ascending=False), hide_index=True)
+
+# 거래일 달력 (KODEX 200 기준, 파일이 없으면 거래 대상 종목 날짜의 합집합 - 제외 종목 위젯은 아래에 있으므로 세션 값 사용)
+excluded_codes = {name.split("(")[-1][:-1] for name in st.session_state.get("excluded_stocks", [])}
+calendar_codes = [code for code in list_feature_codes(DATA_FOLDER) if code not in excluded_codes]
+try:
+    calendar = load_trading_calendar(DATA_FOLDER, calendar_codes)
+except Exception as e:
+    st.error(f"거래일 달력 생성 중 오류: {e}")
+    calendar = None
+
+if calendar is not None and calendar.source != "KODEX 200":
+    st.warning("KODEX 200 데이터가 없어 거래 대상 종목의 거래일 합집합을 달력으로 사용합니다.")
+
+trading_dates = calendar.dates if calendar is not None else []
 
 if trading_dates:
     # 거래일 범위 계산
-    min_date = min(trading_dates)
-    max_date = max(trading_dates)
+    min_date = calendar.first
+    max_date = calendar.last
     
     # 2023년 7월 3일부터 2025년 6월 30일까지의 거래일 필터링
     start_limit = dt.date(2023, 7, 3)
     end_limit = dt.date(2025, 6, 30)
-    filtered_trading_dates = [d for d in trading_dates if start_limit <= d <= end_limit]
+    filtered_trading_dates = calendar.range(start_limit, end_limit)
     
     if filtered_trading_dates:
-        # 연도별, 월별, 일별로 거래일 그룹화
-        years = sorted(list(set(d.year for d in filtered_trading_dates)))
-        years_str = [str(year) for year in years]
+        # 연도별, 월별, 일별로 거래일 그룹화 (달력 캐시에 미리 계산됨)
+        date_groups = calendar.groups(start_limit, end_limit)
+        years_str = [str(year) for year in date_groups]
         
         # 시작일과 종료일 선택
         st.subheader("기간 선택")
@@ -251,13 +121,11 @@ if trading_dates:
         with col1:
             st.write("**시작일**")
             start_year = st.selectbox("연도", years_str, index=0, key="start_year")
-            start_year_dates = [d for d in filtered_trading_dates if d.year == int(start_year)]
-            start_months = sorted(list(set(d.month for d in start_year_dates)))
+            start_months = list(date_groups[int(start_year)])
             start_months_str = [f"{month:02d}월" for month in start_months]
             start_month = st.selectbox("월", start_months_str, key="start_month")
             start_month_num = int(start_month.replace("월", ""))
-            start_month_dates = [d for d in start_year_dates if d.month == start_month_num]
-            start_days = sorted(list(set(d.day for d in start_month_dates)))
+            start_days = date_groups[int(start_year)][start_month_num]
             start_days_str = [f"{day:02d}일" for day in start_days]
             start_day = st.selectbox("일", start_days_str, key="start_day")
             start_day_num = int(start_day.replace("일", ""))
@@ -266,13 +134,11 @@ if trading_dates:
         with col2:
             st.write("**종료일**")
             end_year = st.selectbox("연도", years_str, index=len(years_str)-1, key="end_year")
-            end_year_dates = [d for d in filtered_trading_dates if d.year == int(end_year)]
-            end_months = sorted(list(set(d.month for d in end_year_dates)))
+            end_months = list(date_groups[int(end_year)])
             end_months_str = [f"{month:02d}월" for month in end_months]
             end_month = st.selectbox("월", end_months_str, index=len(end_months_str)-1, key="end_month")
             end_month_num = int(end_month.replace("월", ""))
-            end_month_dates = [d for d in end_year_dates if d.month == end_month_num]
-            end_days = sorted(list(set(d.day for d in end_month_dates)))
+            end_days = date_groups[int(end_year)][end_month_num]
             end_days_str = [f"{day:02d}일" for day in end_days]
             end_day = st.selectbox("일", end_days_str, index=len(end_days_str)-1, key="end_day")
             end_day_num = int(end_day.replace("일", ""))
@@ -292,7 +158,7 @@ if trading_dates:
                 st.write(f"**선택된 기간**: {start_date} ~ {end_date}")
                 
                 # 선택된 기간의 거래일 수 계산
-                selected_trading_dates = [d for d in filtered_trading_dates if start_date <= d <= end_date]
+                selected_trading_dates = calendar.range(start_date, end_date)
                 st.write(f"**선택된 기간 거래일 수**: {len(selected_trading_dates)}일")
 
 # ==============================
@@ -300,8 +166,7 @@ if trading_dates:
 # ==============================
 st.subheader("주식 종목 선택")
 
-file_paths = sorted(glob(os.path.join(DATA_FOLDER, "*_features.csv")))
-stock_codes = [os.path.basename(p).split("_")[0] for p in file_paths]
+stock_codes = list_feature_codes(DATA_FOLDER)
 stock_names = [f"{CODE_TO_NAME.get(code, code)} ({code})" for code in stock_codes]
 
 # 기본값으로 모든 종목 선택
@@ -310,7 +175,7 @@ default_selected = stock_names.copy()
 # 제외할 종목 선택 (Opt-out)
 excluded_stocks = st.multiselect(
     "제외할 종목 선택 (기본값: 모든 종목 선택)", 
-    options=stock_names,
+    options=stock_names, key="excluded_stocks",
     help="선택한 종목들은 거래에서 제외됩니다. 아무것도 선택하지 않으면 모든 종목이 거래 대상입니다."
 )
 
@@ -322,6 +187,12 @@ st.write(f"**거래 대상 종목 수**: {len(selected_codes)}개")
 if selected_codes:
     st.write(f"**거래 대상**: {', '.join([CODE_TO_NAME.get(code, code) for code in selected_codes[:5]])}{'...' if len(selected_codes) > 5 else ''}")
 
+# 종목 메타데이터 색인 (첫/마지막 날짜, 행 수, 지표 warm-up 길이 - 데이터를 읽지 않음)
+universe = load_universe_index(DATA_FOLDER, stock_codes)
+if selected_codes:
+    with st.expander("종목 정보"):
+        st.dataframe(universe.summary(selected_codes, CODE_TO_NAME), hide_index=True)
+
 # ==============================
 # 초기 자금 설정
 # ==============================
@@ -389,6 +260,15 @@ for category, features in feature_categories.items():
         for feature in features:
             st.write(f"**{feature}**: {feature}")
 
+with st.expander("종목별 메모리 사용량"):
+    if st.button("메모리 사용량 계산", key="memory_report"):
+        report = memory_report(selected_codes, DATA_FOLDER)
+        if len(report) > 0:
+            st.dataframe(report, hide_index=True)
+            total_mb = report["메모리(MB)"].sum()
+            baseline_mb = report["float64 기준(MB)"].sum()
+            st.write(f"**합계**: {total_mb:.2f} MB (float64 기준 {baseline_mb:.2f} MB)")
+
 # ==============================
 # Buy 조건 설정
 # ==============================
@@ -410,7 +290,7 @@ num_buy_conditions = st.number_input("Buy 조건 개수", min_value=1, max_value
 for i in range(num_buy_conditions):
     buy_cond = st.text_input(f"Buy 조건 {i+1}", key=f"buy_cond_{i}", placeholder="Example: rsi < 30")
     if buy_cond.strip():
-        buy_conditions.append(buy_cond.strip())
+        buy_conditions.append(expand_derived_calls(buy_cond.strip()))
 
 # ==============================
 # Sell 조건 설정
@@ -426,7 +306,15 @@ num_sell_conditions = st.number_input("Sell 조건 개수", min_value=1, max_val
 for i in range(num_sell_conditions):
     sell_cond = st.text_input(f"Sell 조건 {i+1}", key=f"sell_cond_{i}", placeholder="Example: rsi > 80")
     if sell_cond.strip():
-        sell_conditions.append(sell_cond.strip())
+        sell_conditions.append(expand_derived_calls(sell_cond.strip()))
+
+# 파일에는 없고 전체 이력에 대해 한 번만 계산해서 붙이는 파생 feature (derived_features)
+computed_features = [feature for category in ["상승률 지표", "상대 모멘텀 지표", "52주 고점/저점 지표"] for feature in feature_categories[category]]
+
+# 조건식이 참조하는 feature 확인 (파일 헤더/캐시 메타데이터만 사용)
+feature_registry = load_feature_registry(DATA_FOLDER)
+for message in feature_registry.validate(buy_conditions + sell_conditions, selected_codes):
+    st.warning(f"조건 확인: {message}")
 
 # 추가 Sell 조건들
 st.write("**추가 Sell 조건**")
@@ -480,6 +368,7 @@ if st.button("Run Daily Trading Log"):
     if not selected_codes or not buy_conditions:
         st.warning("주식 종목과 Buy 조건을 설정해주세요.")
     else:
+        run_started = time.perf_counter()
         st.write("**선택된 종목**:", selected_codes)
         st.write("**Buy 조건**:", buy_conditions)
         if sell_conditions:
@@ -488,7 +377,7 @@ if st.button("Run Daily Trading Log"):
             st.write("**Sell 조건**: 없음 (추가 Sell 조건만 사용)")
         
         # 선택된 기간의 거래일만 필터링
-        selected_trading_dates = [d for d in filtered_trading_dates if start_date <= d <= end_date]
+        selected_trading_dates = calendar.range(start_date, end_date)
         st.write(f"**분석 기간**: {len(selected_trading_dates)}일")
         
         # 일일 거래 로그 생성
@@ -504,12 +393,20 @@ if st.button("Run Daily Trading Log"):
         # 수수료 설정
         commission_rate = 0.0035  # 0.35%
         
-        # KODEX 200 데이터 로드 (상대 모멘텀 계산용)
+        # 조건 평가용 데이터는 Buy/Sell 조건이 참조하는 컬럼과 OHLC 만 읽기
+        strategy_cols = strategy_columns(buy_conditions, sell_conditions)
+        # 상승률/상대 모멘텀/52주 고점·저점 (종목·데이터 버전별로 한 번만 계산)
+        strategy_cols += [feature for feature in computed_features if feature not in strategy_cols]
+
+        # KODEX 200 데이터 확인 (상대 모멘텀 계산용)
         try:
-            df_kodex = pd.read_csv(os.path.join(DATA_FOLDER, "069500_features.csv"))
+            load_features(KODEX_CODE, DATA_FOLDER, columns=ENGINE_COLUMNS, backend=backend)
         except Exception as e:
             st.error(f"KODEX 200 데이터 로드 실패: {e}")
             st.stop()
+
+        # 가격 조회용 날짜 × 종목 패널 (거래 대상 종목의 OHLC 만)
+        panel = load_feature_panel(DATA_FOLDER, selected_codes, ENGINE_COLUMNS)
         
         # 진행 상황 표시
         progress_bar = st.progress(0)
@@ -524,28 +421,19 @@ if st.button("Run Daily Trading Log"):
             if held_stocks:
                 for code, position in list(held_stocks.items()):
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        close_col = find_column(df, ['close', 'Close', '종가'])
-                        
-                        df[date_col] = pd.to_datetime(df[date_col])
+                        df = load_features(code, DATA_FOLDER, columns=strategy_cols, backend=backend)
+                        # 조건식별 전체 이력 마스크 (종목·조건식·데이터 버전별로 한 번만 계산)
+                        masks = load_condition_masks(code, buy_conditions + sell_conditions, DATA_FOLDER, columns=strategy_cols, backend=backend, engine=engine)
+                        date_col = "date"
+                        close_col = "close"
                         
-                        # 해당 날짜까지의 데이터만 사용하여 상승률 계산
-                        df = calculate_returns_until_date(df, date_col, close_col, trading_date)
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 상대 모멘텀 계산 (KODEX 200 대비)
-                        df = calculate_relative_momentum_until_date(df, df_kodex, date_col, close_col, trading_date)
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 52주 고점/저점 계산
-                        high_col = find_column(df, ['high', 'High', '고가'])
-                        low_col = find_column(df, ['low', 'Low', '저가'])
-                        if high_col and low_col:
-                            df = calculate_52week_high_low_until_date(df, date_col, close_col, high_col, low_col, trading_date)
+                        # 해당 날짜까지의 이력만 보는 뷰 (복사 없음, 이후 날짜 접근 불가)
+                        # 상승률/상대 모멘텀/52주 고점·저점은 load_features 가 전체 이력에 대해 한 번만 계산해서 붙여 둔다
+                        view = PointInTime(df).until(trading_date)
                         
                         # 해당 날짜의 종가
-                        df_today = df[df[date_col] == pd.to_datetime(trading_date)]
-                        if len(df_today) > 0:
-                            current_close = df_today.iloc[0][close_col]
+                        current_close = panel.value(trading_date, code, "close")
+                        if current_close is not None:
                             buy_price = position['buy_price']
                             shares = position['shares']
                             buy_amount = position['buy_amount']
@@ -555,7 +443,7 @@ if st.button("Run Daily Trading Log"):
                                 position['highest_price'] = current_close
                             
                             # Sell 조건 체크
-                            df_until_today = df[df[date_col] <= pd.to_datetime(trading_date)].copy()
+                            df_until_today = view
                             if len(df_until_today) > 0:
                                 sell_conditions_satisfied = 0
                                 sell_required_satisfied = True
@@ -565,7 +453,7 @@ if st.button("Run Daily Trading Log"):
                                 if sell_conditions:
                                     for sell_cond in sell_conditions:
                                         try:
-                                            if len(df_until_today.query(sell_cond)) > 0:
+                                            if masks.any(df_until_today, sell_cond):
                                                 sell_conditions_satisfied += 1
                                                 sell_reason = "Condition"
                                         except Exception as e:
@@ -607,40 +495,18 @@ if st.button("Run Daily Trading Log"):
             # 2. Sell 조건 만족 종목 매도
             if sell_candidates:
                 # 다음 거래일 찾기
-                next_trading_day = None
-                for trading_day in selected_trading_dates:
-                    if trading_day > trading_date:
-                        next_trading_day = trading_day
-                        break
+                next_trading_day = calendar.next(trading_date)
+                if next_trading_day is not None and next_trading_day > end_date:
+                    next_trading_day = None
                 
                 if next_trading_day:
                     # 매도 실행 (다음날 시가)
                     total_sell_amount = 0
                     for code, sell_reason in sell_candidates:
                         try:
-                            df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                            date_col = find_column(df, ['date', 'Date', '날짜'])
-                            close_col = find_column(df, ['close', 'Close', '종가'])
-                            open_col = find_column(df, ['open', 'Open', '시가'])
-                            
-                            df[date_col] = pd.to_datetime(df[date_col])
-                            
-                            # 해당 날짜까지의 데이터만 사용하여 상승률 계산
-                            df = calculate_returns_until_date(df, date_col, close_col, trading_date)
-                            
-                            # 해당 날짜까지의 데이터만 사용하여 상대 모멘텀 계산 (KODEX 200 대비)
-                            df = calculate_relative_momentum_until_date(df, df_kodex, date_col, close_col, trading_date)
-                            
-                            # 해당 날짜까지의 데이터만 사용하여 52주 고점/저점 계산
-                            high_col = find_column(df, ['high', 'High', '고가'])
-                            low_col = find_column(df, ['low', 'Low', '저가'])
-                            if high_col and low_col:
-                                df = calculate_52week_high_low_until_date(df, date_col, close_col, high_col, low_col, trading_date)
-                            
                             # 다음날 시가로 매도
-                            df_next = df[df[date_col] == pd.to_datetime(next_trading_day)]
-                            if len(df_next) > 0:
-                                open_price = df_next.iloc[0][open_col]
+                            open_price = panel.value(next_trading_day, code, "open")
+                            if open_price is not None:
                                 position = held_stocks[code]
                                 shares = position['shares']
                                 buy_price = position['buy_price']
@@ -683,32 +549,25 @@ if st.button("Run Daily Trading Log"):
                 # Buy 조건을 만족하는 종목 찾기
                 buy_candidates = []
                 
-                for code in selected_codes:
+                # 아직 데이터가 시작되지 않은 종목은 파일을 열지 않고 건너뜀
+                for code in universe.listed_codes(selected_codes, trading_date):
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        close_col = find_column(df, ['close', 'Close', '종가'])
-                        
-                        df[date_col] = pd.to_datetime(df[date_col])
+                        df = load_features(code, DATA_FOLDER, columns=strategy_cols, backend=backend)
+                        # 조건식별 전체 이력 마스크 (종목·조건식·데이터 버전별로 한 번만 계산)
+                        masks = load_condition_masks(code, buy_conditions + sell_conditions, DATA_FOLDER, columns=strategy_cols, backend=backend, engine=engine)
+                        date_col = "date"
+                        close_col = "close"
                         
-                        # 해당 날짜까지의 데이터만 사용하여 상승률 계산
-                        df = calculate_returns_until_date(df, date_col, close_col, trading_date)
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 상대 모멘텀 계산 (KODEX 200 대비)
-                        df = calculate_relative_momentum_until_date(df, df_kodex, date_col, close_col, trading_date)
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 52주 고점/저점 계산
-                        high_col = find_column(df, ['high', 'High', '고가'])
-                        low_col = find_column(df, ['low', 'Low', '저가'])
-                        if high_col and low_col:
-                            df = calculate_52week_high_low_until_date(df, date_col, close_col, high_col, low_col, trading_date)
+                        # 해당 날짜까지의 이력만 보는 뷰 (복사 없음, 이후 날짜 접근 불가)
+                        # 상승률/상대 모멘텀/52주 고점·저점은 load_features 가 전체 이력에 대해 한 번만 계산해서 붙여 둔다
+                        view = PointInTime(df).until(trading_date)
                         
                         # 해당 날짜까지의 데이터로 조건 평가
-                        df_until_today = df[df[date_col] <= pd.to_datetime(trading_date)].copy()
+                        df_until_today = view
                         if len(df_until_today) > 0:
                             # 디버깅: 상대 모멘텀 값 확인 (처음 몇 개 종목만)
                             if len(buy_candidates) == 0 and code in ['005930', '000660']:
-                                current_data = df_until_today[df_until_today[date_col] == pd.to_datetime(trading_date)]
+                                current_data = df_until_today.on(trading_date)
                                 if len(current_data) > 0 and 'rel_mom_20' in current_data.columns:
                                     rel_mom_value = current_data.iloc[0]['rel_mom_20']
                                     if not pd.isna(rel_mom_value):
@@ -724,7 +583,7 @@ if st.button("Run Daily Trading Log"):
                             
                             for buy_cond in buy_conditions:
                                 try:
-                                    if len(df_until_today.query(buy_cond)) > 0:
+                                    if masks.any(df_until_today, buy_cond):
                                         buy_conditions_satisfied += 1
                                 except Exception as e:
                                     buy_required_satisfied = False
@@ -738,7 +597,7 @@ if st.button("Run Daily Trading Log"):
                             if sell_conditions:
                                 for sell_cond in sell_conditions:
                                     try:
-                                        if len(df_until_today.query(sell_cond)) > 0:
+                                        if masks.any(df_until_today, sell_cond):
                                             sell_conditions_satisfied += 1
                                     except Exception as e:
                                         sell_required_satisfied = False
@@ -752,7 +611,7 @@ if st.button("Run Daily Trading Log"):
                                     st.write(f"  - Buy 조건 만족 수: {buy_conditions_satisfied}/{len(buy_conditions)}")
                                     st.write(f"  - Sell 조건 만족 수: {sell_conditions_satisfied}")
                                     # 현재 날짜의 rel_mom_20 값 확인
-                                    current_data = df_until_today[df_until_today[date_col] == pd.to_datetime(trading_date)]
+                                    current_data = df_until_today.on(trading_date)
                                     if len(current_data) > 0 and 'rel_mom_20' in current_data.columns:
                                         rel_mom_value = current_data.iloc[0]['rel_mom_20']
                                         st.write(f"  - rel_mom_20 값: {rel_mom_value}")
@@ -769,7 +628,7 @@ if st.button("Run Daily Trading Log"):
                                     st.write(f"  - Buy 조건 만족 수: {buy_conditions_satisfied}/{len(buy_conditions)}")
                                     st.write(f"  - Sell 조건 만족 수: {sell_conditions_satisfied}")
                                     # 현재 날짜의 rel_mom_20 값 확인
-                                    current_data = df_until_today[df_until_today[date_col] == pd.to_datetime(trading_date)]
+                                    current_data = df_until_today.on(trading_date)
                                     if len(current_data) > 0 and 'rel_mom_20' in current_data.columns:
                                         rel_mom_value = current_data.iloc[0]['rel_mom_20']
                                         st.write(f"  - rel_mom_20 값: {rel_mom_value}")
@@ -780,39 +639,17 @@ if st.button("Run Daily Trading Log"):
                 # Buy 조건 만족 종목이 있으면 다음날 매수
                 if buy_candidates:
                     # 다음 거래일 찾기
-                    next_trading_day = None
-                    for trading_day in selected_trading_dates:
-                        if trading_day > trading_date:
-                            next_trading_day = trading_day
-                            break
+                    next_trading_day = calendar.next(trading_date)
+                    if next_trading_day is not None and next_trading_day > end_date:
+                        next_trading_day = None
                     
                     if next_trading_day:
                         # 매수 실행 (다음날 시가)
                         for code in buy_candidates:
                             try:
-                                df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                                date_col = find_column(df, ['date', 'Date', '날짜'])
-                                close_col = find_column(df, ['close', 'Close', '종가'])
-                                open_col = find_column(df, ['open', 'Open', '시가'])
-                                
-                                df[date_col] = pd.to_datetime(df[date_col])
-                                
-                                # 해당 날짜까지의 데이터만 사용하여 상승률 계산
-                                df = calculate_returns_until_date(df, date_col, close_col, trading_date)
-                                
-                                # 해당 날짜까지의 데이터만 사용하여 상대 모멘텀 계산 (KODEX 200 대비)
-                                df = calculate_relative_momentum_until_date(df, df_kodex, date_col, close_col, trading_date)
-                                
-                                # 해당 날짜까지의 데이터만 사용하여 52주 고점/저점 계산
-                                high_col = find_column(df, ['high', 'High', '고가'])
-                                low_col = find_column(df, ['low', 'Low', '저가'])
-                                if high_col and low_col:
-                                    df = calculate_52week_high_low_until_date(df, date_col, close_col, high_col, low_col, trading_date)
-                                
                                 # 다음날 시가로 매수
-                                df_next = df[df[date_col] == pd.to_datetime(next_trading_day)]
-                                if len(df_next) > 0:
-                                    open_price = df_next.iloc[0][open_col]
+                                open_price = panel.value(next_trading_day, code, "open")
+                                if open_price is not None:
                                     # 종목별 최대 투자 비율 적용
                                     max_buy_amount = current_capital * (max_investment_ratio / 100)
                                     buy_amount = min(current_capital / len(buy_candidates), max_buy_amount)
@@ -857,28 +694,9 @@ if st.button("Run Daily Trading Log"):
             if held_stocks:
                 for code, position in held_stocks.items():
                     try:
-                        df = pd.read_csv(os.path.join(DATA_FOLDER, f"{code}_features.csv"))
-                        date_col = find_column(df, ['date', 'Date', '날짜'])
-                        close_col = find_column(df, ['close', 'Close', '종가'])
-                        
-                        df[date_col] = pd.to_datetime(df[date_col])
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 상승률 계산
-                        df = calculate_returns_until_date(df, date_col, close_col, trading_date)
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 상대 모멘텀 계산 (KODEX 200 대비)
-                        df = calculate_relative_momentum_until_date(df, df_kodex, date_col, close_col, trading_date)
-                        
-                        # 해당 날짜까지의 데이터만 사용하여 52주 고점/저점 계산
-                        high_col = find_column(df, ['high', 'High', '고가'])
-                        low_col = find_column(df, ['low', 'Low', '저가'])
-                        if high_col and low_col:
-                            df = calculate_52week_high_low_until_date(df, date_col, close_col, high_col, low_col, trading_date)
-                        
                         # 해당 날짜의 종가
-                        df_today = df[df[date_col] == pd.to_datetime(trading_date)]
-                        if len(df_today) > 0:
-                            current_close = df_today.iloc[0][close_col]
+                        current_close = panel.value(trading_date, code, "close")
+                        if current_close is not None:
                             buy_price = position['buy_price']
                             shares = position['shares']
                             buy_amount = position['buy_amount']
@@ -972,3 +790,9 @@ if st.button("Run Daily Trading Log"):
                 use_container_width=True
 
             )
+
+        # 백엔드/엔진별 속도 비교용 실행 시간
+        st.sidebar.caption(f"실행 시간: {time.perf_counter() - run_started:.2f}초 ({backend.name}, {engine})")
+        # 공통 부분식 재사용으로 줄어든 조건식 연산 횟수
+        dag = condition_dag(buy_conditions + sell_conditions)
+        st.sidebar.caption(f"공통 부분식: 종목당 연산 {dag.operations}회 → {dag.unique}회 ({dag.saved}회 절약)")
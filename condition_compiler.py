@@ -0,0 +1,546 @@
+import ast
+import io
+import threading
+import tokenize
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import numexpr as ne
+except ImportError:  # numexpr 가 없으면 numpy 로만 계산한다
+    ne = None
+
+ENGINES = ("auto", "numpy", "numexpr")
+MAX_CACHED_MASKS = 8192  # ConditionCache 가 보관할 최대 마스크 수 (넘으면 가장 오래 안 쓴 것부터 버림)
+NUMEXPR_MIN_SIZE = 1 << 16  # 이보다 작은 배열은 numexpr 호출 비용이 더 커서 numpy 로 계산 (auto)
+_NUMEXPR_DTYPES = (np.dtype("float32"), np.dtype("float64"))
+
+
+def available_engines():
+    """설치된 패키지로 사용할 수 있는 조건식 계산 엔진 이름 목록"""
+    return [name for name in ENGINES if name != "numexpr" or ne is not None]
+
+
+def _rewrite_booleans(cond):
+    """pandas.query 처럼 & / | 를 and / or 로 바꾸는 함수 (비교보다 낮은 우선순위)"""
+    tokens = []
+    for tok in tokenize.generate_tokens(io.StringIO(cond).readline):
+        if tok.type == tokenize.OP and tok.string in ("&", "|"):
+            tokens.append((tokenize.NAME, "and" if tok.string == "&" else "or"))
+        else:
+            tokens.append((tok.type, tok.string))
+    return tokenize.untokenize(tokens)
+
+
+@lru_cache(maxsize=1024)
+def parse_condition(cond):
+    """
+    DataFrame.query 형식의 조건식을 한 번만 파싱해서 AST 로 돌려주는 함수
+
+    Returns:
+        tree: ast.Expression
+
+    Raises:
+        NotImplementedError: backtick 컬럼명, @변수 등 pandas.query 전용 문법
+        SyntaxError: 잘못된 조건식
+    """
+    if "`" in cond or "@" in cond:
+        raise NotImplementedError(cond)
+    try:
+        source = _rewrite_booleans(cond).strip()
+    except tokenize.TokenError as e:
+        raise SyntaxError(str(e)) from None
+    return ast.parse(source, mode="eval")
+
+
+_COMPARE = {
+    "Eq": np.equal,
+    "NotEq": np.not_equal,
+    "Lt": np.less,
+    "LtE": np.less_equal,
+    "Gt": np.greater,
+    "GtE": np.greater_equal,
+}
+
+_ARITH = {
+    "Add": np.add,
+    "Sub": np.subtract,
+    "Mult": np.multiply,
+    "Div": np.true_divide,
+    "Pow": np.power,
+}
+
+# 피연산자 순서를 바꿔도 결과가 비트 단위로 같은 연산 (a + b 와 b + a 는 같은 노드)
+_SYMMETRIC = {"Eq", "NotEq", "Add", "Mult"}
+# a < b 는 b > a 와 같은 노드 (NaN 비교 결과도 같음)
+_MIRRORED = {"Lt": "Gt", "LtE": "GtE"}
+
+_NUMEXPR_OPERATORS = {
+    "Eq": "==", "NotEq": "!=", "Lt": "<", "LtE": "<=", "Gt": ">", "GtE": ">=",
+    "Add": "+", "Sub": "-", "Mult": "*", "Div": "/",
+}
+
+
+def _ordered(keys):
+    return tuple(sorted(keys, key=repr))
+
+
+class ExpressionDAG:
+    """
+    여러 조건식을 하나의 식 DAG 로 묶어 공통 부분식을 한 번만 계산하는 평가기
+
+    노드는 (연산, 자식 노드...) 튜플로 식별하므로 sma20 > sma60 (매수) 와 sma20 < sma60 (매도) 의
+    sma20 / sma60, 여러 임계값 조건에 들어간 close / sma20 은 같은 노드가 된다.
+    교환 가능한 연산은 피연산자를 정렬하고 < / <= 는 > / >= 로 뒤집어서 같은 식이 같은 노드가 되게 한다.
+    evaluate(df) 는 노드마다 한 번만 numpy 로 계산하고 (NaN 비교는 False, != 만 True),
+    각 조건식의 결과는 따로 계산한 것과 같다.
+    배열이 크면 numexpr(설치되어 있을 때)로 조건식 전체를 블록 단위 멀티스레드로 계산해서
+    전체 크기 임시 배열을 만들지 않는다. numexpr 로 numpy 와 같은 결과를 보장할 수 없는 식
+    (컬럼 dtype 이 섞이거나 정수/bool 컬럼, ** 연산)은 numpy 로 계산한다.
+
+    Attributes:
+        prefix: 조건식의 이름 앞에 붙는 접두어 (예: "kodex_" 면 kodex_close 는 df["close"])
+        roots: {조건식: 루트 노드}
+        operations: 조건식을 하나씩 따로 계산할 때의 연산(컬럼·상수 제외) 횟수 합
+        unique: DAG 에서 실제로 계산하는 연산 노드 수
+    """
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self.roots = {}
+        self.operations = 0
+        self._nodes = set()
+
+    @property
+    def unique(self):
+        return len(self._nodes)
+
+    @property
+    def saved(self):
+        """공통 부분식을 재사용해서 줄어든 연산 횟수 (df 하나당)"""
+        return self.operations - self.unique
+
+    def add(self, cond, tree):
+        """
+        조건식을 DAG 에 추가하는 함수 (이미 있으면 그대로)
+
+        Raises:
+            NotImplementedError: numpy 로 계산하지 않는 문법 (pandas.query / eval 로 평가해야 함)
+        """
+        if cond in self.roots:
+            return self.roots[cond]
+        counted = []
+        root = self._boolean(tree.body, counted)
+        self.operations += len(counted)
+        self._nodes.update(counted)
+        self.roots[cond] = root
+        return root
+
+    def _operation(self, key, counted):
+        counted.append(key)
+        return key
+
+    def _boolean(self, node, counted):
+        if isinstance(node, ast.BoolOp):
+            kind = "and" if isinstance(node.op, ast.And) else "or"
+            children = [self._boolean(value, counted) for value in node.values]
+            return self._operation((kind, _ordered(children)), counted)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+            return self._operation(("not", self._boolean(node.operand, counted)), counted)
+        if isinstance(node, ast.Compare):
+            parts = []
+            left = self._value(node.left, counted)
+            for op, comparator in zip(node.ops, node.comparators):
+                name = type(op).__name__
+                if name not in _COMPARE:
+                    raise NotImplementedError(ast.dump(op))
+                right = self._value(comparator, counted)
+                if name in _MIRRORED:
+                    key = ("cmp", _MIRRORED[name], right, left)
+                elif name in _SYMMETRIC:
+                    key = ("cmp", name, *_ordered([left, right]))
+                else:
+                    key = ("cmp", name, left, right)
+                parts.append(self._operation(key, counted))
+                left = right
+            if len(parts) == 1:
+                return parts[0]
+            return self._operation(("and", _ordered(parts)), counted)  # a < b < c → (a < b) and (b < c)
+        raise NotImplementedError(ast.dump(node))
+
+    def _value(self, node, counted):
+        if isinstance(node, ast.Name):
+            return ("col", node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return ("const", type(node.value).__name__, node.value)
+        if isinstance(node, ast.BinOp) and type(node.op).__name__ in _ARITH:
+            name = type(node.op).__name__
+            operands = [self._value(node.left, counted), self._value(node.right, counted)]
+            if name in _SYMMETRIC:
+                operands = _ordered(operands)
+            return self._operation(("arith", name, *operands), counted)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return self._operation(("neg", self._value(node.operand, counted)), counted)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            return self._value(node.operand, counted)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "abs" \
+                and len(node.args) == 1 and not node.keywords:
+            return self._operation(("abs", self._value(node.args[0], counted)), counted)
+        raise NotImplementedError(ast.dump(node))
+
+    def _column(self, df, name):
+        """컬럼 배열 (작은 정수형은 int64 로: int8 플래그끼리 더하거나 상수를 곱해도 넘치지 않게)"""
+        series = df[name[len(self.prefix):]]
+        if not pd.api.types.is_numeric_dtype(series):
+            raise NotImplementedError(name)  # 날짜/문자열 비교는 pandas 에 맡긴다
+        values = series.to_numpy()
+        if values.dtype.kind in "iu" and values.dtype.itemsize < 8:
+            return values.astype(np.int64)
+        return values
+
+    def _compute(self, key, df, memo):
+        if key in memo:
+            return memo[key]
+        kind = key[0]
+        if kind == "col":
+            value = self._column(df, key[1])
+        elif kind == "const":
+            value = key[2]
+        elif kind in ("and", "or"):
+            reduce = np.logical_and if kind == "and" else np.logical_or
+            value = self._compute(key[1][0], df, memo)
+            for child in key[1][1:]:
+                value = reduce(value, self._compute(child, df, memo))
+        elif kind == "not":
+            value = np.logical_not(self._compute(key[1], df, memo))
+        elif kind == "cmp":
+            value = _COMPARE[key[1]](self._compute(key[2], df, memo), self._compute(key[3], df, memo))
+        elif kind == "arith":
+            value = _ARITH[key[1]](self._compute(key[2], df, memo), self._compute(key[3], df, memo))
+        elif kind == "neg":
+            value = np.negative(self._compute(key[1], df, memo))
+        else:
+            value = np.abs(self._compute(key[1], df, memo))
+        memo[key] = value
+        return value
+
+    def _numexpr_source(self, key, variables):
+        """노드를 numexpr 식 문자열로 바꾸는 함수 (컬럼/상수는 variables 에 넣고 변수 이름으로 참조)"""
+        kind = key[0]
+        if kind in ("col", "const"):
+            if key not in variables:
+                variables[key] = f"v{len(variables)}"
+            return variables[key]
+        if kind in ("and", "or"):
+            joiner = " & " if kind == "and" else " | "
+            return "(" + joiner.join(self._numexpr_source(child, variables) for child in key[1]) + ")"
+        if kind == "not":
+            return f"(~{self._numexpr_source(key[1], variables)})"
+        if kind == "neg":
+            return f"(-{self._numexpr_source(key[1], variables)})"
+        if kind == "abs":
+            return f"abs({self._numexpr_source(key[1], variables)})"
+        if key[1] not in _NUMEXPR_OPERATORS:
+            raise NotImplementedError(key[1])  # ** 는 numexpr 의 거듭제곱 구현이 numpy 와 달라질 수 있음
+        left = self._numexpr_source(key[2], variables)
+        right = self._numexpr_source(key[3], variables)
+        return f"({left} {_NUMEXPR_OPERATORS[key[1]]} {right})"
+
+    def _numexpr(self, key, df, memo):
+        """
+        조건식 하나를 numexpr 로 계산하는 함수
+
+        모든 컬럼이 같은 실수 dtype 일 때만 계산한다. 상수는 그 dtype 으로 바꿔서 넘기므로
+        numpy(NEP 50: float32 배열과 Python 실수의 연산은 float32)와 같은 정밀도로 계산된다.
+
+        Raises:
+            NotImplementedError: numexpr 로 같은 결과를 보장할 수 없는 식 (numpy 로 계산)
+        """
+        variables = {}
+        source = self._numexpr_source(key, variables)
+        columns = {k: memo[k] if k in memo else self._column(df, k[1]) for k in variables if k[0] == "col"}
+        dtypes = {values.dtype for values in columns.values()}
+        if len(dtypes) != 1 or next(iter(dtypes)) not in _NUMEXPR_DTYPES:
+            raise NotImplementedError(str(dtypes))
+        memo.update(columns)
+        dtype = dtypes.pop()
+        local_dict = {
+            name: columns[k] if k[0] == "col" else dtype.type(k[2])
+            for k, name in variables.items()
+        }
+        return ne.evaluate(source, local_dict=local_dict, global_dict={})
+
+    def evaluate(self, df, conditions=None, engine="auto"):
+        """
+        조건식들을 전체 이력에 대해 한 번에 계산하는 함수 (공통 부분식은 한 번만 계산)
+
+        Args:
+            df: 데이터프레임
+            conditions: 계산할 조건식 목록 (None 이면 추가된 전체)
+            engine: "numpy", "numexpr" 또는 "auto" (numexpr 가 설치되어 있고 배열이 NUMEXPR_MIN_SIZE 이상이면 numexpr).
+                numexpr 로 계산할 수 없는 조건식은 numpy 로 계산한다.
+
+        Returns:
+            (masks, errors): {조건식: 행별 만족 여부 bool 배열}, {조건식: 계산할 수 없는 이유(예외)}
+        """
+        use_numexpr = ne is not None and (
+            engine == "numexpr" or (engine == "auto" and len(df) >= NUMEXPR_MIN_SIZE)
+        )
+        memo = {}
+        masks, errors = {}, {}
+        with np.errstate(all="ignore"):
+            for cond in self.roots if conditions is None else conditions:
+                root = self.roots[cond]
+                try:
+                    result = None
+                    if use_numexpr and root not in memo:
+                        try:
+                            result = memo[root] = self._numexpr(root, df, memo)
+                        except (KeyError, NotImplementedError, SyntaxError, TypeError, ValueError):
+                            result = None  # numpy 로 계산 (오류도 numpy 쪽 결과를 그대로)
+                    if result is None:
+                        result = self._compute(root, df, memo)
+                except (KeyError, NotImplementedError, TypeError, ValueError) as e:
+                    errors[cond] = e
+                    continue
+                masks[cond] = np.broadcast_to(np.asarray(result, dtype=bool), (len(df),)).copy()
+        return masks, errors
+
+
+class CompiledCondition:
+    """
+    한 번 파싱해 둔 조건식
+
+    Attributes:
+        text: 원래 조건식 문자열
+        tree: ast.Expression
+        names: 조건식이 참조하는 컬럼명 (등장 순서)
+    """
+
+    def __init__(self, cond, tree=None):
+        self.text = cond
+        self.tree = parse_condition(cond) if tree is None else tree
+        calls = {id(node.func) for node in ast.walk(self.tree) if isinstance(node, ast.Call)}
+        names = {}
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Name) and id(node) not in calls:
+                names.setdefault(node.id, None)
+        self.names = tuple(names)
+
+    def missing(self, columns, prefix=""):
+        """columns 에 없는 참조 이름 목록 (prefix 를 지정하면 prefix 를 뗀 이름으로 찾는다)"""
+        return [
+            name for name in self.names
+            if not name.startswith(prefix) or name[len(prefix):] not in columns
+        ]
+
+    def evaluate(self, df, prefix=""):
+        """
+        전체 이력에 대해 조건식을 한 번에 계산하는 함수
+
+        Args:
+            df: 데이터프레임
+            prefix: 조건식의 이름 앞에 붙는 접두어 (예: "kodex_" 면 kodex_close 는 df["close"])
+
+        Returns:
+            mask: 행별 만족 여부 (bool 배열, df 와 같은 길이). len(df.query(cond)) > 0 은 mask.any() 와 같다.
+
+        Raises:
+            KeyError: df 에 없는 컬럼을 참조
+            NotImplementedError: numpy 로 계산하지 않는 문법/컬럼 (pandas.query 로 평가해야 함)
+        """
+        missing = self.missing(df.columns, prefix)
+        if missing:
+            raise KeyError(missing[0])
+        dag = ExpressionDAG(prefix)
+        dag.add(self.text, self.tree)
+        masks, errors = dag.evaluate(df)
+        if errors:
+            raise errors[self.text]
+        return masks[self.text]
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(cond):
+    """조건식 문자열 → CompiledCondition (문자열마다 한 번만 파싱)"""
+    return CompiledCondition(cond)
+
+
+@lru_cache(maxsize=256)
+def compile_expression(cond):
+    """
+    Python eval 형식의 조건식 → CompiledCondition (시장 보유 조건처럼 eval 로 평가하던 식용)
+
+    pandas.query 와 달리 & / | 를 and / or 로 바꾸지 않으므로 (eval 에서는 비트 연산)
+    & / | 가 들어간 식은 evaluate 에서 NotImplementedError 가 난다.
+    """
+    if "`" in cond or "@" in cond:
+        raise NotImplementedError(cond)
+    return CompiledCondition(cond, ast.parse(cond.strip(), mode="eval"))
+
+
+def condition_dag(conditions, prefix=""):
+    """
+    조건식 목록(매수 + 매도 등 한 전략의 조건식 전체)을 하나의 ExpressionDAG 로 묶는 함수
+
+    numpy 로 계산하지 않는 조건식은 빠진다 (pandas.query 로 평가됨).
+    dag.saved 가 종목(데이터프레임)마다 공통 부분식 재사용으로 줄어드는 연산 횟수다.
+    """
+    dag = ExpressionDAG(prefix)
+    for cond in conditions:
+        try:
+            dag.add(cond, compile_condition(cond).tree)
+        except (NotImplementedError, SyntaxError, TypeError, ValueError):
+            continue
+    return dag
+
+
+def first_true_index(mask):
+    """mask 가 처음 True 인 위치 (없으면 len(mask)). mask[:n].any() 는 first_true_index(mask) < n 과 같다."""
+    return int(mask.argmax()) if mask.any() else len(mask)
+
+
+class ConditionCache:
+    """
+    (종목 파일, 조건식) 별 전체 이력 마스크 저장소
+
+    데이터 버전(매니페스트의 내용 해시)이 같으면 다시 계산하지 않는다.
+    마스크와 함께 처음 True 가 되는 위치도 저장해서 "기준일까지 한 번이라도 만족" 을 O(1) 로 답한다.
+    최대 max_entries 개까지 보관하고, 넘으면 가장 오래 쓰지 않은 마스크부터 버린다
+    (파일이 바뀐 뒤 다시 쓰이지 않는 이전 버전 마스크도 이렇게 정리된다).
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_MASKS):
+        self.max_entries = max_entries
+        self._masks = OrderedDict()  # {(path, 조건식): (버전, mask, 첫 True 위치)}, 최근에 쓴 것이 뒤
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, version, n_rows):
+        """버전과 길이가 맞는 캐시 항목 (없으면 None, lock 안에서 호출)"""
+        cached = self._masks.get(key)
+        if cached is None or cached[0] != version or len(cached[1]) != n_rows:
+            return None
+        self._masks.move_to_end(key)
+        return cached
+
+    def _store(self, key, entry):
+        """항목을 저장하고 max_entries 를 넘으면 오래된 것부터 버리는 함수 (lock 안에서 호출)"""
+        self._masks[key] = entry
+        self._masks.move_to_end(key)
+        while len(self._masks) > self.max_entries:
+            self._masks.popitem(last=False)
+
+    def get(self, path, version, df, cond):
+        """
+        Returns:
+            (mask, first_true): 전체 이력 bool 마스크 (읽기 전용), 처음 True 인 위치 (없으면 len(df))
+        """
+        key = (path, cond)
+        with self._lock:
+            cached = self._lookup(key, version, len(df))
+        if cached is not None:
+            return cached[1], cached[2]
+
+        mask = compile_condition(cond).evaluate(df)
+        mask.setflags(write=False)
+        first_true = first_true_index(mask)
+        with self._lock:
+            self._store(key, (version, mask, first_true))
+        return mask, first_true
+
+    def get_many(self, path, version, df, conditions, engine="auto", evaluate=None):
+        """
+        여러 조건식의 마스크를 한 번에 가져오는 함수
+
+        캐시에 없는 조건식은 하나의 ExpressionDAG 로 묶어서 공통 부분식을 한 번만 계산한다.
+        engine 은 ExpressionDAG.evaluate 참고 (엔진과 관계없이 결과가 같으므로 캐시는 공유한다).
+        evaluate 를 주면 evaluate(df, 조건식 목록, engine) → {조건식: mask} 로 계산한다
+        (feature_backend 의 condition_masks, 결과는 DAG 와 같아야 한다).
+
+        Returns:
+            {조건식: (mask, first_true)} (conditions 순서). numpy 로 계산할 수 없는 조건식은 빠진다.
+        """
+        results, pending = {}, []
+        with self._lock:
+            for cond in conditions:
+                cached = self._lookup((path, cond), version, len(df))
+                if cached is not None:
+                    results[cond] = cached[1], cached[2]
+                else:
+                    pending.append(cond)
+        if pending:
+            if evaluate is None:
+                masks, _ = condition_dag(pending).evaluate(df, engine=engine)
+            else:
+                masks = evaluate(df, pending, engine)
+            with self._lock:
+                for cond, mask in masks.items():
+                    mask.setflags(write=False)
+                    results[cond] = mask, first_true_index(mask)
+                    self._store((path, cond), (version, *results[cond]))
+        return {cond: results[cond] for cond in conditions if cond in results}
+
+    def cached(self, path, version, n_rows, conditions):
+        """이미 계산된 마스크만 돌려주는 함수 (계산하지 않음). {조건식: mask}"""
+        found = {}
+        with self._lock:
+            for cond in conditions:
+                cached = self._lookup((path, cond), version, n_rows)
+                if cached is not None:
+                    found[cond] = cached[1]
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._masks.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_condition_cache():
+    """모든 Streamlit 세션이 공유하는 ConditionCache 인스턴스"""
+    return ConditionCache()
+
+
+def _query_any(frame, cond):
+    return len(frame.query(cond)) > 0
+
+
+class ConditionMasks:
+    """
+    한 종목의 조건식별 전체 이력 마스크
+
+    any(frame, cond) 는 frame(마스크를 만든 데이터프레임의 앞쪽 일부, 예: AsOfView)에서
+    조건을 만족하는 행이 있는지를 첫 True 위치와 frame 길이 비교 한 번으로 답한다.
+    (len(frame.query(cond)) > 0 과 같은 결과)
+    latest 에 든 조건식(그 날 하루의 상태를 나타내는 recent_high 같은 파생 feature 를 쓰는 조건식)은
+    frame 의 마지막 행에서만 본다.
+    마스크가 없는 조건식은 frame.query 로 평가한다.
+
+    Attributes:
+        masks: {조건식: 전체 이력 bool 마스크}
+        first_true: {조건식: 처음 True 인 위치 (없으면 마스크 길이)}
+        latest: 마지막 행에서만 평가하는 조건식 집합
+    """
+
+    def __init__(self, masks, first_true, latest=()):
+        self.masks = masks
+        self.first_true = first_true
+        self.latest = frozenset(latest)
+
+    def __contains__(self, cond):
+        return cond in self.masks
+
+    def any(self, frame, cond):
+        if cond in self.latest:
+            n = len(frame)
+            if cond in self.masks:
+                return n > 0 and bool(self.masks[cond][n - 1])
+            return _query_any(frame.iloc[n - 1:] if isinstance(frame, pd.DataFrame) else frame.last(), cond)
+        first_true = self.first_true.get(cond)
+        if first_true is None:
+            return _query_any(frame, cond)
+        return first_true < len(frame)
@@ -0,0 +1,321 @@
+import numpy as np
+import streamlit as st
+
+from feature_loader import DATA_FOLDER, data_signature, list_feature_codes, load_condition_masks, load_features
+from feature_panel import to_date
+
+
+def pack_bits(matrix):
+    """
+    (날짜 수, 종목 수) bool 행렬을 종목 축으로 64개씩 묶은 uint64 비트 행렬로 바꾸는 함수
+
+    Returns:
+        words: (날짜 수, ceil(종목 수 / 64)) uint64 배열. 종목 j 는 word j // 64 의 j % 64 번째 비트
+    """
+    n_dates, n_tickers = matrix.shape
+    n_words = max(1, -(-n_tickers // 64))
+    padded = np.zeros((n_dates, n_words * 64), dtype=bool)
+    padded[:, :n_tickers] = matrix
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8")
+
+
+def unpack_bits(words, n_tickers):
+    """uint64 비트 행(1차원)을 종목별 bool 배열로 되돌리는 함수"""
+    return np.unpackbits(np.ascontiguousarray(words, dtype="<u8").view(np.uint8), bitorder="little")[:n_tickers].astype(bool)
+
+
+class ConditionIndex:
+    """
+    날짜 × 종목 × 조건식 비트셋 색인
+
+    조건식마다 (날짜 수, 종목 수 / 64) 크기의 uint64 비트 행렬을 가진다.
+    필수 조건의 교집합은 word 단위 AND, 선택 조건 개수는 종목별 비트 합으로 계산하므로
+    한 날짜의 후보 선정이 종목·조건식 수만큼의 query 대신 배열 연산 몇 번으로 끝난다.
+    "d 에 조건 X 를 만족하는 종목" 같은 역방향 조회도 word 수(종목 수 / 64)에 비례한다.
+
+    Attributes:
+        dates: 날짜 배열 (datetime64[D], 오름차순, 종목 날짜의 합집합)
+        tickers: 종목 코드 목록 (비트 순서)
+        conditions: 색인된 조건식 목록
+        bits: {조건식: 해당 날짜 행이 조건을 만족하는 종목 비트 (uint64 행렬)}
+        present: 해당 날짜에 데이터가 있는 종목 비트 (uint64 행렬)
+        latest: {조건식: 해당 날짜까지 종목의 마지막 행이 조건을 만족하는 종목 비트 (uint64 행렬)}.
+            마지막 행에서만 평가하는 조건식(feature_loader.latest_only_conditions)만 들어 있다
+    """
+
+    def __init__(self, dates, tickers, bits, present, latest=None):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.conditions = list(bits)
+        self.bits = bits
+        self.present = present
+        self.latest = latest or {}
+        self._ticker_pos = {code: j for j, code in enumerate(self.tickers)}
+        self._ever = {}  # {조건식 또는 None(present): 누적 OR 비트 행렬}
+        self._selectivity = {}  # {조건식: 통과율}
+
+    def __contains__(self, cond):
+        return cond in self.bits
+
+    @property
+    def words(self):
+        return self.present.shape[1]
+
+    def row(self, d):
+        """d 이하의 마지막 날짜 행 위치 (없으면 -1)"""
+        return int(np.searchsorted(self.dates, np.datetime64(to_date(d), "D"), side="right")) - 1
+
+    def _cumulative(self, cond):
+        """첫 날짜부터 각 날짜까지 한 번이라도 참이었던 종목 비트 (한 번만 계산)"""
+        if cond not in self._ever:
+            source = self.present if cond is None else self.bits[cond]
+            self._ever[cond] = np.bitwise_or.accumulate(source, axis=0) if len(source) else source
+        return self._ever[cond]
+
+    def _empty(self):
+        return np.zeros(self.words, dtype="<u8")
+
+    def ever(self, cond, d):
+        """
+        d 까지(포함) 한 번이라도 조건을 만족한 종목 비트
+        (load_features(...) 를 d 까지 자른 프레임에 대한 ConditionMasks.any 와 같다.
+        latest 조건식은 d 까지의 마지막 행이 조건을 만족한 종목)
+        """
+        i = self.row(d)
+        if i < 0:
+            return self._empty()
+        return self.latest[cond][i] if cond in self.latest else self._cumulative(cond)[i]
+
+    def listed(self, d):
+        """d 까지(포함) 데이터가 한 행이라도 있는 종목 비트"""
+        return self.ever(None, d)
+
+    def between(self, cond, start, end):
+        """start <= 날짜 <= end 행 중 하나라도 조건을 만족한 종목 비트"""
+        lo = int(np.searchsorted(self.dates, np.datetime64(to_date(start), "D"), side="left"))
+        hi = self.row(end) + 1
+        if hi <= lo:
+            return self._empty()
+        return np.bitwise_or.reduce(self.bits[cond][lo:hi], axis=0)
+
+    def selectivity(self, cond):
+        """
+        색인 기간 전체에서 조건을 만족하는 (날짜, 종목) 행의 비율 (작을수록 많이 걸러냄)
+
+        데이터가 있는 행 수 대비 비율이며 조건식마다 한 번만 계산한다.
+        ("한 번이라도 만족" 누적 비트는 금방 거의 모든 종목이 켜져서 조건식 간 차이가 드러나지 않는다)
+        """
+        if cond not in self._selectivity:
+            listed = int(np.unpackbits(self.present.view(np.uint8)).sum())
+            passed = int(np.unpackbits(self.bits[cond].view(np.uint8)).sum())
+            self._selectivity[cond] = passed / listed if listed else 1.0
+        return self._selectivity[cond]
+
+    def order(self, conditions):
+        """조건식을 많이 걸러내는 순서(통과율 오름차순)로 정렬한 목록 (같으면 입력 순서)"""
+        return sorted(conditions, key=self.selectivity)
+
+    def required(self, conditions, d):
+        """
+        d 까지 필수 조건을 모두 만족한 종목 비트 (word 단위 AND)
+
+        많이 걸러내는 조건부터 AND 하고, 남은 종목이 없으면 나머지 조건은 보지 않는다.
+        """
+        result = self.listed(d).copy()
+        for cond in self.order(conditions):
+            if not result.any():
+                break
+            result &= self.ever(cond, d)
+        return result
+
+    def counts(self, conditions, d, among=None):
+        """
+        d 까지 만족한 조건식 개수 (종목별 정수 배열, 비트 합)
+
+        Args:
+            among: 셀 종목 비트 (None 이면 전체). 나머지 종목은 0
+        """
+        counts = np.zeros(len(self.tickers), dtype=np.int32)
+        if among is not None and not among.any():
+            return counts
+        for cond in conditions:
+            words = self.ever(cond, d) if among is None else self.ever(cond, d) & among
+            counts += unpack_bits(words, len(self.tickers))
+        return counts
+
+    def select_between(self, start, end, required=(), optional=(), codes=None):
+        """
+        start <= 날짜 <= end 행 중 하나라도 조건을 만족했는지로 후보 종목을 구하는 함수
+        (기간 안의 행에 대한 query 가 한 행이라도 있는지와 같다. 필수 조건이 없으면 모든 종목이 통과)
+
+        Returns:
+            candidates: [(종목, 선택 조건 만족 개수), ...] (codes 순서)
+        """
+        passed = np.full(len(self.tickers), True)
+        for cond in self.order(required):
+            if not passed.any():
+                break
+            passed &= unpack_bits(self.between(cond, start, end), len(self.tickers))
+        counts = np.zeros(len(self.tickers), dtype=np.int32)
+        for cond in optional:
+            counts += unpack_bits(self.between(cond, start, end), len(self.tickers))
+        return self._candidates(passed, counts, codes)
+
+    def last_rows(self, start, end):
+        """
+        start <= 날짜 <= end 중 종목별 마지막 데이터 행 위치 (그 기간에 행이 없으면 -1)
+
+        Args:
+            start: 시작일 (None 이면 처음부터)
+            end: 종료일 (포함)
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(to_date(start), "D"), side="left"))
+        hi = self.row(end) + 1
+        if hi <= lo:
+            return np.full(len(self.tickers), -1)
+        present = np.unpackbits(np.ascontiguousarray(self.present[lo:hi]).view(np.uint8), axis=1, bitorder="little")
+        present = present[:, :len(self.tickers)].astype(bool)
+        last = hi - 1 - present[::-1].argmax(axis=0)
+        return np.where(present.any(axis=0), last, -1)
+
+    def at(self, cond, rows):
+        """종목별로 rows 위치의 행이 조건을 만족하는지 (bool 배열, 위치가 -1 이면 False)"""
+        j = np.arange(len(self.tickers))
+        words = self.bits[cond][np.maximum(rows, 0), j // 64]
+        return (rows >= 0) & ((words >> (j % 64).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def select_at(self, rows, required=(), optional=(), codes=None):
+        """
+        종목별 한 행(last_rows 결과 등)에서 조건을 만족했는지로 후보 종목을 구하는 함수
+        (그 한 행에 대한 query 와 같다. 행이 없는 종목은 제외)
+
+        Returns:
+            candidates: [(종목, 선택 조건 만족 개수), ...] (codes 순서)
+        """
+        passed = rows >= 0
+        for cond in self.order(required):
+            if not passed.any():
+                break
+            passed &= self.at(cond, rows)
+        counts = np.zeros(len(self.tickers), dtype=np.int32)
+        for cond in optional:
+            counts += self.at(cond, rows)
+        return self._candidates(passed, counts, codes)
+
+    def _candidates(self, passed, counts, codes):
+        candidates = []
+        for code in self.tickers if codes is None else codes:
+            j = self._ticker_pos.get(code, -1)
+            if j >= 0 and passed[j]:
+                candidates.append((code, int(counts[j])))
+        return candidates
+
+    def members(self, words):
+        """비트가 켜진 종목 코드 목록 (0 인 word 는 건너뜀)"""
+        members = []
+        for w in np.flatnonzero(words):
+            bits = unpack_bits(words[w:w + 1], 64)
+            members.extend(self.tickers[w * 64 + b] for b in np.flatnonzero(bits) if w * 64 + b < len(self.tickers))
+        return members
+
+    def tickers_satisfying(self, cond, d):
+        """d 까지 조건식을 한 번이라도 만족한 종목 코드 목록 (latest 조건식은 d 까지의 마지막 행 기준)"""
+        return self.members(self.ever(cond, d) & self.listed(d))
+
+    def select(self, d, required=(), optional=(), min_optional=0, codes=None):
+        """
+        d 까지의 데이터로 후보 종목과 선택 조건 만족 개수를 구하는 함수
+
+        Args:
+            d: 기준일 (이 날짜까지 포함)
+            required: 필수 조건식 목록 (모두 한 번 이상 만족해야 함)
+            optional: 선택 조건식 목록 (만족한 개수를 센다)
+            min_optional: 선택 조건 최소 만족 개수
+            codes: 후보로 볼 종목 코드 목록 (None 이면 전체, 순서 유지)
+
+        Returns:
+            candidates: [(종목, 선택 조건 만족 개수), ...] (codes 순서)
+        """
+        passed_words = self.required(required, d)
+        passed = unpack_bits(passed_words, len(self.tickers))
+        counts = self.counts(optional, d, among=passed_words)  # 선택 조건은 필수 조건 통과 종목만
+        candidates = []
+        for code in self.tickers if codes is None else codes:
+            j = self._ticker_pos.get(code, -1)
+            if j >= 0 and passed[j] and counts[j] >= min_optional:
+                candidates.append((code, int(counts[j])))
+        return candidates
+
+
+def build_condition_index(codes, conditions, data_folder=DATA_FOLDER, columns=None, shared=(), engine="auto"):
+    """
+    종목별 조건식 마스크(load_condition_masks)를 하나의 날짜 × 종목 비트셋 색인으로 묶는 함수
+
+    Args:
+        codes: 종목 코드 목록
+        conditions: 조건식 문자열 목록
+        data_folder: feature 파일이 있는 폴더
+        columns: load_features 에 넘기는 columns (앱에서 쓰는 것과 같아야 함)
+        shared: 색인하지는 않지만 마스크를 함께 계산해 둘 조건식 (예: 매도 조건, 공통 부분식 재사용)
+        engine: 마스크 계산 엔진 (load_condition_masks 참고)
+
+    Returns:
+        index: ConditionIndex
+
+    Raises:
+        KeyError: 어떤 종목에서 마스크를 만들 수 없는 조건식이 있음 (pandas query 로 평가해야 함)
+    """
+    conditions = list(dict.fromkeys(conditions))
+    frames = {code: load_features(code, data_folder, columns=columns) for code in codes}
+    all_dates = [df["date"].values.astype("datetime64[D]") for df in frames.values()]
+    dates = np.unique(np.concatenate(all_dates)) if all_dates else np.array([], dtype="datetime64[D]")
+
+    present = np.zeros((len(dates), len(codes)), dtype=bool)
+    matrices = {cond: np.zeros((len(dates), len(codes)), dtype=bool) for cond in conditions}
+    latest = {}
+    for j, code in enumerate(codes):
+        rows = np.searchsorted(dates, frames[code]["date"].values.astype("datetime64[D]"))
+        present[rows, j] = True
+        # 합집합 날짜별 이 종목의 마지막 행 위치 (아직 행이 없으면 -1)
+        last_row = np.searchsorted(rows, np.arange(len(dates)), side="right") - 1
+        masks = load_condition_masks(code, conditions + list(shared), data_folder, columns=columns, engine=engine)
+        for cond in conditions:
+            if cond not in masks:
+                raise KeyError(cond)
+            matrices[cond][rows, j] = masks.masks[cond]
+            if cond in masks.latest:
+                matrix = latest.setdefault(cond, np.zeros((len(dates), len(codes)), dtype=bool))
+                matrix[:, j] = (last_row >= 0) & masks.masks[cond][np.maximum(last_row, 0)] if len(rows) else False
+
+    bits = {cond: pack_bits(matrix) for cond, matrix in matrices.items()}
+    latest = {cond: pack_bits(matrix) for cond, matrix in latest.items()}
+    return ConditionIndex(dates, codes, bits, pack_bits(present), latest)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _cached_index(codes, conditions, data_folder, columns, shared, signature, engine):
+    try:
+        return build_condition_index(list(codes), conditions, data_folder, columns, shared, engine)
+    except KeyError:
+        return None
+
+
+def load_condition_index(conditions, data_folder=DATA_FOLDER, codes=None, columns=None, shared=(), engine="auto"):
+    """
+    조건식 비트셋 색인을 캐시에서 가져오는 함수
+
+    Args:
+        conditions: 조건식 문자열 목록
+        data_folder: feature 파일이 있는 폴더
+        codes: 종목 코드 목록 (None 이면 폴더의 모든 종목)
+        columns: load_features 에 넘기는 columns (앱에서 쓰는 것과 같아야 함)
+        shared: 마스크를 함께 계산해 둘 조건식 (build_condition_index 참고)
+        engine: 마스크 계산 엔진 (load_condition_masks 참고)
+
+    Returns:
+        index: 종목 파일이 바뀌면 다시 만들어지는 ConditionIndex.
+            numpy 로 계산할 수 없는 조건식(문자열 비교, 없는 컬럼 등)이 있으면 None (종목별 평가 사용)
+    """
+    codes = tuple(codes) if codes is not None else tuple(list_feature_codes(data_folder))
+    columns = tuple(columns) if columns is not None else None
+    return _cached_index(codes, tuple(conditions), data_folder, columns, tuple(shared), data_signature(codes, data_folder, columns), engine)
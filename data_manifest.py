@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+
+from feature_cache import CACHE_DIRNAME, file_hash, refresh_cache
+
+MANIFEST_VERSION = 3  # 2: 첫 날짜, 3: 날짜 컬럼만 캐시
+MANIFEST_FILENAME = "manifest.json"
+
+
+def manifest_path(data_folder):
+    """데이터 폴더의 매니페스트 파일 경로"""
+    return os.path.join(data_folder, CACHE_DIRNAME, MANIFEST_FILENAME)
+
+
+class DataManifest:
+    """
+    종목 파일들의 버전 스냅샷
+
+    캐시 키로는 수정시각 대신 내용 해시를 사용하므로 touch 만 된 파일은 캐시를 무효화하지 않고,
+    한 종목 파일이 바뀌면 그 종목의 해시만 달라진다.
+
+    Attributes:
+        entries: {종목: {"size", "mtime_ns", "hash", "rows", "first_date", "last_date"}}
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @property
+    def codes(self):
+        return list(self.entries)
+
+    def version(self, code):
+        """종목 파일의 내용 해시 (없으면 None)"""
+        entry = self.entries.get(code)
+        return entry["hash"] if entry else None
+
+    def signature(self, codes=None):
+        """종목들의 내용 해시 튜플 (여러 종목을 합쳐 만드는 캐시의 키)"""
+        return tuple(self.version(code) for code in (self.codes if codes is None else codes))
+
+    def changed(self, other):
+        """other 스냅샷과 비교해서 내용이 바뀌었거나 새로 생긴 종목 목록"""
+        return [code for code in self.codes if other is None or other.version(code) != self.version(code)]
+
+
+class ManifestStore:
+    """
+    feature 파일별 (크기, 수정시각, 내용 해시, 행 수, 첫/마지막 날짜) 기록
+
+    크기와 수정시각이 기록과 같으면 파일을 열지 않고 기록을 그대로 쓴다.
+    다르면 Parquet 캐시를 갱신하면서(feature_cache.refresh_cache) 해시를 다시 구한다.
+    캐시가 없으면 날짜 컬럼만 파싱해서 캐시를 만들고, 나머지 컬럼은 실제로 읽을 때 요청된 것만 추가된다.
+    기록은 데이터 폴더의 캐시 폴더에 manifest.json 으로 저장되어 다음 실행에서도 재사용된다.
+    """
+
+    def __init__(self, parse_fn):
+        self.parse_fn = parse_fn
+        self._entries = {}  # {path: entry}
+        self._folders = set()  # manifest.json 을 읽어 둔 폴더
+        self._lock = threading.Lock()
+
+    def _load_folder(self, folder):
+        with self._lock:
+            if folder in self._folders:
+                return
+            self._folders.add(folder)
+        try:
+            with open(manifest_path(folder), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get("version") != MANIFEST_VERSION:
+            return
+        with self._lock:
+            for name, entry in saved.get("files", {}).items():
+                self._entries.setdefault(os.path.join(folder, name), entry)
+
+    def _save_folder(self, folder):
+        files = {
+            os.path.basename(path): entry
+            for path, entry in self._entries.items() if os.path.dirname(path) == folder
+        }
+        path = manifest_path(folder)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # 읽기 전용 폴더에서는 메모리에만 유지
+
+    def _scan(self, path, stat):
+        """파일을 읽어서 새 기록을 만드는 함수"""
+        meta = refresh_cache(path, self.parse_fn, columns=["date"])
+        if meta is not None:
+            return {
+                "size": meta["size"],
+                "mtime_ns": meta["mtime_ns"],
+                "hash": meta["hash"],
+                "rows": meta["rows"],
+                "first_date": meta["schema"]["date"]["first_valid"],
+                "last_date": meta["last_date"],
+            }
+        # pyarrow 가 없으면 CSV 를 직접 읽는다
+        df = self.parse_fn(path, columns=["date"])
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": file_hash(path),
+            "rows": len(df),
+            "first_date": str(df["date"].iloc[0].date()) if len(df) else None,
+            "last_date": str(df["date"].iloc[-1]) if len(df) else None,
+        }
+
+    def entry(self, path):
+        """
+        파일의 현재 기록 (바뀌었으면 다시 만든다)
+
+        Returns:
+            entry: {"size", "mtime_ns", "hash", "rows", "first_date", "last_date"}
+        """
+        folder = os.path.dirname(path)
+        self._load_folder(folder)
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._entries.get(path)
+        if cached is not None and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached
+
+        entry = self._scan(path, stat)
+        with self._lock:
+            self._entries[path] = entry
+            self._save_folder(folder)
+        return entry
+
+    def snapshot(self, paths):
+        """
+        여러 파일의 기록을 묶은 DataManifest
+
+        Args:
+            paths: {종목: 파일 경로}
+        """
+        return DataManifest({code: self.entry(path) for code, path in paths.items()})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._folders.clear()
@@ -0,0 +1,323 @@
+import ast
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from point_in_time import LookAheadError
+
+
+def _format_number(value):
+    """파라미터 값을 컬럼 이름에 쓸 수 있는 문자열로 (8 → "8", 2.5 → "2p5")"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value).replace(".", "p")
+
+
+def _parse_number(text):
+    value = float(text.replace("p", "."))
+    return int(value) if value.is_integer() else value
+
+
+class DerivedFeature:
+    """
+    파일에는 없고 원본 컬럼으로 전체 이력에 대해 한 번에 계산하는 파생 feature 정의
+
+    컬럼 이름에 파라미터가 들어 있어서 (예: recent_high_8pct_10d) 조건식에서 다른 컬럼과
+    똑같이 쓸 수 있고, name(인자...) 형식의 호출은 expand_derived_calls 가 컬럼 이름으로 바꾼다.
+    계산은 과거 행만 보는(인과적인) 연산이어야 한다. 그래야 전체 이력 결과를 어느 시점에서 잘라도
+    그 시점까지의 데이터로 계산한 값과 같다.
+
+    Attributes:
+        name: 함수 이름
+        pattern: 컬럼 이름 정규식 (이름 있는 그룹 = 파라미터, 없으면 기본값)
+        defaults: 파라미터 이름 → 기본값 (순서 = 함수 호출 인자 순서)
+        requires: 계산에 필요한 원본 컬럼 목록
+        compute: compute(df, **params) → 행별 값 (df 와 같은 길이)
+        column: column(**params) → 컬럼 이름
+        description: 설명
+        point_in_time: True 면 값이 그 날 하루의 상태를 나타내므로, 이 컬럼을 쓰는 조건식은
+            "이력 중 한 번이라도" 가 아니라 기준일의 마지막 행에서만 평가한다 (feature_loader.latest_only_conditions)
+    """
+
+    def __init__(self, name, pattern, defaults, requires, compute, column, description="", point_in_time=False):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.defaults = defaults
+        self.requires = list(requires)
+        self.compute = compute
+        self.column = column
+        self.description = description
+        self.point_in_time = point_in_time
+
+    def match(self, column):
+        """컬럼 이름이 이 feature 면 파라미터 딕셔너리 (아니면 None)"""
+        m = self.pattern.fullmatch(column)
+        if m is None:
+            return None
+        params = dict(self.defaults)
+        for key, value in m.groupdict().items():
+            if value is not None:
+                params[key] = _parse_number(value)
+        return params
+
+
+DERIVED_FEATURES = {}  # {함수 이름: DerivedFeature}
+
+
+def register_derived(feature):
+    """파생 feature 를 등록하는 함수 (같은 이름이면 덮어쓴다)"""
+    DERIVED_FEATURES[feature.name] = feature
+    return feature
+
+
+def find_derived(column):
+    """
+    컬럼 이름에 해당하는 파생 feature 를 찾는 함수
+
+    Returns:
+        (feature, params) 또는 None
+    """
+    for feature in DERIVED_FEATURES.values():
+        params = feature.match(column)
+        if params is not None:
+            return feature, params
+    return None
+
+
+def derived_columns(columns):
+    """columns 중 파생 feature 컬럼 이름 목록 (순서 유지)"""
+    if columns is None:
+        return []
+    return [col for col in columns if find_derived(col) is not None]
+
+
+def required_columns(columns):
+    """columns 의 파생 feature 를 계산에 필요한 원본 컬럼으로 바꾼 목록 (파생이 아닌 컬럼은 그대로)"""
+    if columns is None:
+        return None
+    names = {}
+    for col in columns:
+        found = find_derived(col)
+        for name in (found[0].requires if found else [col]):
+            names.setdefault(name, None)
+    return list(names)
+
+
+def expand_derived_calls(cond):
+    """
+    조건식의 파생 feature 함수 호출을 컬럼 이름으로 바꾸는 함수
+    (예: "recent_high(pct=8, window=10) == True" → "recent_high_8pct_10d == True")
+
+    인자가 숫자 상수가 아니면 바꾸지 않는다 (조건식 평가에서 오류로 드러난다).
+    """
+    if not DERIVED_FEATURES:
+        return cond
+    names = "|".join(re.escape(name) for name in DERIVED_FEATURES)
+    call_re = re.compile(rf"\b({names})\s*\(([^()]*)\)")
+
+    def _replace(m):
+        feature = DERIVED_FEATURES[m.group(1)]
+        try:
+            call = ast.parse(f"f({m.group(2)})", mode="eval").body
+            params = dict(feature.defaults)
+            for key, arg in zip(feature.defaults, call.args):
+                params[key] = ast.literal_eval(arg)
+            for keyword in call.keywords:
+                if keyword.arg not in feature.defaults:
+                    return m.group(0)
+                params[keyword.arg] = ast.literal_eval(keyword.value)
+            if len(call.args) > len(feature.defaults) or not all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) for v in params.values()
+            ):
+                return m.group(0)
+        except (SyntaxError, ValueError):
+            return m.group(0)
+        return feature.column(**params)
+
+    return call_re.sub(_replace, cond)
+
+
+# ------------------------------------------------------------
+# 파생 feature 정의
+# ------------------------------------------------------------
+
+def _recent_high(df, pct=8, window=5):
+    """종가가 최근 window 거래일(당일 포함) 최저 종가보다 pct% 이상 높은지 (최소 2거래일 필요)"""
+    close = df["close"].astype("float64")
+    low = close.rolling(int(window), min_periods=2).min()
+    return (close >= low * (1 + pct / 100)).to_numpy() & low.notna().to_numpy()
+
+
+def _recent_high_column(pct=8, window=5):
+    suffix = "" if int(window) == 5 else f"_{int(window)}d"
+    return f"recent_high_{_format_number(pct)}pct{suffix}"
+
+
+register_derived(DerivedFeature(
+    name="recent_high",
+    pattern=r"recent_high_(?P<pct>\d+(?:p\d+)?)pct(?:_(?P<window>\d+)d)?",
+    defaults={"pct": 8, "window": 5},
+    requires=["close"],
+    compute=_recent_high,
+    column=_recent_high_column,
+    description="종가가 최근 window 거래일 중 최저 종가보다 pct% 이상 높은 상황 (recent_high_8pct = recent_high(8, 5))",
+    point_in_time=True,
+))
+
+
+def _returns(df, period):
+    """period 거래일 상승률 (%)"""
+    return df["close"].pct_change(int(period)) * 100
+
+
+register_derived(DerivedFeature(
+    name="returns",
+    pattern=r"return_(?P<period>\d+)d",
+    defaults={"period": 20},
+    requires=["close"],
+    compute=_returns,
+    column=lambda period=20: f"return_{int(period)}d",
+    description="period 거래일 상승률 (%) (예: return_3d, return_20d, return_60d)",
+))
+
+
+def _relative_momentum(df, period):
+    """KODEX 200 대비 period 거래일 상대 모멘텀 (%). 두 데이터가 모두 있는 날짜만으로 계산하고 나머지는 NaN"""
+    both = df[df["kodex_date"].notna()]
+    return ((
+        (both["close"] / both["close"].shift(int(period))) /
+        (both["kodex_close"] / both["kodex_close"].shift(int(period))) - 1
+    ) * 100).reindex(df.index)
+
+
+register_derived(DerivedFeature(
+    name="rel_mom",
+    pattern=r"rel_mom_(?P<period>\d+)",
+    defaults={"period": 20},
+    requires=["close", "kodex_date", "kodex_close"],
+    compute=_relative_momentum,
+    column=lambda period=20: f"rel_mom_{int(period)}",
+    description="KODEX 200 대비 period 거래일 상대 모멘텀 (%) (예: rel_mom_20, rel_mom_60, rel_mom_120)",
+))
+
+_52W = 252  # 52주 ≈ 252 거래일
+
+
+def _high_52w(df):
+    return df["high"].rolling(window=_52W, min_periods=1).max()
+
+
+def _low_52w(df):
+    return df["low"].rolling(window=_52W, min_periods=1).min()
+
+
+for _name, _compute, _description in [
+    ("high_52w", _high_52w, "52주(252거래일) 고점"),
+    ("low_52w", _low_52w, "52주(252거래일) 저점"),
+    ("high_52w_ratio", lambda df: (df["close"] / _high_52w(df)) * 100, "현재가 / 52주 고점 (%)"),
+    ("low_52w_ratio", lambda df: (df["close"] / _low_52w(df)) * 100, "현재가 / 52주 저점 (%)"),
+]:
+    register_derived(DerivedFeature(
+        name=_name,
+        pattern=re.escape(_name),
+        defaults={},
+        requires=["high", "low", "close"],
+        compute=_compute,
+        column=lambda _name=_name: _name,
+        description=_description,
+    ))
+
+
+def check_point_in_time(feature, params, df, values, cutoffs=3):
+    """
+    전체 이력으로 계산한 파생 feature 가 앞쪽 일부만으로 계산한 값과 같은지 확인하는 함수
+
+    Args:
+        feature, params: find_derived 결과
+        df: 전체 이력 데이터프레임
+        values: 전체 이력 계산 결과
+        cutoffs: 확인할 자르는 위치 개수 (이력 길이를 균등하게 나눔)
+
+    Raises:
+        LookAheadError: 미래 행을 참조하는 계산 (전체 이력 결과를 시점별 값으로 쓸 수 없음)
+    """
+    for end in np.linspace(0, len(df), cutoffs + 2, dtype=int)[1:-1]:
+        prefix = np.asarray(feature.compute(df.iloc[:end], **params))
+        expected = values[:end]
+        same = (prefix == expected) | (pd.isna(prefix) & pd.isna(expected))
+        if not same.all():
+            raise LookAheadError(f"{feature.name}{params} 는 {end} 번째 행 이후 데이터를 참조합니다.")
+
+
+class DerivedFeatureStore:
+    """
+    (종목 파일, 파생 컬럼) 별 전체 이력 계산 결과 저장소
+
+    데이터 버전이 같으면 다시 계산하지 않고, 원본 데이터프레임 옆에 붙인 결과도
+    (종목 파일, 날짜 범위, 컬럼 목록) 별로 보관한다.
+    처음 계산할 때 check_point_in_time 으로 앞쪽 일부만으로 계산한 값과 같은지 확인한다
+    (날짜별로 다시 계산하지 않고 전체 이력 결과를 AsOfView 로 잘라 써도 되는지).
+    """
+
+    def __init__(self):
+        self._values = {}  # {(path, 컬럼): (버전, 값 배열)}
+        self._frames = {}  # {(path, start, end, columns): (버전, df)}
+        self._lock = threading.Lock()
+
+    def values(self, path, version, df, column):
+        """전체 이력 데이터프레임 df 에 대한 파생 컬럼 값 (읽기 전용 배열)"""
+        key = (path, column)
+        with self._lock:
+            cached = self._values.get(key)
+        if cached is not None and cached[0] == version and len(cached[1]) == len(df):
+            return cached[1]
+
+        feature, params = find_derived(column)
+        values = np.asarray(feature.compute(df, **params))
+        check_point_in_time(feature, params, df, values)
+        values.setflags(write=False)
+        with self._lock:
+            self._values[key] = (version, values)
+        return values
+
+    def get(self, path, version, start, end, columns, load_base):
+        """
+        원본 컬럼과 파생 컬럼을 함께 가진 데이터프레임
+
+        Args:
+            path: 종목 파일 경로
+            version: 원본 데이터 버전 (파생 컬럼이 필요로 하는 파일의 해시 포함)
+            start, end: 날짜 범위 (파생 컬럼은 전체 이력으로 계산한 뒤 자른다)
+            columns: 원본/파생 컬럼이 섞인 목록
+            load_base: 파생 컬럼 계산에 필요한 원본 컬럼을 가진 전체 이력 데이터프레임을 돌려주는 함수
+        """
+        key = (path, start, end, columns)
+        with self._lock:
+            cached = self._frames.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        base = load_base()
+        derived = {col: self.values(path, version, base, col) for col in derived_columns(columns) if col not in base.columns}
+        df = pd.concat([base, pd.DataFrame(derived, index=base.index)], axis=1) if derived else base
+        if start is not None or end is not None:
+            dates = df["date"].to_numpy()
+            lo = 0 if start is None else int(np.searchsorted(dates, start.to_datetime64(), side="left"))
+            hi = len(df) if end is None else int(np.searchsorted(dates, end.to_datetime64(), side="right"))
+            df = df.iloc[lo:hi].reset_index(drop=True)
+        with self._lock:
+            self._frames[key] = (version, df)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._frames.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_derived_store():
+    """모든 Streamlit 세션이 공유하는 DerivedFeatureStore 인스턴스"""
+    return DerivedFeatureStore()
@@ -0,0 +1,214 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from condition_compiler import condition_dag
+
+try:
+    import polars as pl
+except ImportError:  # polars 가 없으면 pandas 백엔드만 사용한다
+    pl = None
+
+BACKENDS = ("pandas", "polars")
+
+
+def available_backends():
+    """설치된 패키지로 사용할 수 있는 백엔드 이름 목록"""
+    return [name for name in BACKENDS if name == "pandas" or pl is not None]
+
+
+class PandasBackend:
+    """기본 백엔드: pandas read_csv, 조건식 마스크는 numpy 식 DAG (condition_compiler)"""
+
+    name = "pandas"
+
+    def read_csv(self, path, usecols=None):
+        """
+        CSV 를 pandas 데이터프레임으로 읽는 함수
+
+        Args:
+            path: 파일 경로 또는 바이트 스트림
+            usecols: 원본 컬럼명을 받아 읽을지 여부를 돌려주는 함수 (None 이면 전체)
+        """
+        return pd.read_csv(path, usecols=usecols)
+
+    def condition_masks(self, df, conditions, engine="auto"):
+        """
+        조건식들의 전체 이력 bool 마스크를 한 번에 계산하는 함수 (ConditionCache.get_many 에서 호출)
+
+        Args:
+            df: 데이터프레임
+            conditions: 조건식 문자열 목록
+            engine: numpy 식 DAG 의 계산 엔진 (ExpressionDAG.evaluate 참고)
+
+        Returns:
+            masks: {조건식: bool 배열}. 마스크로 계산할 수 없는 조건식은 빠진다.
+        """
+        masks, _ = condition_dag(conditions).evaluate(df, engine=engine)
+        return masks
+
+
+class PolarsBackend(PandasBackend):
+    """
+    polars 백엔드: 멀티스레드 CSV 파서와 lazy 식 엔진
+
+    CSV 는 polars 로 읽어서 pandas 데이터프레임으로 돌려주므로 이후 처리(스키마 적용 등)는 같다.
+    조건식 마스크는 numpy 식 DAG 와 같은 노드를 polars 식으로 옮겨서 한 번의 lazy 쿼리로 계산한다
+    (공통 부분식은 polars 가 한 번만 계산). 결과가 DAG 와 비트 단위로 같도록
+    - 컬럼은 원래 dtype 그대로 (float32 지표는 float32, 작은 정수형만 int64 로) 두고 상수는 리터럴로 넘겨서
+      numpy(NEP 50) 와 같은 dtype 으로 계산하고
+    - polars 는 NaN 을 가장 큰 값으로 비교하므로 NaN 이 있으면 != 만 True, 나머지 비교는 False 로 맞춘다.
+    ** 연산, bool 과 숫자를 섞은 식처럼 같은 결과를 보장할 수 없는 조건식은 DAG 로 계산한다.
+    """
+
+    name = "polars"
+
+    def read_csv(self, path, usecols=None):
+        source = path.read() if hasattr(path, "read") else path
+        columns = None
+        if usecols is not None:
+            header = pl.read_csv(_source(source), n_rows=0).columns
+            columns = [c for c in header if usecols(c)]
+        df = pl.read_csv(_source(source), columns=columns, infer_schema_length=None)
+        return df.to_pandas()
+
+    def condition_masks(self, df, conditions, engine="auto"):
+        dag = condition_dag(conditions)
+        translator = _PolarsTranslator(df)
+        exprs, rest = {}, []
+        for cond, root in dag.roots.items():
+            try:
+                exprs[cond] = translator.boolean(root)
+            except (KeyError, NotImplementedError, TypeError, ValueError):
+                rest.append(cond)  # DAG(numpy) 로 계산 (오류도 DAG 쪽 결과를 그대로)
+
+        masks = {}
+        if exprs:
+            frame = pl.DataFrame(translator.columns).lazy()
+            result = frame.select([expr.alias(f"m{i}") for i, expr in enumerate(exprs.values())]).collect()
+            for i, cond in enumerate(exprs):
+                masks[cond] = np.array(result[f"m{i}"].to_numpy(), dtype=bool)
+        if rest:
+            masks.update(super().condition_masks(df, rest, engine))
+        return {cond: masks[cond] for cond in conditions if cond in masks}
+
+
+def _source(source):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+_COMPARE = {
+    "Eq": lambda a, b: a == b,
+    "NotEq": lambda a, b: a != b,
+    "Lt": lambda a, b: a < b,
+    "LtE": lambda a, b: a <= b,
+    "Gt": lambda a, b: a > b,
+    "GtE": lambda a, b: a >= b,
+}
+
+_ARITH = {
+    "Add": lambda a, b: a + b,
+    "Sub": lambda a, b: a - b,
+    "Mult": lambda a, b: a * b,
+    "Div": lambda a, b: a / b,
+}
+
+
+class _PolarsTranslator:
+    """
+    ExpressionDAG 노드를 polars 식으로 바꾸는 변환기 (지원하지 않는 노드는 NotImplementedError)
+
+    값 노드는 (식, 종류) 로 바꾼다. 종류는 "b"(bool), "i"(정수), "f"(실수) 이고
+    실수 쪽만 NaN 검사를 붙인다.
+
+    Attributes:
+        columns: 식에서 참조한 {컬럼명: numpy 배열} (lazy 쿼리의 입력)
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.columns = {}
+
+    def boolean(self, key):
+        kind = key[0]
+        if kind in ("and", "or"):
+            exprs = [self.boolean(child) for child in key[1]]
+            combined = exprs[0]
+            for expr in exprs[1:]:
+                combined = combined & expr if kind == "and" else combined | expr
+            return combined
+        if kind == "not":
+            return ~self.boolean(key[1])
+        if kind == "cmp":
+            return self.compare(key)
+        raise NotImplementedError(kind)
+
+    def compare(self, key):
+        a, a_kind = self.value(key[2])
+        b, b_kind = self.value(key[3])
+        if (a_kind == "b") != (b_kind == "b"):
+            raise NotImplementedError("bool 과 숫자 비교")
+        missing = pl.lit(False)
+        for expr, value_kind in ((a, a_kind), (b, b_kind)):
+            if value_kind == "f":
+                missing = missing | expr.is_nan()
+        result = _COMPARE[key[1]](a, b)
+        if key[1] == "NotEq":
+            return (result | missing).fill_null(True)
+        return (result & ~missing).fill_null(False)
+
+    def value(self, key):
+        kind = key[0]
+        if kind == "col":
+            return self.column(key[1])
+        if kind == "const":
+            value = key[2]
+            return pl.lit(value), "b" if isinstance(value, bool) else "f" if isinstance(value, float) else "i"
+        if kind == "arith":
+            if key[1] not in _ARITH:
+                raise NotImplementedError(key[1])  # ** 는 polars 의 거듭제곱 구현이 numpy 와 달라질 수 있음
+            a, a_kind = self.value(key[2])
+            b, b_kind = self.value(key[3])
+            if "b" in (a_kind, b_kind):
+                raise NotImplementedError("bool 산술")
+            result_kind = "f" if key[1] == "Div" or "f" in (a_kind, b_kind) else "i"
+            return _ARITH[key[1]](a, b), result_kind
+        if kind in ("neg", "abs"):
+            expr, value_kind = self.value(key[1])
+            if value_kind == "b":
+                raise NotImplementedError("bool " + kind)
+            return (-expr if kind == "neg" else expr.abs()), value_kind
+        raise NotImplementedError(kind)
+
+    def column(self, name):
+        series = self.df[name]
+        if not pd.api.types.is_numeric_dtype(series):
+            raise NotImplementedError(name)  # 날짜/문자열 비교는 pandas 에 맡긴다
+        values = series.to_numpy()
+        if values.dtype.kind in "iu" and values.dtype.itemsize < 8:
+            values = values.astype(np.int64)  # DAG 와 같이 작은 정수형끼리의 연산이 넘치지 않게
+        value_kind = {"b": "b", "i": "i", "u": "i", "f": "f"}.get(values.dtype.kind)
+        if value_kind is None:
+            raise NotImplementedError(name)
+        self.columns[name] = values
+        return pl.col(name), value_kind
+
+
+_BACKENDS = {"pandas": PandasBackend()}
+
+
+def get_backend(name=None):
+    """
+    이름(또는 인스턴스)으로 백엔드 인스턴스를 가져오는 함수
+
+    None 이거나 polars 가 설치되어 있지 않으면 pandas 백엔드를 돌려준다.
+    선택은 호출하는 쪽(앱은 st.session_state)에서 들고 있다가 넘긴다.
+    """
+    if isinstance(name, PandasBackend):
+        return name
+    if name not in _BACKENDS:
+        if name != "polars" or pl is None:
+            return _BACKENDS["pandas"]
+        _BACKENDS[name] = PolarsBackend()
+    return _BACKENDS[name]
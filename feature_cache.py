@@ -0,0 +1,420 @@
+import hashlib
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import frame_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 가 없으면 CSV 를 직접 파싱한다
+    pa = None
+    pq = None
+
+CACHE_DIRNAME = ".feature_cache"
+META_SAMPLE_ROWS = 300  # 캐시 없이 메타데이터를 어림할 때 읽는 앞쪽 행 수 (52주 warm-up 252 거래일보다 길게)
+CACHE_FORMAT_VERSION = 7  # 2: compact dtype 스키마, 3: 컬럼 스키마, 4: 마지막 날짜/추가 이력, 5: warm-up 길이, 6: 정수 컬럼 int64, 7: 일부 컬럼 캐시
+ROW_GROUP_SIZE = 250  # 약 1년치 거래일, 날짜 범위 조회 시 row group 단위로 건너뛴다
+MAX_HISTORY = 60  # 행 추가로 이어진 이전 버전 해시를 몇 개까지 기억할지
+
+
+def cache_available():
+    """Parquet 캐시를 사용할 수 있는지 여부"""
+    return pq is not None
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """파일 내용의 blake2b 해시"""
+    return _prefix_and_full_hash(path, None, chunk_size)[1]
+
+
+def _prefix_and_full_hash(path, prefix_size, chunk_size=1 << 20):
+    """
+    파일 앞 prefix_size 바이트의 해시와 전체 해시를 한 번에 계산하는 함수
+
+    Returns:
+        (앞부분 해시 또는 None, 전체 해시)
+    """
+    h = hashlib.blake2b(digest_size=16)
+    prefix_digest = None
+    read = 0
+    with open(path, "rb") as f:
+        while True:
+            size = chunk_size
+            if prefix_size is not None and prefix_digest is None:
+                size = min(chunk_size, prefix_size - read)
+                if size == 0:
+                    prefix_digest = h.hexdigest()
+                    size = chunk_size
+            chunk = f.read(size)
+            if not chunk:
+                break
+            h.update(chunk)
+            read += len(chunk)
+    if prefix_size is not None and prefix_digest is None and read == prefix_size:
+        prefix_digest = h.hexdigest()
+    return prefix_digest, h.hexdigest()
+
+
+def cache_paths(csv_path):
+    """CSV 파일에 대응하는 (parquet 경로, 메타데이터 경로)"""
+    folder = os.path.join(os.path.dirname(csv_path), CACHE_DIRNAME)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(folder, f"{name}.parquet"), os.path.join(folder, f"{name}.json")
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write_fn):
+    # Streamlit 세션은 같은 프로세스의 스레드이므로 임시 파일 이름에 스레드도 넣는다
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _is_cache_valid(csv_path, meta):
+    """
+    원본 CSV 가 캐시를 만들 때와 같은지 확인하는 함수
+
+    크기와 수정시각이 같으면 바로 유효하다고 보고, 다르면 해시를 비교한다.
+    (touch 만 된 파일은 해시가 같으므로 메타데이터만 갱신한다)
+    """
+    if not meta or meta.get("version") != CACHE_FORMAT_VERSION:
+        return False
+    stat = os.stat(csv_path)
+    if meta.get("size") == stat.st_size and meta.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    if meta.get("size") != stat.st_size:
+        return False
+    if meta.get("hash") != file_hash(csv_path):
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _, meta_path = cache_paths(csv_path)
+    try:
+        _write_atomic(meta_path, lambda p: _dump_meta(p, meta))
+    except OSError:
+        pass
+    return True
+
+
+def _dump_meta(path, meta):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _write_cache(csv_path, df, stat, digest, history, columns=None):
+    """
+    데이터프레임을 Parquet 으로 쓰고 메타데이터를 갱신하는 함수 (쓰기 실패 시 None)
+
+    columns 는 캐시를 만들 때 요청한 컬럼 목록이다 (None 이면 전체 컬럼).
+    """
+    parquet_path, meta_path = cache_paths(csv_path)
+    try:
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        _write_atomic(parquet_path, lambda p: pq.write_table(table, p, row_group_size=ROW_GROUP_SIZE))
+        meta = {
+            "version": CACHE_FORMAT_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest,
+            "history": history,
+            "columns": None if columns is None else list(columns),
+            "rows": len(df),
+            "last_date": str(df["date"].iloc[-1]) if len(df) else None,
+            "schema": frame_schema(df),
+        }
+        _write_atomic(meta_path, lambda p: _dump_meta(p, meta))
+    except OSError:
+        # 읽기 전용 폴더 등에서는 캐시 없이 동작
+        return None
+    return meta
+
+
+def build_cache(csv_path, parse_fn, columns=None, history=()):
+    """
+    CSV 를 파싱해서 Parquet 캐시를 만드는 함수
+
+    columns 를 주면 그 컬럼만 파싱해서 캐시에 넣는다 (처음 읽을 때도 usecols 가 적용되도록).
+    나중에 다른 컬럼이 필요해지면 _refresh 가 컬럼을 합쳐 캐시를 다시 만든다.
+
+    Args:
+        csv_path: 원본 feature CSV 경로
+        parse_fn: parse_fn(csv_path, columns=None) 형태로 정규화된 데이터프레임을 돌려주는 함수
+        columns: 캐시에 넣을 표준 컬럼명 목록 (None 이면 전체)
+        history: 유지할 이전 버전 해시 목록 (같은 파일 버전의 캐시를 컬럼만 늘려 다시 만들 때)
+
+    Returns:
+        (df, meta): 파싱된 데이터프레임, 메타데이터 (캐시를 쓰지 못했으면 None)
+    """
+    stat = os.stat(csv_path)
+    digest = file_hash(csv_path)
+    df = parse_fn(csv_path, columns=columns)
+    return df, _write_cache(csv_path, df, stat, digest, list(history), columns)
+
+
+def _parse_tail(csv_path, offset, parse_fn, columns=None):
+    """offset 바이트 이후에 추가된 행만 파싱 (offset 이 행 경계가 아니면 None)"""
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        f.seek(offset - 1)
+        if f.read(1) != b"\n":
+            return None  # 이전 마지막 행이 줄바꿈 없이 끝나 있었음
+        tail = f.read()
+    return parse_fn(io.BytesIO(header + tail), columns=columns)
+
+
+def _align_tail(tail, base, last_date):
+    """
+    추가된 행을 기존 캐시의 컬럼/dtype 에 맞추는 함수
+
+    컬럼 구성이 다르거나, 날짜가 기존 마지막 날짜 이후가 아니거나,
+    정수/float64 컬럼을 손실 없이 맞출 수 없으면 None (전체 재생성)
+    """
+    if list(tail.columns) != list(base.columns):
+        return None
+    if len(tail) and tail["date"].iloc[0] <= pd.Timestamp(last_date):
+        return None
+
+    aligned = {}
+    for col in base.columns:
+        target = base[col].dtype
+        if tail[col].dtype == target:
+            continue
+        try:
+            cast = tail[col].astype(target)
+        except (TypeError, ValueError):
+            return None
+        if target != np.float32:  # float32 지표는 스키마상 손실 허용
+            same = (cast == tail[col]) | (cast.isna() & tail[col].isna())
+            if not same.all():
+                return None
+        aligned[col] = cast
+    return tail.assign(**aligned) if aligned else tail
+
+
+def _append_cache(csv_path, parse_fn, meta):
+    """
+    CSV 끝에 행만 추가된 경우 추가된 부분만 파싱해서 캐시를 늘리는 함수
+
+    캐시를 만들 때의 파일 크기(offset)까지의 해시가 그대로이면 앞부분은 바뀌지 않은 것으로 본다.
+
+    Returns:
+        meta: 갱신된 메타데이터 (행 추가가 아니거나 실패하면 None → 전체 재생성)
+    """
+    if not meta or meta.get("version") != CACHE_FORMAT_VERSION or not meta.get("last_date"):
+        return None
+    stat = os.stat(csv_path)
+    offset = meta["size"]
+    if stat.st_size <= offset:
+        return None
+    prefix_digest, digest = _prefix_and_full_hash(csv_path, offset)
+    if prefix_digest != meta["hash"]:
+        return None  # 기존 행이 바뀜
+
+    tail = _parse_tail(csv_path, offset, parse_fn, meta.get("columns"))
+    if tail is None:
+        return None
+    parquet_path, _ = cache_paths(csv_path)
+    base = pq.read_table(parquet_path).to_pandas()
+    tail = _align_tail(tail, base, meta["last_date"])
+    if tail is None:
+        return None
+
+    df = pd.concat([base, tail], ignore_index=True)
+    history = ([meta["hash"]] + meta.get("history", []))[:MAX_HISTORY]
+    return _write_cache(csv_path, df, stat, digest, history, meta.get("columns"))
+
+
+def _covers(meta, columns):
+    """캐시에 columns 가 모두 들어 있는지 여부 (columns 가 None 이면 전체 컬럼 캐시인지)"""
+    cached = meta.get("columns")
+    return cached is None or (columns is not None and set(columns) <= set(cached))
+
+
+def _refresh(csv_path, parse_fn, columns=None):
+    """
+    캐시를 최신 상태로 만드는 함수
+
+    유효하면 그대로, 행만 추가되었으면 추가분만 반영, 그 외에는 columns 만 파싱해서 다시 만든다.
+    캐시에 없는 컬럼을 요청하면 캐시된 컬럼과 합쳐서 다시 만든다.
+
+    Returns:
+        (meta, df): 메타데이터 (캐시를 쓸 수 없으면 None), 다시 만들었다면 파싱된 데이터프레임
+    """
+    parquet_path, meta_path = cache_paths(csv_path)
+    meta = _read_meta(meta_path)
+    current = None
+    if os.path.exists(parquet_path):
+        if _is_cache_valid(csv_path, meta):
+            current = meta
+        else:
+            try:
+                current = _append_cache(csv_path, parse_fn, meta)
+            except (OSError, ValueError, KeyError, pa.ArrowException):
+                current = None
+    if current is not None:
+        if _covers(current, columns):
+            return current, None
+        wanted = None if columns is None else list(dict.fromkeys(current["columns"] + list(columns)))
+        df, meta = build_cache(csv_path, parse_fn, wanted, current.get("history", []))
+        return meta, df
+    df, meta = build_cache(csv_path, parse_fn, columns)
+    return meta, df
+
+
+def refresh_cache(csv_path, parse_fn, columns=None):
+    """
+    캐시를 최신 상태로 만들고 메타데이터를 반환하는 함수
+
+    메타데이터의 hash 는 현재 파일 버전, history 는 행 추가만으로 이어진 이전 버전들이다.
+    메모리에 올려둔 데이터의 버전이 history 에 있으면 last_date 이후 행만 더 읽으면 된다.
+
+    Args:
+        columns: 캐시에 있어야 할 표준 컬럼명 목록 (None 이면 전체, 캐시가 없으면 이 컬럼만 파싱)
+
+    Returns:
+        meta: 메타데이터 (pyarrow 가 없거나 캐시를 쓸 수 없으면 None)
+    """
+    if not cache_available():
+        return None
+    return _refresh(csv_path, parse_fn, columns)[0]
+
+
+def _date_filters(start, end, after=None):
+    filters = []
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+    if after is not None:
+        filters.append(("date", ">", pd.Timestamp(after)))
+    return filters or None
+
+
+def _slice_dates(df, start, end, after=None):
+    if start is not None:
+        df = df[df["date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["date"] <= pd.Timestamp(end)]
+    if after is not None:
+        df = df[df["date"] > pd.Timestamp(after)]
+    return df.reset_index(drop=True)
+
+
+def read_features_cached(csv_path, parse_fn, start=None, end=None, columns=None, after=None):
+    """
+    Parquet 캐시를 통해 feature 파일을 읽는 함수
+
+    캐시가 없거나 원본 CSV 가 바뀌었으면 갱신한다 (행만 추가되었으면 추가분만 파싱).
+    캐시는 요청된 컬럼만 담으므로 처음 읽을 때도 CSV 에서 columns 만 파싱한다.
+    start/end 를 주면 날짜 조건을 Parquet row group 통계에 적용해서
+    범위 밖의 row group 은 읽지 않는다.
+    columns 를 주면 Parquet 에서는 해당 컬럼 chunk 만, CSV 에서는 usecols 로 읽는다.
+
+    Args:
+        csv_path: 원본 feature CSV 경로
+        parse_fn: parse_fn(csv_path, columns=None) 형태로 정규화된 데이터프레임을 돌려주는 함수
+        start: 시작일 (포함, None 이면 처음부터)
+        end: 종료일 (포함, None 이면 끝까지)
+        columns: 읽을 표준 컬럼명 목록 (None 이면 전체, 'date' 를 포함해야 함)
+        after: 이 날짜 이후 행만 (미포함, 추가된 행을 읽을 때 사용)
+
+    Returns:
+        df: 정규화된 데이터프레임
+    """
+    if columns is not None:
+        columns = list(columns)
+
+    if not cache_available():
+        return _slice_dates(parse_fn(csv_path, columns=columns), start, end, after)
+
+    meta, df = _refresh(csv_path, parse_fn, columns)
+    if df is None and meta is not None:
+        parquet_path, _ = cache_paths(csv_path)
+        if columns is not None:
+            columns = [col for col in columns if col in meta["schema"]]  # 파일에 없는 이름은 무시
+        try:
+            table = pq.read_table(parquet_path, columns=columns, filters=_date_filters(start, end, after))
+            return table.to_pandas().reset_index(drop=True)
+        except (OSError, pa.ArrowException):
+            df, _ = build_cache(csv_path, parse_fn, meta["columns"])  # 깨진 캐시는 다시 만든다
+
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return _slice_dates(df, start, end, after)
+
+
+def _read_sample(csv_path, head_rows):
+    """
+    CSV 의 헤더, 앞쪽 head_rows 행, 마지막 행만 읽는 함수 (나머지 행은 읽지 않음)
+
+    Returns:
+        (data, complete): CSV 바이트, 파일 전체를 읽었는지 여부
+    """
+    with open(csv_path, "rb") as f:
+        lines = [f.readline()]
+        for _ in range(head_rows):
+            line = f.readline()
+            if not line:
+                return b"".join(lines), True
+            lines.append(line)
+        head_end = f.tell()
+        size = f.seek(0, os.SEEK_END)
+        if size == head_end:
+            return b"".join(lines), True
+        f.seek(max(head_end, size - (1 << 16)))
+        last = f.read().rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+    if not lines[-1].endswith(b"\n"):
+        lines[-1] += b"\n"
+    return b"".join(lines) + last + b"\n", False
+
+
+def read_feature_meta(csv_path, parse_fn, sample_rows=META_SAMPLE_ROWS):
+    """
+    feature 파일의 메타데이터(행 수, 컬럼별 dtype/첫 유효 날짜)를 가져오는 함수
+
+    유효한 전체 컬럼 캐시가 있으면 메타데이터 json 만 읽고 row 데이터는 건드리지 않는다.
+    캐시가 없거나 오래되었으면 캐시를 만들지 않고 헤더와 앞쪽 sample_rows 행, 마지막 행만 파싱해서 어림한다.
+    일부 컬럼만 캐시되어 있으면 어림한 값에 캐시의 행 수와 캐시된 컬럼의 정확한 값을 덮어쓴다.
+    이때 dtype 은 읽은 행 기준이고, 앞쪽 행 안에서 유효값이 없는 컬럼의 첫 유효 날짜/warm-up 과
+    행 수는 None 이다. 첫 날짜(schema["date"])와 마지막 날짜는 정확하다.
+
+    Returns:
+        meta: {"rows": 행 수, "schema": feature_schema.frame_schema 형식, "last_date": 마지막 날짜, ...}
+    """
+    cached = None
+    if cache_available():
+        parquet_path, meta_path = cache_paths(csv_path)
+        meta = _read_meta(meta_path)
+        if os.path.exists(parquet_path) and _is_cache_valid(csv_path, meta):
+            if meta.get("columns") is None:
+                return meta
+            cached = meta
+
+    data, complete = _read_sample(csv_path, sample_rows)
+    df = parse_fn(io.BytesIO(data))
+    schema = frame_schema(df)
+    if not complete:
+        for entry in schema.values():
+            if entry["warmup"] >= len(df) - 1:  # 마지막 행에서야 유효 → 실제 첫 유효일은 알 수 없음
+                entry["first_valid"], entry["warmup"] = None, None
+    if cached is not None:
+        schema.update((col, entry) for col, entry in cached["schema"].items() if col in schema)
+        return {"rows": cached["rows"], "schema": schema, "last_date": cached["last_date"]}
+    return {
+        "rows": len(df) if complete else None,
+        "schema": schema,
+        "last_date": str(df["date"].iloc[-1]) if len(df) else None,
+    }
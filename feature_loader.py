@@ -0,0 +1,632 @@
+import ast
+import keyword
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
+from glob import glob
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from condition_compiler import ConditionMasks, compile_condition, condition_dag, get_condition_cache
+from data_manifest import ManifestStore
+from derived_features import derived_columns, find_derived, get_derived_store, required_columns
+from feature_backend import get_backend
+from feature_cache import read_features_cached, refresh_cache
+from feature_schema import apply_feature_schema, frame_memory
+
+DATA_FOLDER = os.path.dirname(os.path.abspath(__file__))  # 현재 디렉터리 기준
+KODEX_CODE = "069500"
+MAX_CACHED_FRAMES = 4096  # FeatureStore 가 보관할 최대 데이터프레임 수 (전체 종목을 올려둘 수 있게 넉넉히)
+BENCHMARK_PREFIX = "kodex_"  # 종목 조건식에서 KODEX 200 컬럼을 가리키는 접두어 (예: kodex_close)
+
+# 정규화된 컬럼명 → 원본 파일에서 허용되는 컬럼명 후보
+COLUMN_ALIASES = {
+    "date": ['date', 'Date', '날짜'],
+    "open": ['open', 'Open', '시가'],
+    "high": ['high', 'High', '고가'],
+    "low": ['low', 'Low', '저가'],
+    "close": ['close', 'Close', '종가'],
+}
+
+# 백테스트 엔진이 조건식과 관계없이 항상 사용하는 컬럼
+ENGINE_COLUMNS = ("date", "open", "high", "low", "close")
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def find_column(df, target_names):
+    for col in df.columns:
+        if col.strip().lower() in [name.lower() for name in target_names]:
+            return col
+    return None
+
+
+def canonical_column(name):
+    """원본 컬럼명을 표준 이름으로 변환 (별칭이 아니면 그대로)"""
+    key = name.strip().lower()
+    for canonical, aliases in COLUMN_ALIASES.items():
+        if key in [alias.lower() for alias in aliases]:
+            return canonical
+    return name
+
+
+def condition_identifiers(conditions, prefix=None):
+    """
+    조건식 문자열들이 참조하는 이름(컬럼 후보)을 추출하는 함수
+
+    Args:
+        conditions: 조건식 문자열 목록 (예: ["sma20 > sma60", "rsi < 30"])
+        prefix: 지정하면 이 접두어로 시작하는 이름만 접두어를 떼고 반환 (예: "kodex_")
+
+    Returns:
+        names: 이름 집합
+    """
+    names = set()
+    for cond in conditions:
+        if not cond or not cond.strip():
+            continue
+        try:
+            tree = ast.parse(cond.strip(), mode="eval")
+            found = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+        except SyntaxError:
+            # 파싱이 안 되는 식은 식별자처럼 보이는 토큰을 모두 사용
+            found = {tok for tok in _IDENTIFIER_RE.findall(cond) if not keyword.iskeyword(tok)}
+        names |= found
+
+    if prefix is not None:
+        names = {name[len(prefix):] for name in names if name.startswith(prefix)}
+    return names
+
+
+def latest_only_conditions(conditions):
+    """
+    point_in_time 파생 feature(예: recent_high_8pct)를 참조하는 조건식 집합
+
+    이 조건식들은 "기준일까지 한 번이라도 만족" 이 아니라 기준일의 마지막 행에서만 평가한다.
+    날짜별 루프에서 불리므로 조건식 문자열마다 한 번만 파싱한다.
+    """
+    return {cond for cond in conditions if _is_latest_only(cond)}
+
+
+@lru_cache(maxsize=1024)
+def _is_latest_only(cond):
+    for name in condition_identifiers([cond]):
+        found = find_derived(name)
+        if found is not None and found[0].point_in_time:
+            return True
+    return False
+
+
+def strategy_columns(*condition_groups, prefix=None):
+    """
+    매수/매도/시장 보유 조건식이 참조하는 컬럼 + 엔진 필수 컬럼(OHLC) 목록
+
+    Args:
+        condition_groups: 조건식 문자열 목록들
+        prefix: condition_identifiers 참고
+
+    Returns:
+        columns: load_features(columns=...) 에 넘길 컬럼명 리스트
+    """
+    names = set()
+    for conditions in condition_groups:
+        names |= condition_identifiers(conditions, prefix=prefix)
+    return list(ENGINE_COLUMNS) + sorted(names - set(ENGINE_COLUMNS))
+
+
+def benchmark_columns(columns, prefix=BENCHMARK_PREFIX):
+    """columns 중 벤치마크 컬럼을 가리키는 이름에서 접두어를 뗀 목록 (예: kodex_close → close)"""
+    if columns is None:
+        return []
+    return [col[len(prefix):] for col in columns if col.startswith(prefix) and len(col) > len(prefix)]
+
+
+def align_benchmark(df, benchmark, prefix=BENCHMARK_PREFIX):
+    """
+    종목 데이터프레임 옆에 벤치마크 컬럼을 접두어를 붙여 날짜 기준으로 맞춰 붙이는 함수
+
+    Args:
+        df: 종목 데이터프레임 (날짜순)
+        benchmark: 벤치마크 데이터프레임 (날짜순)
+        prefix: 붙일 컬럼명 접두어
+
+    Returns:
+        df: 종목 행은 그대로이고 prefix + 컬럼이 추가된 데이터프레임.
+            벤치마크에 없는 날짜의 값은 NaN 이고, prefix + "date" 는 NaT 이다.
+    """
+    dates = df["date"].to_numpy()
+    bm_dates = benchmark["date"].to_numpy()
+    if len(bm_dates):
+        pos = np.minimum(np.searchsorted(bm_dates, dates), len(bm_dates) - 1)
+        matched = bm_dates[pos] == dates
+    else:
+        pos = np.zeros(len(dates), dtype=np.intp)
+        matched = np.zeros(len(dates), dtype=bool)
+
+    aligned = {}
+    for col in benchmark.columns:
+        if len(bm_dates):
+            values = benchmark[col].iloc[pos].set_axis(df.index)
+        else:
+            values = pd.Series(np.nan, index=df.index)
+        aligned[f"{prefix}{col}"] = values.where(matched)
+    return pd.concat([df, pd.DataFrame(aligned, index=df.index)], axis=1)
+
+
+def feature_path(code, data_folder=DATA_FOLDER):
+    """종목 코드의 feature 파일 경로"""
+    return os.path.join(data_folder, f"{code}_features.csv")
+
+
+def list_feature_codes(data_folder=DATA_FOLDER):
+    """데이터 폴더의 *_features.csv 파일에서 종목 코드 목록을 추출하는 함수"""
+    file_paths = sorted(glob(os.path.join(data_folder, "*_features.csv")))
+    return [os.path.basename(p).split("_")[0] for p in file_paths]
+
+
+def normalize_feature_frame(df):
+    """
+    날짜/시가/고가/저가/종가 컬럼명을 표준 이름으로 바꾸고 날짜순으로 정렬하는 함수
+
+    Args:
+        df: 원본 feature 데이터프레임
+
+    Returns:
+        df: 'date' 컬럼이 datetime64 이고 날짜 오름차순으로 정렬된 데이터프레임
+    """
+    rename_map = {}
+    for canonical, aliases in COLUMN_ALIASES.items():
+        col = find_column(df, aliases)
+        if col is not None and col != canonical:
+            rename_map[col] = canonical
+    if rename_map:
+        df = df.rename(columns=rename_map)
+
+    if "date" not in df.columns:
+        raise KeyError("날짜 컬럼을 찾을 수 없습니다.")
+
+    df["date"] = pd.to_datetime(df["date"])
+    if not df["date"].is_monotonic_increasing:
+        df = df.sort_values("date", kind="mergesort")
+    return df.reset_index(drop=True)
+
+
+def parse_feature_csv(path, columns=None, backend=None):
+    """
+    CSV 원본을 읽어 정규화하고 compact dtype 스키마(feature_schema)를 적용하는 함수
+
+    Args:
+        path: CSV 경로
+        columns: 읽을 표준 컬럼명 목록 (None 이면 전체, date 는 항상 포함)
+        backend: CSV 파서 백엔드 이름 또는 인스턴스 (feature_backend, None 이면 pandas)
+    """
+    backend = get_backend(backend)
+    if columns is None:
+        df = backend.read_csv(path)
+    else:
+        wanted = set(columns) | {"date"}
+        df = backend.read_csv(path, usecols=lambda c: canonical_column(c) in wanted)
+    return apply_feature_schema(normalize_feature_frame(df))
+
+
+def read_feature_header(path):
+    """CSV 헤더만 읽어 표준 컬럼명 목록을 반환하는 함수"""
+    return [canonical_column(c) for c in pd.read_csv(path, nrows=0).columns]
+
+
+class FeatureStore:
+    """
+    프로세스 전체에서 공유하는 feature 데이터프레임 저장소
+
+    파일마다 한 번만 읽고 (경로, 날짜 범위) 별로 매니페스트의 내용 해시와 함께 보관한다.
+    디스크에서는 Parquet 캐시(feature_cache)를 거쳐 읽는다.
+    columns 를 주면 해당 컬럼만 읽고, 나중에 다른 컬럼이 필요해지면
+    부족한 컬럼만 추가로 읽어서 붙인다.
+    파일 끝에 행만 추가된 경우(일별 업데이트)에는 추가된 행만 읽어서 뒤에 붙이고,
+    기존 행이 바뀌었으면 전체를 다시 읽는다.
+    반환된 데이터프레임은 모든 세션이 공유하므로 호출하는 쪽에서 수정하면 안 된다.
+    데이터프레임은 max_frames 개까지 보관하고, 넘으면 가장 오래 쓰지 않은 것부터 버린다.
+    """
+
+    def __init__(self, manifest, max_frames=MAX_CACHED_FRAMES):
+        self.manifest = manifest  # ManifestStore
+        self.max_frames = max_frames
+        self._frames = OrderedDict()  # {(path, start, end): (내용 해시, df, 파일 마지막 날짜)}, 최근에 쓴 것이 뒤
+        self._headers = {}  # {path: (내용 해시, 표준 컬럼명 목록)}
+        self._joined = OrderedDict()  # {(path, 벤치마크 path, start, end, columns, 접두어): ((종목 해시, 벤치마크 해시), df)}
+        self._lock = threading.Lock()
+
+    def _recall(self, cache, key):
+        """캐시 항목을 꺼내면서 최근에 쓴 것으로 표시 (없으면 None)"""
+        with self._lock:
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+        return cached
+
+    def _remember(self, cache, key, entry):
+        """캐시에 저장하고 max_frames 를 넘으면 가장 오래 쓰지 않은 항목부터 버림"""
+        with self._lock:
+            cache[key] = entry
+            cache.move_to_end(key)
+            while len(cache) > self.max_frames:
+                cache.popitem(last=False)
+
+    def header(self, path, version=None):
+        """파일의 표준 컬럼명 목록 (헤더만 읽음)"""
+        if version is None:
+            version = self.manifest.entry(path)["hash"]
+        with self._lock:
+            cached = self._headers.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        header = read_feature_header(path)
+        with self._lock:
+            self._headers[path] = (version, header)
+        return header
+
+    def get(self, path, start=None, end=None, columns=None, backend=None):
+        key = (path, start, end)
+        parse_fn = partial(parse_feature_csv, backend=backend)
+        entry = self.manifest.entry(path)
+        version = entry["hash"]
+        header = self.header(path, version)
+        # 파일에 없는 이름(함수명, 계산 feature 등)은 무시
+        if columns is None:
+            wanted = header
+        else:
+            requested = set(columns) | {"date"}
+            wanted = [c for c in header if c in requested]
+
+        cached = self._recall(self._frames, key)
+
+        df = cached_version = last_date = None
+        if cached is not None:
+            cached_version, df, last_date = cached
+            if cached_version != version:
+                df, last_date = self._append_rows(path, start, end, df, cached_version, last_date, parse_fn)
+
+        if df is None:
+            last_date = entry["last_date"]
+            df = read_features_cached(path, parse_fn, start=start, end=end, columns=wanted)
+        else:
+            missing = [c for c in wanted if c not in df.columns]
+            if not missing and cached_version == version:
+                return df
+            if missing:
+                extra = read_features_cached(path, parse_fn, start=start, end=end, columns=["date"] + missing)
+                loaded = set(df.columns) | set(missing)
+                df = pd.concat([df, extra[missing]], axis=1)[[c for c in header if c in loaded]]
+
+        self._remember(self._frames, key, (version, df, last_date))
+        return df
+
+    def joined(self, path, benchmark_path, start=None, end=None, columns=(), prefix=BENCHMARK_PREFIX, backend=None):
+        """
+        종목 컬럼 옆에 벤치마크 컬럼(prefix 가 붙은 이름)을 날짜로 맞춰 붙인 데이터프레임 (align_benchmark 참고)
+
+        종목/벤치마크의 내용 해시가 같으면 다시 맞추지 않는다.
+
+        Args:
+            columns: 종목 컬럼과 prefix 가 붙은 벤치마크 컬럼이 섞인 목록 (예: ["close", "kodex_close"])
+        """
+        key = (path, benchmark_path, start, end, columns, prefix)
+        version = (self.manifest.entry(path)["hash"], self.manifest.entry(benchmark_path)["hash"])
+        cached = self._recall(self._joined, key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        df = self.get(path, start, end, tuple(col for col in columns if not col.startswith(prefix)), backend)
+        wanted = benchmark_columns(columns, prefix)
+        benchmark = self.get(benchmark_path, start, end, tuple(wanted), backend)
+        benchmark = benchmark[[col for col in benchmark.columns if col == "date" or col in wanted]]
+        df = align_benchmark(df, benchmark, prefix)
+        self._remember(self._joined, key, (version, df))
+        return df
+
+    def _append_rows(self, path, start, end, df, version, last_date, parse_fn):
+        """
+        파일 내용이 바뀌었을 때 행 추가만 있었으면 추가된 행만 읽어서 붙이는 함수
+
+        Returns:
+            (df, 마지막 날짜): 전체를 다시 읽어야 하면 (None, None)
+        """
+        meta = refresh_cache(path, parse_fn, columns=list(df.columns))
+        if meta is None or last_date is None or version not in meta.get("history", []):
+            return None, None  # 기존 행이 바뀌어 캐시가 다시 만들어짐
+
+        after = pd.Timestamp(last_date)
+        if len(df):
+            after = max(after, df["date"].iloc[-1])
+        tail = read_features_cached(path, parse_fn, start=start, end=end, columns=list(df.columns), after=after)
+        if len(tail):
+            df = pd.concat([df, tail], ignore_index=True)
+        return df, meta["last_date"]
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._headers.clear()
+            self._joined.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_manifest_store():
+    """모든 Streamlit 세션이 공유하는 ManifestStore 인스턴스"""
+    return ManifestStore(parse_feature_csv)
+
+
+@st.cache_resource(show_spinner=False)
+def get_feature_store():
+    """모든 Streamlit 세션이 공유하는 FeatureStore 인스턴스"""
+    return FeatureStore(get_manifest_store())
+
+
+def load_manifest(data_folder=DATA_FOLDER, codes=None):
+    """
+    종목 파일들의 현재 매니페스트 (바뀐 파일만 다시 읽는다)
+
+    Args:
+        data_folder: feature 파일이 있는 폴더
+        codes: 종목 코드 목록 (None 이면 폴더의 모든 종목)
+
+    Returns:
+        manifest: DataManifest
+    """
+    codes = list_feature_codes(data_folder) if codes is None else codes
+    return get_manifest_store().snapshot({code: feature_path(code, data_folder) for code in codes})
+
+
+def benchmark_path(columns, data_folder=DATA_FOLDER):
+    """columns (또는 파생 feature 의 원본 컬럼)가 kodex_ 컬럼을 참조하고 KODEX 200 파일이 있으면 그 경로 (아니면 None)"""
+    if not benchmark_columns(required_columns(columns)):
+        return None
+    path = feature_path(KODEX_CODE, data_folder)
+    return path if os.path.exists(path) else None
+
+
+def data_signature(codes, data_folder=DATA_FOLDER, columns=None):
+    """
+    종목 파일들의 내용 해시 튜플 (한 종목이라도 내용이 바뀌면 달라지는 캐시 키)
+
+    columns 가 kodex_ 컬럼을 참조하면 KODEX 200 파일의 해시도 붙인다.
+    """
+    signature = load_manifest(data_folder, codes).signature(codes)
+    if benchmark_path(columns, data_folder) is not None:
+        signature += load_manifest(data_folder, [KODEX_CODE]).signature([KODEX_CODE])
+    return signature
+
+
+def load_features(code, data_folder=DATA_FOLDER, start=None, end=None, columns=None, backend=None):
+    """
+    종목 코드의 feature 데이터프레임을 캐시에서 가져오는 함수
+
+    Args:
+        code: 종목 코드 (예: "000660")
+        data_folder: feature 파일이 있는 폴더
+        start: 이 날짜 이후 데이터만 읽기 (None 이면 전체)
+        end: 이 날짜 이전 데이터만 읽기 (None 이면 전체)
+        columns: 필요한 컬럼 목록 (None 이면 전체, strategy_columns 참고).
+            이미 읽은 컬럼이 더 있으면 그 컬럼들도 함께 들어 있을 수 있다.
+            kodex_close 처럼 kodex_ 가 붙은 이름이 있으면 KODEX 200 의 해당 컬럼을
+            같은 날짜에 맞춰 옆에 붙인다 (한 번만 맞추고 캐시).
+            recent_high_8pct 같은 파생 feature(derived_features) 이름이 있으면 전체 이력에 대해
+            한 번만 계산해서 붙인다.
+        backend: 파일을 처음 읽을 때 쓸 CSV 파서 백엔드 (feature_backend, None 이면 pandas).
+            결과는 같으므로 이미 읽은 데이터는 백엔드와 관계없이 공유한다.
+
+    Returns:
+        df: 정규화된 컬럼명(date/open/high/low/close)을 가진 읽기 전용 데이터프레임
+    """
+    if start is not None:
+        start = pd.Timestamp(start)
+    if end is not None:
+        end = pd.Timestamp(end)
+    if columns is not None:
+        columns = tuple(columns)
+    path = feature_path(code, data_folder)
+    if derived_columns(columns):
+        base = tuple(required_columns(columns))
+        return get_derived_store().get(
+            path, data_signature([code], data_folder, base), start, end, columns,
+            lambda: load_features(code, data_folder, columns=base, backend=backend),
+        )
+    bm_path = benchmark_path(columns, data_folder)
+    if bm_path is not None:
+        return get_feature_store().joined(path, bm_path, start, end, columns, backend=backend)
+    return get_feature_store().get(path, start, end, columns, backend)
+
+
+def _maskable(cond, columns):
+    """numpy 마스크로 계산할 수 있는 조건식인지 (컴파일되고 참조하는 컬럼이 모두 있음)"""
+    try:
+        return not compile_condition(cond).missing(columns)
+    except (NotImplementedError, SyntaxError, TypeError, ValueError):
+        return False
+
+
+def load_condition_masks(code, conditions, data_folder=DATA_FOLDER, columns=None, exclude=(), backend=None, engine="auto"):
+    """
+    종목의 전체 이력에 대한 조건식별 bool 마스크를 캐시에서 가져오는 함수
+
+    조건식은 한 번만 파싱되고, 마스크는 (종목, 조건식, 데이터 버전) 별로 한 번만 계산된다.
+    새로 계산하는 조건식들은 하나의 식 DAG 로 묶어서 공통 부분식(예: 매수/매도 조건의 close / sma20)을
+    종목마다 한 번만 계산하므로, 한 전략의 조건식(매수 + 매도)은 한 번에 넘기는 것이 좋다.
+    날짜별 평가는 load_features(code, columns=columns) 의 앞쪽 일부(AsOfView 등)에 대해
+    ConditionMasks.any(view, cond) 로 하면 된다. point_in_time 파생 feature 를 쓰는 조건식
+    (latest_only_conditions)은 그 일부의 마지막 행에서만 평가된다.
+
+    Args:
+        code: 종목 코드
+        conditions: 조건식 문자열 목록
+        data_folder: feature 파일이 있는 폴더
+        columns: load_features 에 넘기는 columns (앱에서 쓰는 것과 같아야 함)
+        exclude: 앱에서 날짜별로 계산해서 붙이는 feature 이름 (이 이름을 쓰는 조건식은 마스크를 만들지 않음)
+        backend: CSV 파서와 마스크 계산에 쓸 백엔드 (feature_backend, None 이면 pandas)
+        engine: 새로 계산하는 마스크의 계산 엔진 ("auto", "numpy", "numexpr", ExpressionDAG.evaluate 참고)
+
+    Returns:
+        masks: ConditionMasks
+    """
+    path = feature_path(code, data_folder)
+    version = data_signature([code], data_folder, columns)
+    df = load_features(code, data_folder, columns=columns, backend=backend)
+    cache = get_condition_cache()
+    exclude = set(exclude)
+
+    compiled_conditions = []
+    for cond in dict.fromkeys(conditions):
+        try:
+            compiled = compile_condition(cond)
+        except (NotImplementedError, SyntaxError, TypeError, ValueError):
+            continue
+        if exclude.intersection(compiled.names) or compiled.missing(df.columns):
+            continue  # pandas query 로 평가 (오류 메시지도 기존과 같게)
+        compiled_conditions.append(cond)
+
+    masks, first_true = {}, {}
+    for cond, (mask, first) in cache.get_many(path, version, df, compiled_conditions, engine, get_backend(backend).condition_masks).items():
+        masks[cond], first_true[cond] = mask, first
+    return ConditionMasks(masks, first_true, latest_only_conditions(conditions))
+
+
+def condition_selectivity(codes, conditions, data_folder=DATA_FOLDER, columns=None, sample=32, rows=500):
+    """
+    조건식별 통과율을 종목/행 표본으로 추정하는 함수
+
+    종목 목록에서 고르게 뽑은 최대 sample 개 종목에 대해 마스크가 True 인 행 비율을 평균한다.
+    이미 캐시된 전체 이력 마스크가 있으면 그대로 쓰고, 없으면 이력에서 고르게 뽑은 최대 rows 개 행에서만
+    조건식을 계산한다 (추정용이라 캐시하지 않음). 어차피 전체 이력 마스크로 평가하는 앱은
+    rows=None 으로 마스크를 미리 만들어(load_condition_masks) 재사용하면 된다.
+
+    Args:
+        codes: 종목 코드 목록
+        conditions: 조건식 문자열 목록 (한 전략의 조건식을 함께 넘기면 공통 부분식을 함께 계산)
+        data_folder: feature 파일이 있는 폴더
+        columns: load_features 에 넘기는 columns (앱에서 쓰는 것과 같아야 함)
+        sample: 통과율을 잴 최대 종목 수 (None 이면 전체)
+        rows: 캐시된 마스크가 없을 때 종목마다 계산할 최대 행 수 (None 이면 전체 이력 마스크를 만들어 캐시)
+
+    Returns:
+        selectivity: {조건식: 0~1 통과율}. 마스크를 만들 수 없는 조건식(pandas query 로 평가)은 1.0
+    """
+    codes = list(codes)
+    if sample is not None and len(codes) > sample:
+        codes = [codes[i] for i in np.linspace(0, len(codes) - 1, sample, dtype=int)]
+    rates = {cond: [] for cond in conditions}
+    cache = get_condition_cache()
+    for code in codes:
+        try:
+            if rows is None:
+                masks = load_condition_masks(code, conditions, data_folder, columns=columns).masks
+            else:
+                masks = _sampled_masks(code, conditions, data_folder, columns, rows, cache)
+        except (OSError, ValueError):
+            continue  # 읽을 수 없는 종목은 실제 평가에서 경고가 나온다
+        for cond, mask in masks.items():
+            if len(mask):
+                rates[cond].append(mask.mean())
+    return {cond: float(np.mean(values)) if values else 1.0 for cond, values in rates.items()}
+
+
+def _sampled_masks(code, conditions, data_folder, columns, rows, cache):
+    """캐시된 전체 이력 마스크 + 나머지 조건식은 고르게 뽑은 rows 개 행에서 계산한 마스크"""
+    df = load_features(code, data_folder, columns=columns)
+    path = feature_path(code, data_folder)
+    masks = cache.cached(path, data_signature([code], data_folder, columns), len(df), conditions)
+    pending = [cond for cond in dict.fromkeys(conditions) if cond not in masks and _maskable(cond, df.columns)]
+    if pending and len(df):
+        if len(df) > rows:
+            df = df.take(np.linspace(0, len(df) - 1, rows, dtype=int)).reset_index(drop=True)
+        sampled, _ = condition_dag(pending).evaluate(df)
+        masks.update(sampled)
+    return masks
+
+
+def order_by_selectivity(conditions, selectivity):
+    """조건식을 많이 걸러내는 순서(통과율 오름차순)로 정렬한 목록 (같으면 입력 순서)"""
+    return sorted(conditions, key=lambda cond: selectivity.get(cond, 1.0))
+
+
+def warm_universe(codes, data_folder=DATA_FOLDER, columns=None, max_workers=None, on_progress=None, backend=None):
+    """
+    여러 종목의 feature 파일을 스레드 풀로 동시에 읽어 FeatureStore 에 올려두는 함수
+
+    CSV 파싱/Parquet 읽기는 대부분 GIL 밖에서 동작하므로 스레드로도 병렬화된다.
+    전체 소요 시간이 파일 크기의 합이 아니라 가장 큰 파일에 가까워진다.
+
+    Args:
+        codes: 종목 코드 목록
+        data_folder: feature 파일이 있는 폴더
+        columns: load_features 의 columns (None 이면 전체)
+        max_workers: 스레드 수 (None 이면 min(8, 종목 수, CPU 수))
+        on_progress: 파일 하나가 끝날 때마다 on_progress(완료 수, 전체 수, 결과) 호출
+        backend: CSV 파서 백엔드 (feature_backend, None 이면 pandas)
+
+    Returns:
+        timings: 종목별 {종목, 행 수, 소요 시간(초), 오류} 리스트 (완료 순서)
+    """
+    codes = list(codes)
+    if not codes:
+        return []
+    if max_workers is None:
+        max_workers = min(8, len(codes), os.cpu_count() or 1)
+
+    # 작업 스레드에서는 Streamlit 캐시를 부르지 않도록 저장소를 미리 가져온다
+    store = get_feature_store()
+    if columns is not None:
+        columns = tuple(columns)
+
+    def _load(code):
+        t0 = time.perf_counter()
+        try:
+            df = store.get(feature_path(code, data_folder), None, None, columns, backend)
+            rows, error = len(df), ""
+        except Exception as e:
+            rows, error = 0, f"{type(e).__name__}: {e}"
+        return {"종목": code, "행 수": rows, "소요 시간(초)": round(time.perf_counter() - t0, 3), "오류": error}
+
+    timings = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_load, code) for code in codes]
+        for future in as_completed(futures):
+            timings.append(future.result())
+            if on_progress is not None:
+                on_progress(len(timings), len(codes), timings[-1])
+    return timings
+
+
+def memory_report(codes, data_folder=DATA_FOLDER):
+    """
+    종목별 feature 데이터프레임 메모리 사용량 보고서
+
+    Args:
+        codes: 종목 코드 목록
+        data_folder: feature 파일이 있는 폴더
+
+    Returns:
+        report: 종목/행 수/컬럼 수/메모리(MB)/기본 dtype 기준(MB)/절감률(%) 데이터프레임
+    """
+    rows = []
+    for code in codes:
+        try:
+            df = load_features(code, data_folder)
+        except (OSError, KeyError, ValueError):
+            continue
+        actual, baseline = frame_memory(df)
+        rows.append({
+            "종목": code,
+            "행 수": len(df),
+            "컬럼 수": len(df.columns),
+            "메모리(MB)": round(actual / 1e6, 2),
+            "float64 기준(MB)": round(baseline / 1e6, 2),
+            "절감률(%)": round((1 - actual / baseline) * 100, 1) if baseline else 0.0,
+        })
+    return pd.DataFrame(rows)
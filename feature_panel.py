@@ -0,0 +1,280 @@
+import datetime as dt
+import hashlib
+import json
+import os
+import threading
+from glob import glob
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from feature_cache import CACHE_DIRNAME
+from feature_loader import DATA_FOLDER, ENGINE_COLUMNS, data_signature, list_feature_codes, load_features
+from feature_schema import compact_panel_array, panel_dtype
+
+PANEL_FORMAT_VERSION = 2  # 2: dtype 별로 나누어 저장 (지표는 float32)
+
+
+def to_date(d):
+    """date / datetime / Timestamp / datetime64 를 datetime.date 로 변환"""
+    if isinstance(d, dt.datetime):
+        return d.date()
+    if isinstance(d, dt.date):
+        return d
+    return pd.Timestamp(d).date()
+
+
+class FeaturePanel:
+    """
+    모든 종목을 하나의 거래일 달력에 맞춘 날짜 × 종목 × feature 패널
+
+    feature 마다 (날짜 수, 종목 수) 크기의 연속된 배열을 가지며 (지표는 float32,
+    가격/거래량은 float32 로 정확히 표현될 때만 float32 이고 아니면 float64),
+    해당 날짜에 종목 데이터가 없으면 값은 NaN 이고 present 마스크는 False 이다.
+
+    Attributes:
+        dates: 거래일 배열 (datetime64[D], 오름차순)
+        tickers: 종목 코드 목록
+        features: feature 이름 목록
+        values: {feature: 2차원 배열 (dates × tickers)}
+        present: 종목별 데이터 존재 여부 (dates × tickers, bool)
+    """
+
+    def __init__(self, dates, tickers, features, values, present):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.features = list(features)
+        self.values = values
+        self.present = present
+        self._date_pos = {d: i for i, d in enumerate(dates.tolist())}
+        self._ticker_pos = {code: j for j, code in enumerate(self.tickers)}
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.tickers)
+
+    def date_index(self, d):
+        """거래일의 정수 인덱스 (거래일이 아니면 -1)"""
+        return self._date_pos.get(to_date(d), -1)
+
+    def ticker_index(self, code):
+        """종목의 정수 인덱스 (없으면 -1)"""
+        return self._ticker_pos.get(code, -1)
+
+    def has_bar(self, d, code):
+        """해당 날짜에 종목 데이터가 있는지 여부"""
+        i = self.date_index(d)
+        j = self.ticker_index(code)
+        return i >= 0 and j >= 0 and bool(self.present[i, j])
+
+    def value(self, d, code, feature):
+        """(날짜, 종목, feature) 값 (float). 데이터가 없으면 None"""
+        i = self.date_index(d)
+        j = self.ticker_index(code)
+        if i < 0 or j < 0 or not self.present[i, j]:
+            return None
+        return float(self.values[feature][i, j])
+
+    def cross_section(self, d, feature):
+        """해당 날짜의 전 종목 feature 값 (1차원 배열, 데이터 없는 종목은 NaN)"""
+        i = self.date_index(d)
+        if i < 0:
+            return np.full(len(self.tickers), np.nan)
+        return self.values[feature][i]
+
+    def series(self, code, feature):
+        """종목 하나의 feature 시계열 (1차원 배열, 거래일 달력 기준)"""
+        return self.values[feature][:, self.ticker_index(code)]
+
+
+def build_feature_panel(codes, data_folder=DATA_FOLDER, columns=None):
+    """
+    종목별 feature 데이터프레임을 하나의 패널로 정렬하는 함수
+
+    Args:
+        codes: 종목 코드 목록
+        data_folder: feature 파일이 있는 폴더
+        columns: 패널에 넣을 컬럼 목록 (None 이면 모든 숫자 컬럼)
+
+    Returns:
+        panel: FeaturePanel
+    """
+    frames = {code: load_features(code, data_folder, columns=columns) for code in codes}
+
+    # 모든 종목 날짜의 합집합을 거래일 달력으로 사용
+    all_dates = [df["date"].values.astype("datetime64[D]") for df in frames.values()]
+    dates = np.unique(np.concatenate(all_dates)) if all_dates else np.array([], dtype="datetime64[D]")
+
+    features = []
+    for df in frames.values():
+        for col in df.columns:
+            if col != "date" and col not in features and pd.api.types.is_numeric_dtype(df[col]):
+                features.append(col)
+
+    n_dates, n_tickers = len(dates), len(codes)
+    values = {feature: np.full((n_dates, n_tickers), np.nan, dtype=panel_dtype(feature)) for feature in features}
+    present = np.zeros((n_dates, n_tickers), dtype=bool)
+
+    for j, code in enumerate(codes):
+        df = frames[code]
+        rows = np.searchsorted(dates, df["date"].values.astype("datetime64[D]"))
+        present[rows, j] = True
+        for feature in features:
+            if feature in df.columns:
+                values[feature][rows, j] = df[feature].to_numpy(dtype=values[feature].dtype, na_value=np.nan)
+
+    values = {feature: compact_panel_array(feature, arr) for feature, arr in values.items()}
+    return FeaturePanel(dates, codes, features, values, present)
+
+
+def _digest(value):
+    return hashlib.blake2b(json.dumps(value).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def panel_tag(codes, signature, columns=None):
+    """
+    종목/컬럼 목록과 데이터 버전으로 만든 패널 파일 식별자 ("{종목/컬럼 목록 해시}_{버전 해시}")
+
+    앞부분이 같은 파일은 같은 종목/컬럼 목록의 다른 버전이므로 새 버전을 쓸 때 정리한다.
+    """
+    layout = list(codes) if columns is None else [list(codes), list(columns)]
+    return f"{_digest(layout)}_{_digest([PANEL_FORMAT_VERSION, layout, list(signature)])}"
+
+
+def _panel_files(data_folder, tag):
+    folder = os.path.join(data_folder, CACHE_DIRNAME, "panel")
+    return (
+        os.path.join(folder, f"panel_{tag}.json"),
+        os.path.join(folder, f"panel_{tag}_values"),  # + _{dtype}.npy
+        os.path.join(folder, f"panel_{tag}_present.npy"),
+    )
+
+
+def _dtype_groups(panel):
+    """{dtype 이름: [feature, ...]} (feature 순서 유지)"""
+    groups = {}
+    for feature in panel.features:
+        groups.setdefault(np.dtype(panel.values[feature].dtype).name, []).append(feature)
+    return groups
+
+
+def write_panel_memmap(panel, data_folder, tag):
+    """
+    패널을 memory-map 가능한 npy 파일과 헤더(json)로 저장하는 함수
+
+    values 는 dtype 별로 (feature 수, 날짜 수, 종목 수) 배열 하나씩 저장되고,
+    헤더에는 종목/날짜/feature 목록과 각 feature 의 (dtype, 위치)가 들어간다.
+    헤더를 마지막에 쓰기 때문에 헤더가 있으면 데이터 파일은 완성된 상태이다.
+    """
+    header_path, values_prefix, present_path = _panel_files(data_folder, tag)
+    os.makedirs(os.path.dirname(header_path), exist_ok=True)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"  # 같은 프로세스의 다른 세션(스레드)과 겹치지 않게
+
+    n_dates, n_tickers = panel.shape
+    groups = _dtype_groups(panel)
+    for dtype_name, features in groups.items():
+        values_path = f"{values_prefix}_{dtype_name}.npy"
+        values = np.lib.format.open_memmap(
+            values_path + suffix, mode="w+", dtype=np.dtype(dtype_name),
+            shape=(len(features), n_dates, n_tickers),
+        )
+        for k, feature in enumerate(features):
+            values[k] = panel.values[feature]
+        values.flush()
+        del values
+        os.replace(values_path + suffix, values_path)
+    np.save(present_path + suffix, panel.present, allow_pickle=False)
+    os.replace(present_path + suffix + ".npy", present_path)
+
+    header = {
+        "version": PANEL_FORMAT_VERSION,
+        "tag": tag,
+        "tickers": panel.tickers,
+        "dates": [str(d) for d in panel.dates],
+        "features": panel.features,
+        "groups": {dtype_name: features for dtype_name, features in groups.items()},
+        "shape": [n_dates, n_tickers],
+    }
+    with open(header_path + suffix, "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(header_path + suffix, header_path)
+
+    # 같은 종목 목록의 이전 버전 패널 파일 정리 (다른 프로세스가 map 중이어도 POSIX 에서는 안전)
+    # 다른 종목 목록의 패널은 다른 앱/세션이 쓰고 있을 수 있으므로 남겨 둔다
+    code_set = tag.split("_")[0]
+    for path in glob(os.path.join(os.path.dirname(header_path), f"panel_{code_set}_*")):
+        name = os.path.basename(path)
+        if not name.startswith(f"panel_{tag}") and not name.endswith((".tmp", ".tmp.npy")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def open_panel_memmap(data_folder, tag):
+    """
+    저장된 패널 파일을 읽기 전용으로 memory-map 하는 함수 (복사 없음)
+
+    Returns:
+        panel: FeaturePanel (없거나 형식이 다르면 None)
+    """
+    header_path, values_prefix, present_path = _panel_files(data_folder, tag)
+    try:
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != PANEL_FORMAT_VERSION:
+            return None
+        present = np.load(present_path, mmap_mode="r")
+        feature_values = {}
+        for dtype_name, features in header["groups"].items():
+            values = np.load(f"{values_prefix}_{dtype_name}.npy", mmap_mode="r")
+            if list(values.shape) != [len(features)] + header["shape"]:
+                return None
+            for k, feature in enumerate(features):
+                feature_values[feature] = values[k]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    dates = np.array(header["dates"], dtype="datetime64[D]")
+    return FeaturePanel(dates, header["tickers"], header["features"], feature_values, present)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_panel(codes, data_folder, signature, columns=None):
+    tag = panel_tag(codes, signature, columns)
+    panel = open_panel_memmap(data_folder, tag)
+    if panel is not None:
+        return panel
+
+    panel = build_feature_panel(list(codes), data_folder, None if columns is None else list(columns))
+    try:
+        write_panel_memmap(panel, data_folder, tag)
+    except OSError:
+        return panel  # 쓰기 불가능한 폴더에서는 메모리 패널 사용
+    return open_panel_memmap(data_folder, tag) or panel
+
+
+def load_feature_panel(data_folder=DATA_FOLDER, codes=None, columns=None):
+    """
+    데이터 폴더 전체(또는 지정 종목/컬럼)의 패널을 캐시에서 가져오는 함수
+
+    앱에서는 거래 대상 종목과 가격 컬럼만 넘겨서 쓰지 않는 종목/지표를 읽지 않게 한다.
+
+    Args:
+        data_folder: feature 파일이 있는 폴더
+        codes: 종목 코드 목록 (None 이면 폴더의 모든 종목)
+        columns: 패널에 넣을 컬럼 목록 (None 이면 모든 숫자 컬럼, 예: ENGINE_COLUMNS)
+
+    Returns:
+        panel: 모든 세션/프로세스가 memory-map 으로 공유하는 읽기 전용 FeaturePanel
+    """
+    codes = tuple(codes) if codes is not None else tuple(list_feature_codes(data_folder))
+    columns = tuple(columns) if columns is not None else None
+    return _cached_panel(codes, data_folder, data_signature(codes, data_folder), columns)
+
+
+if __name__ == "__main__":
+    # 서버 시작 전에 패널 파일을 미리 만들어 둔다: python feature_panel.py (app6 기본값인 전체 종목의 OHLC)
+    panel = load_feature_panel(DATA_FOLDER, columns=ENGINE_COLUMNS)
+    print(f"panel: {panel.shape[0]} dates x {panel.shape[1]} tickers x {len(panel.features)} features")
@@ -0,0 +1,188 @@
+import builtins
+import datetime as dt
+import os
+
+import pandas as pd
+import streamlit as st
+
+from derived_features import find_derived
+from feature_cache import read_feature_meta
+from feature_loader import (
+    BENCHMARK_PREFIX, DATA_FOLDER, KODEX_CODE, condition_identifiers, feature_path, list_feature_codes,
+    parse_feature_csv,
+)
+
+
+class FeatureRegistry:
+    """
+    종목별 feature 컬럼 스키마 모음 (row 데이터 없이 캐시 메타데이터만 사용)
+
+    "Available Features" 목록, 조건식 검증 등 컬럼 정보만 필요한 곳에서 사용한다.
+
+    Attributes:
+        codes: 종목 코드 목록
+        schemas: {종목: {컬럼명: {"dtype": dtype 이름, "first_valid": "YYYY-MM-DD" 또는 None, "warmup": 행 수}}}
+        rows: {종목: 행 수 (캐시가 없어 앞쪽 일부만 읽었으면 None)}
+        last_dates: {종목: 마지막 날짜 문자열}
+    """
+
+    def __init__(self, schemas, rows=None, last_dates=None):
+        self.schemas = schemas
+        self.codes = list(schemas)
+        self.rows = rows or {}
+        self.last_dates = last_dates or {}
+
+    def columns(self, code):
+        """종목의 컬럼 목록 (파일 순서, 없는 종목이면 빈 리스트)"""
+        return list(self.schemas.get(code, {}))
+
+    def has(self, code, col):
+        return col in self.schemas.get(code, {})
+
+    def dtype(self, code, col):
+        """컬럼 dtype 이름 (없으면 None)"""
+        return self.schemas.get(code, {}).get(col, {}).get("dtype")
+
+    def first_valid(self, code, col):
+        """컬럼 값이 처음으로 NaN 이 아닌 날짜 (datetime.date, 없으면 None)"""
+        value = self.schemas.get(code, {}).get(col, {}).get("first_valid")
+        return dt.date.fromisoformat(value) if value else None
+
+    def warmup(self, code, col):
+        """컬럼 값이 처음 유효해지기 전의 결측 행 수 (지표 계산 warm-up 길이, 없으면 None)"""
+        return self.schemas.get(code, {}).get(col, {}).get("warmup")
+
+    def all_columns(self, codes=None):
+        """여러 종목 컬럼의 합집합 (처음 나온 순서)"""
+        names = {}
+        for code in self.codes if codes is None else codes:
+            for col in self.schemas.get(code, {}):
+                names.setdefault(col, None)
+        return list(names)
+
+    def tickers_with(self, col, codes=None):
+        """컬럼을 가진 종목 목록"""
+        return [code for code in (self.codes if codes is None else codes) if self.has(code, col)]
+
+    def coverage(self, codes=None):
+        """
+        컬럼별 dtype/보유 종목 수/첫 유효 날짜 요약
+
+        Returns:
+            df: feature, dtype, 보유 종목 수, 첫 유효일(가장 이른), 첫 유효일(가장 늦은)
+        """
+        codes = self.codes if codes is None else [code for code in codes if code in self.schemas]
+        rows = []
+        for col in self.all_columns(codes):
+            holders = self.tickers_with(col, codes)
+            dtypes = sorted({self.dtype(code, col) for code in holders})
+            firsts = [d for d in (self.first_valid(code, col) for code in holders) if d is not None]
+            rows.append({
+                "feature": col,
+                "dtype": ", ".join(dtypes),
+                "보유 종목 수": f"{len(holders)}/{len(codes)}",
+                "첫 유효일(가장 이른)": min(firsts) if firsts else None,
+                "첫 유효일(가장 늦은)": max(firsts) if firsts else None,
+            })
+        return pd.DataFrame(rows)
+
+    def validate(self, conditions, codes, prefix=None, extra_names=()):
+        """
+        조건식이 참조하는 이름이 선택 종목의 컬럼에 있는지 검사하는 함수
+
+        Args:
+            conditions: 조건식 문자열 목록
+            codes: 조건을 평가할 종목 목록
+            prefix: 지정하면 이 접두어가 붙은 이름만 컬럼으로 본다 (예: "kodex_")
+            extra_names: 앱에서 직접 계산해서 붙이는 feature 이름 (예: return_3d)
+
+        Returns:
+            messages: 경고 메시지 목록 (문제가 없으면 빈 리스트)
+        """
+        codes = [code for code in codes if code in self.schemas]
+        if not codes:
+            return []
+        known = set(extra_names) | set(dir(builtins))
+
+        messages = []
+        for cond in conditions:
+            names = condition_identifiers([cond])
+            if prefix is not None:
+                columns = {name[len(prefix):] for name in names if name.startswith(prefix)}
+                others = {name for name in names if not name.startswith(prefix)} - known
+                for name in sorted(others):
+                    messages.append(f"'{cond}': '{name}' 는 '{prefix}' 접두어가 없어 사용할 수 없습니다.")
+            else:
+                columns = names - known
+                # kodex_ 이름은 종목 옆에 붙는 KODEX 200 컬럼 (load_features 참고)
+                for name in sorted(name for name in columns if name.startswith(BENCHMARK_PREFIX)):
+                    if KODEX_CODE in self.schemas:
+                        columns.discard(name)
+                        if not self.has(KODEX_CODE, name[len(BENCHMARK_PREFIX):]):
+                            messages.append(f"'{cond}': '{name}' 는 KODEX 200 데이터에 없는 feature 입니다.")
+            for col in sorted(columns - known):
+                if find_derived(col) is not None:
+                    continue  # 파생 feature 는 load_features 가 계산해서 붙인다
+                missing = [code for code in codes if not self.has(code, col)]
+                if len(missing) == len(codes):
+                    messages.append(f"'{cond}': '{(prefix or '') + col}' 는 데이터에 없는 feature 입니다.")
+                elif missing:
+                    messages.append(f"'{cond}': '{(prefix or '') + col}' 가 없는 종목 {len(missing)}개 ({', '.join(missing)})")
+        return messages
+
+
+def build_feature_registry(codes, data_folder=DATA_FOLDER):
+    """
+    종목별 캐시 메타데이터로 FeatureRegistry 를 만드는 함수
+    (캐시가 없는 파일은 CSV 전체를 파싱하지 않고 앞쪽 일부 행으로 어림한다: read_feature_meta 참고)
+
+    Args:
+        codes: 종목 코드 목록
+        data_folder: feature 파일이 있는 폴더
+
+    Returns:
+        registry: FeatureRegistry (읽을 수 없는 파일은 제외)
+    """
+    schemas, rows, last_dates = {}, {}, {}
+    for code in codes:
+        try:
+            meta = read_feature_meta(feature_path(code, data_folder), parse_feature_csv)
+        except (OSError, KeyError, ValueError):
+            continue
+        schemas[code] = meta["schema"]
+        rows[code] = meta["rows"]
+        last_dates[code] = meta.get("last_date")
+    return FeatureRegistry(schemas, rows, last_dates)
+
+
+def file_stamps(codes, data_folder):
+    """종목 파일별 (크기, 수정시각). 매니페스트(data_signature)와 달리 파일을 읽지 않는다"""
+    stamps = []
+    for code in codes:
+        try:
+            stat = os.stat(feature_path(code, data_folder))
+            stamps.append((stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_registry(codes, data_folder, stamps):
+    return build_feature_registry(list(codes), data_folder)
+
+
+def load_feature_registry(data_folder=DATA_FOLDER, codes=None):
+    """
+    데이터 폴더 전체(또는 지정 종목)의 FeatureRegistry 를 캐시에서 가져오는 함수
+
+    Args:
+        data_folder: feature 파일이 있는 폴더
+        codes: 종목 코드 목록 (None 이면 폴더의 모든 종목)
+
+    Returns:
+        registry: 파일이 바뀌면 다시 만들어지는 FeatureRegistry
+    """
+    codes = tuple(codes) if codes is not None else tuple(list_feature_codes(data_folder))
+    # 처음 만들 때 매니페스트를 만들면 모든 CSV 를 파싱하게 되므로 파일 크기/수정시각을 키로 쓴다
+    return _cached_registry(codes, data_folder, file_stamps(codes, data_folder))
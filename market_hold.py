@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from condition_compiler import compile_expression
+from feature_loader import DATA_FOLDER, KODEX_CODE, data_signature, load_features
+
+
+class MarketHold:
+    """
+    시장 보유 조건을 벤치마크 전체 이력에 대해 한 번에 계산해 둔 결과
+
+    사이클마다 한 행으로 local_dict 를 만들어 eval 하던 것을 조건식 컴파일 한 번과
+    전체 이력 벡터 연산 한 번으로 바꾸고, 사이클에서는 해당 행의 값만 읽는다.
+    컴파일할 수 없는 식(문자열 비교, & / | 비트 연산, 없는 변수 등)은 기존처럼 행마다 eval 한다.
+
+    Attributes:
+        condition: 시장 보유 조건식 (Python eval 형식)
+        prefix: 조건식의 변수 접두어 (예: "kodex_")
+        df: 벤치마크 데이터프레임
+        mask: 행별 보유 여부 (bool 배열). None 이면 행마다 eval 로 평가
+    """
+
+    def __init__(self, condition, df, prefix=""):
+        self.condition = condition
+        self.prefix = prefix
+        self.df = df
+        self._dates = df["date"].to_numpy()
+        try:
+            self.mask = compile_expression(condition).evaluate(df, prefix)
+        except (KeyError, NotImplementedError, SyntaxError, TypeError, ValueError):
+            self.mask = None
+
+    def variables(self, row):
+        """eval 에 넘기는 변수 딕셔너리 (접두어가 붙은 컬럼명 → 값)"""
+        return {f"{self.prefix}{col}": row.iloc[0][col] for col in row.columns}
+
+    def at(self, row):
+        """
+        df 의 한 행(단일 행 데이터프레임)에서의 시장 보유 여부
+
+        Raises:
+            NameError 등: 컴파일할 수 없는 식을 eval 할 때 나는 오류 (기존과 같음)
+        """
+        if self.mask is None:
+            return eval(self.condition, {}, self.variables(row))
+        i = int(np.searchsorted(self._dates, pd.Timestamp(row["date"].iloc[0]).to_datetime64()))
+        return bool(self.mask[i])
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _cached_hold(condition, code, data_folder, columns, prefix, signature):
+    return MarketHold(condition, load_features(code, data_folder, columns=columns), prefix)
+
+
+def load_market_hold(condition, code=KODEX_CODE, data_folder=DATA_FOLDER, columns=None, prefix="kodex_"):
+    """
+    벤치마크 종목의 시장 보유 조건 전체 이력을 캐시에서 가져오는 함수 (종목 파일이 바뀌면 다시 계산)
+
+    Args:
+        condition: 시장 보유 조건식
+        code: 벤치마크 종목 코드 (기본: KODEX 200)
+        data_folder: feature 파일이 있는 폴더
+        columns: load_features 에 넘기는 columns
+        prefix: 조건식의 변수 접두어 (app2 처럼 종목 컬럼을 그대로 쓰면 "")
+
+    Returns:
+        hold: MarketHold
+    """
+    columns = tuple(columns) if columns is not None else None
+    return _cached_hold(condition, code, data_folder, columns, prefix, data_signature([code], data_folder))
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+
+class PointInTime:
+    """
+    날짜순으로 정렬된 종목 데이터프레임의 시점 조회 도구
+
+    날짜 컬럼을 그대로 numpy 배열로 보고 이진 탐색(searchsorted)으로 위치를 찾는다.
+    매번 필터링 + sort_values 하던 조회가 O(log n) 이 되고, 결과는 원본의 iloc 슬라이스라
+    복사가 없다. (load_features 가 반환한 데이터프레임은 이미 날짜순으로 정렬되어 있다)
+
+    반환값은 모두 데이터프레임이며, 해당하는 행이 없으면 빈 데이터프레임이다.
+    기존 코드처럼 len(...) 으로 존재 여부를 확인하고 .query() 를 그대로 쓸 수 있다.
+    """
+
+    def __init__(self, df, date_col="date"):
+        self.df = df
+        self.date_col = date_col
+        self.dates = df[date_col].to_numpy()
+
+    def _key(self, d):
+        return pd.Timestamp(d).to_datetime64()
+
+    def left(self, d):
+        """d 이상인 첫 행의 위치"""
+        return int(np.searchsorted(self.dates, self._key(d), side="left"))
+
+    def right(self, d):
+        """d 초과인 첫 행의 위치"""
+        return int(np.searchsorted(self.dates, self._key(d), side="right"))
+
+    def on(self, d):
+        """날짜가 d 인 행"""
+        return self.df.iloc[self.left(d):self.right(d)]
+
+    def asof(self, d, inclusive=True):
+        """
+        d 시점에 알 수 있는 마지막 행
+
+        Args:
+            d: 기준 날짜
+            inclusive: True 면 d 당일 포함 (date <= d), False 면 d 이전만 (date < d)
+        """
+        end = self.right(d) if inclusive else self.left(d)
+        return self.df.iloc[max(end - 1, 0):end]
+
+    def next_after(self, d, inclusive=False):
+        """
+        d 이후의 첫 행
+
+        Args:
+            d: 기준 날짜
+            inclusive: True 면 d 당일 포함 (date >= d), False 면 d 다음부터 (date > d)
+        """
+        start = self.left(d) if inclusive else self.right(d)
+        return self.df.iloc[start:start + 1]
+
+    def window(self, start=None, end=None):
+        """start <= date <= end 인 행 (None 이면 해당 방향 끝까지)"""
+        lo = 0 if start is None else self.left(start)
+        hi = len(self.dates) if end is None else self.right(end)
+        return self.df.iloc[lo:hi]
+
+    def until(self, d, inclusive=True):
+        """
+        d 시점까지의 이력만 보여주는 읽기 전용 AsOfView (복사 없음)
+
+        Args:
+            d: 기준 날짜
+            inclusive: True 면 d 당일 포함, False 면 d 전날까지
+        """
+        end = self.right(d) if inclusive else self.left(d)
+        return AsOfView(self.df, end, self.date_col)
+
+
+class LookAheadError(LookupError):
+    """as-of 뷰의 기준 시점 이후 데이터에 접근하려고 할 때 발생"""
+
+
+class AsOfView:
+    """
+    데이터프레임의 앞쪽 end 행(기준 시점까지의 이력)만 노출하는 읽기 전용 뷰
+
+    df[df[date_col] <= 날짜].copy() 대신 사용한다. 내부적으로 iloc[:end] 슬라이스만 들고 있어
+    복사가 없고, 값을 대입하는 것은 막혀 있다. 기준 시점 이후 날짜로 조회하면 LookAheadError 를 낸다.
+    파생 컬럼이 필요하면 with_columns 로 기존 컬럼을 복사하지 않고 새 뷰를 만든다.
+    """
+
+    def __init__(self, df, end, date_col="date"):
+        self._frame = df.iloc[:end]
+        self.date_col = date_col
+        self._pit = PointInTime(self._frame, date_col)
+
+    @property
+    def frame(self):
+        """기준 시점까지의 데이터프레임 (공유 데이터이므로 수정 금지)"""
+        return self._frame
+
+    @property
+    def cutoff(self):
+        """뷰에 포함된 마지막 날짜 (비어 있으면 None)"""
+        return self._pit.dates[-1] if len(self._pit.dates) else None
+
+    @property
+    def columns(self):
+        return self._frame.columns
+
+    def __len__(self):
+        return len(self._frame)
+
+    def __getitem__(self, col):
+        return self._frame[col]
+
+    def __setitem__(self, col, value):
+        raise TypeError("AsOfView 는 읽기 전용입니다. with_columns 를 사용하세요.")
+
+    def __contains__(self, col):
+        return col in self._frame.columns
+
+    def _check(self, d):
+        cutoff = self.cutoff
+        if cutoff is not None and self._pit._key(d) > cutoff:
+            raise LookAheadError(f"{pd.Timestamp(d).date()} 는 기준 시점 {pd.Timestamp(cutoff).date()} 이후입니다.")
+
+    def query(self, expr):
+        return self._frame.query(expr)
+
+    def last(self):
+        """기준 시점의 마지막 행"""
+        return self._frame.iloc[-1:]
+
+    def on(self, d):
+        self._check(d)
+        return self._pit.on(d)
+
+    def asof(self, d, inclusive=True):
+        self._check(d)
+        return self._pit.asof(d, inclusive=inclusive)
+
+    def window(self, start=None, end=None):
+        if end is not None:
+            self._check(end)
+        return self._pit.window(start, end)
+
+    def with_columns(self, **columns):
+        """
+        파생 컬럼을 더한 새 AsOfView
+
+        Args:
+            columns: {컬럼명: 뷰와 같은 길이의 Series 또는 배열}
+        """
+        return AsOfView(self._frame.assign(**columns), len(self._frame), self.date_col)
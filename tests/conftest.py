@@ -0,0 +1,18 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture
+def data_folder(tmp_path):
+    """저장소의 feature CSV 를 복사한 임시 데이터 폴더 (캐시 파일이 저장소에 생기지 않게)"""
+    def _copy(*codes):
+        for code in codes:
+            shutil.copy(os.path.join(REPO_DIR, f"{code}_features.csv"), tmp_path)
+        return str(tmp_path)
+    return _copy
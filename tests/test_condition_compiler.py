@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from condition_compiler import ConditionCache, ExpressionDAG, available_engines, condition_dag
+from feature_loader import condition_selectivity, feature_path, load_condition_masks, parse_feature_csv
+
+CONDITIONS = [
+    "sma20 > sma60",
+    "close > sma20 * 1.01 and rsi <= 30.1",
+    "(close - bb_lower) / (bb_upper - bb_lower) < 0.2",
+    "abs(macd - macd_signal) < 100",
+]
+
+
+@pytest.mark.skipif("numexpr" not in available_engines(), reason="numexpr 미설치")
+def test_numexpr_engine_matches_numpy(data_folder):
+    df = parse_feature_csv(feature_path("000660", data_folder("000660")))
+    expected, _ = condition_dag(CONDITIONS).evaluate(df, engine="numpy")
+    masks, errors = condition_dag(CONDITIONS).evaluate(df, engine="numexpr")
+    assert not errors
+    for cond in CONDITIONS:
+        assert np.array_equal(masks[cond], expected[cond]), cond
+
+
+def test_masks_match_query_for_every_engine(data_folder):
+    folder = data_folder("000660")
+    df = parse_feature_csv(feature_path("000660", folder))
+    for engine in available_engines():
+        masks = load_condition_masks("000660", CONDITIONS, folder, engine=engine)
+        for cond in CONDITIONS:
+            assert masks.masks[cond].tolist() == df.eval(cond).tolist(), (engine, cond)
+
+
+def test_selectivity_samples_rows_and_reuses_cached_masks(data_folder, monkeypatch):
+    folder = data_folder("000660", "373220")
+    codes = ["000660", "373220"]
+    evaluated = []
+    evaluate = ExpressionDAG.evaluate
+
+    def recording(self, df, *args, **kwargs):
+        evaluated.append(len(df))
+        return evaluate(self, df, *args, **kwargs)
+
+    monkeypatch.setattr(ExpressionDAG, "evaluate", recording)
+    conditions = CONDITIONS + ["no_such_column > 1"]
+    sampled = condition_selectivity(codes, conditions, folder, rows=200)
+    assert evaluated == [200, 200]  # 전체 이력이 아니라 표본 행만 계산
+    assert sampled["no_such_column > 1"] == 1.0
+
+    full = condition_selectivity(codes, conditions, folder, rows=None)  # 전체 이력 마스크를 만들어 캐시
+    evaluated.clear()
+    assert condition_selectivity(codes, conditions, folder, rows=200) == full
+    assert evaluated == []  # 캐시된 마스크 재사용
+    for cond in CONDITIONS:
+        assert abs(sampled[cond] - full[cond]) < 0.1
+
+
+def test_condition_cache_evicts_least_recently_used():
+    df = pd.DataFrame({"a": np.arange(10.0)})
+    cache = ConditionCache(max_entries=2)
+    first = cache.get("p", "v1", df, "a > 1")[0]
+    cache.get("p", "v1", df, "a > 2")
+    assert cache.get("p", "v1", df, "a > 1")[0] is first  # 최근에 씀 → "a > 2" 가 가장 오래됨
+    cache.get("p", "v1", df, "a > 3")
+    assert set(cache.cached("p", "v1", len(df), ["a > 1", "a > 2", "a > 3"])) == {"a > 1", "a > 3"}
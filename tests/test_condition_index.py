@@ -0,0 +1,73 @@
+import datetime as dt
+
+import numpy as np
+
+from condition_index import load_condition_index, pack_bits, unpack_bits
+from feature_loader import load_condition_masks, load_features
+from point_in_time import PointInTime
+
+CODES = ["000660", "373220"]
+CONDITIONS = ["sma20 > sma60", "rsi < 55", "close > sma20 * 1.02"]
+
+
+def _query_any(frame, cond):
+    return len(frame.query(cond)) > 0
+
+
+def test_select_between_matches_window_query(data_folder):
+    folder = data_folder(*CODES)
+    index = load_condition_index(CONDITIONS, folder, CODES)
+    assert index is not None
+    start, end = dt.date(2022, 2, 14), dt.date(2022, 3, 9)  # 373220 첫 행(2022-03-10) 전후 비교용
+
+    for d_start, d_end in [(start, end), (end, end + dt.timedelta(days=40))]:
+        candidates = dict(index.select_between(d_start, d_end, CONDITIONS[:1], CONDITIONS[1:]))
+        for code in CODES:
+            window = PointInTime(load_features(code, folder)).window(d_start, d_end)
+            if not _query_any(window, CONDITIONS[0]):
+                assert code not in candidates
+                continue
+            assert candidates[code] == sum(_query_any(window, cond) for cond in CONDITIONS[1:])
+
+
+def test_select_at_matches_last_row_query(data_folder):
+    folder = data_folder(*CODES)
+    index = load_condition_index(CONDITIONS, folder, CODES)
+    for start, end in [(None, dt.date(2022, 3, 9)), (dt.date(2023, 3, 1), dt.date(2023, 3, 31))]:
+        rows = index.last_rows(start, end)
+        candidates = dict(index.select_at(rows, CONDITIONS[:1], CONDITIONS[1:]))
+        for code in CODES:
+            last = PointInTime(load_features(code, folder)).window(start, end).iloc[-1:]
+            if len(last) == 0 or not _query_any(last, CONDITIONS[0]):
+                assert code not in candidates
+                continue
+            assert candidates[code] == sum(_query_any(last, cond) for cond in CONDITIONS[1:])
+    assert index.last_rows(None, dt.date(2022, 3, 9))[index.tickers.index("373220")] == -1  # 첫 행 전
+
+
+def test_pack_bits_round_trip():
+    rng = np.random.default_rng(0)
+    matrix = rng.random((5, 130)) < 0.3  # 종목 130개 → word 3개
+    words = pack_bits(matrix)
+    assert words.shape == (5, 3) and words.dtype == np.dtype("<u8")
+    for i in range(5):
+        assert np.array_equal(unpack_bits(words[i], 130), matrix[i])
+
+
+def test_select_matches_condition_masks(data_folder):
+    folder = data_folder(*CODES)
+    index = load_condition_index(CONDITIONS, folder, CODES)
+    frames = {code: load_features(code, folder) for code in CODES}
+    masks = {code: load_condition_masks(code, CONDITIONS, folder) for code in CODES}
+
+    for d in [dt.date(2022, 3, 9), dt.date(2022, 3, 14), dt.date(2023, 6, 30)]:
+        expected = []
+        for code in CODES:
+            view = PointInTime(frames[code]).until(d)
+            if len(view) == 0 or not masks[code].any(view, CONDITIONS[0]):
+                continue
+            expected.append((code, sum(masks[code].any(view, cond) for cond in CONDITIONS[1:])))
+            assert code in index.tickers_satisfying(CONDITIONS[0], d)
+        assert index.select(d, CONDITIONS[:1], CONDITIONS[1:]) == expected
+        assert index.select(d, CONDITIONS[:1], CONDITIONS[1:], min_optional=3) == [c for c in expected if c[1] >= 3]
+    assert index.members(index.listed(dt.date(2022, 3, 9))) == ["000660"]
@@ -0,0 +1,59 @@
+import os
+
+import data_manifest
+from data_manifest import ManifestStore, manifest_path
+from feature_loader import feature_path, parse_feature_csv
+
+
+def _counting_store(monkeypatch):
+    scans = []
+    refresh_cache = data_manifest.refresh_cache
+
+    def counting(path, parse_fn, columns=None):
+        scans.append(os.path.basename(path))
+        return refresh_cache(path, parse_fn, columns)
+
+    monkeypatch.setattr(data_manifest, "refresh_cache", counting)
+    return ManifestStore(parse_feature_csv), scans
+
+
+def test_manifest_rescans_only_changed_files(data_folder, monkeypatch):
+    folder = data_folder("000660", "373220")
+    paths = {code: feature_path(code, folder) for code in ("000660", "373220")}
+    store, scans = _counting_store(monkeypatch)
+    first = store.snapshot(paths)
+    assert sorted(scans) == ["000660_features.csv", "373220_features.csv"]
+    assert first.entries["373220"]["first_date"] == "2022-03-10"
+
+    scans.clear()
+    assert store.snapshot(paths).signature() == first.signature()
+    assert scans == []  # 크기/수정시각이 같으면 파일을 열지 않음
+
+    stat = os.stat(paths["000660"])
+    os.utime(paths["000660"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # touch 만
+    touched = store.snapshot(paths)
+    assert scans == ["000660_features.csv"]
+    assert touched.signature() == first.signature()  # 내용 해시는 그대로
+    assert touched.changed(first) == []
+
+    with open(paths["373220"], "ab") as f:
+        f.write(b"\n")
+    changed = store.snapshot(paths)
+    assert changed.changed(first) == ["373220"]
+
+
+def test_manifest_persists_between_stores(data_folder, monkeypatch):
+    folder = data_folder("000660")
+    path = feature_path("000660", folder)
+    store, scans = _counting_store(monkeypatch)
+    entry = store.entry(path)
+    assert os.path.exists(manifest_path(folder))
+
+    store, scans = _counting_store(monkeypatch)  # 재시작: manifest.json 재사용
+    assert store.entry(path) == entry
+    assert scans == []
+
+    monkeypatch.setattr(data_manifest, "MANIFEST_VERSION", data_manifest.MANIFEST_VERSION + 1)
+    store, scans = _counting_store(monkeypatch)  # 형식이 바뀌면 무시하고 다시 만듦
+    assert store.entry(path)["hash"] == entry["hash"]
+    assert scans == ["000660_features.csv"]
@@ -0,0 +1,58 @@
+import pandas as pd
+
+import feature_loader
+from condition_index import build_condition_index
+from feature_loader import latest_only_conditions, load_condition_masks, load_features, strategy_columns
+from point_in_time import PointInTime
+
+CODES = ("000660", "000270", "005490", "196170")
+
+
+def _recent_high_on_last_row(df, pct, window=5):
+    """기존 app4 의 calculate_recent_high_feature 처럼 기준일 전날 행의 값 하나만 계산 (창은 거래일 기준)"""
+    closes = df["close"].astype("float64").to_numpy()[-window:]
+    return len(closes) >= 2 and closes[-1] >= closes.min() * (1 + pct / 100)
+
+
+def test_recent_high_is_checked_on_yesterdays_row(data_folder):
+    folder = data_folder(*CODES)
+    conditions = ["recent_high_3pct == True", "recent_high_8pct == True"]
+    columns = strategy_columns(conditions)
+    index = build_condition_index(list(CODES), conditions, folder, columns=columns)
+    dates = pd.bdate_range("2024-03-01", "2025-06-30", freq="7B")
+
+    differs_from_ever = False
+    for check_date in dates:
+        yesterday = check_date - pd.Timedelta(days=1)
+        for cond, pct in zip(conditions, (3, 8)):
+            expected, ever = [], []
+            for code in CODES:
+                view = PointInTime(load_features(code, folder, columns=columns)).until(yesterday)
+                if len(view) == 0:
+                    continue
+                masks = load_condition_masks(code, conditions, folder, columns=columns)
+                if _recent_high_on_last_row(view.frame, pct):
+                    expected.append(code)
+                if masks.first_true[cond] < len(view):
+                    ever.append(code)
+                assert masks.any(view, cond) == (code in expected)
+            selected = [code for code, _ in index.select(yesterday, required=[cond])]
+            assert selected == expected
+            differs_from_ever |= expected != ever
+    assert differs_from_ever  # 한 번이라도 참이면 통과시키던 방식과는 결과가 달라야 의미 있는 검사
+
+
+def test_latest_only_conditions_parse_each_condition_once(monkeypatch):
+    feature_loader._is_latest_only.cache_clear()
+    parsed = []
+    identifiers = feature_loader.condition_identifiers
+
+    def counting(conditions, prefix=None):
+        parsed.extend(conditions)
+        return identifiers(conditions, prefix)
+
+    monkeypatch.setattr(feature_loader, "condition_identifiers", counting)
+    conditions = ["recent_high_8pct == 1", "rsi < 30"]
+    for _ in range(3):
+        assert latest_only_conditions(conditions) == {"recent_high_8pct == 1"}
+    assert parsed == conditions
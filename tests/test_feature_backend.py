@@ -0,0 +1,71 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from condition_compiler import compile_condition, condition_dag
+from feature_backend import _PolarsTranslator, available_backends, get_backend
+from feature_loader import feature_path, load_condition_masks, parse_feature_csv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+polars_only = pytest.mark.skipif("polars" not in available_backends(), reason="polars 미설치")
+
+# float32 지표와 상수 비교, int64 거래량 산술, NaN 이 섞인 warm-up 구간, != / 연쇄 비교 / abs / not
+CONDITIONS = [
+    "rsi <= 30.1",
+    "rsi < 30 | rsi > 70",
+    "close > sma20 * 1.01 & sma20 > sma60",
+    "sma20 != sma60",
+    "not sma5 >= sma20",
+    "30 < rsi < 70",
+    "(close - bb_lower) / (bb_upper - bb_lower) < 0.2",
+    "abs(macd - macd_signal) < 100",
+    "-macd > 0",
+    "volume * 200 > 1e9",
+    "volume > volume_ma20 * 2",
+    "volume / volume_ma20 > 1.5",
+    "cdl_doji + cdl_hammer > 0",
+]
+FALLBACK = ["close ** 2 > sma20 ** 2"]  # polars 로 옮기지 않고 DAG 로 계산
+
+
+@polars_only
+def test_polars_parse_matches_pandas(data_folder):
+    path = feature_path("000660", data_folder("000660"))
+    expected = parse_feature_csv(path)
+    pd.testing.assert_frame_equal(parse_feature_csv(path, backend="polars"), expected)
+    pd.testing.assert_frame_equal(parse_feature_csv(path, backend=get_backend("polars")), expected)
+    # 한쪽 세션에서 polars 를 골라도 백엔드를 넘기지 않은 호출은 pandas 로 읽는다
+    assert get_backend().name == "pandas"
+
+
+@polars_only
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(REPO_DIR, "*_features.csv"))), ids=os.path.basename)
+def test_polars_masks_match_dag(path):
+    df = parse_feature_csv(path)
+    conditions = [
+        cond for cond in CONDITIONS + FALLBACK
+        if not compile_condition(cond).missing(df.columns)
+    ]
+    dag = condition_dag(conditions)
+    for cond in conditions:
+        if cond in CONDITIONS:
+            _PolarsTranslator(df).boolean(dag.roots[cond])  # DAG 로 넘기지 않고 polars 로 계산하는지
+
+    expected, _ = dag.evaluate(df, engine="numpy")
+    masks = get_backend("polars").condition_masks(df, conditions)
+    assert list(masks) == conditions
+    for cond in conditions:
+        assert np.array_equal(masks[cond], expected[cond]), cond
+
+
+def test_masks_do_not_depend_on_backend(data_folder):
+    folder = data_folder("000660")
+    conditions = ["rsi <= 30.1", "close > sma20 * 1.01"]
+    df = parse_feature_csv(feature_path("000660", folder))
+    for name in available_backends():
+        masks = load_condition_masks("000660", conditions, folder, columns=["rsi", "close", "sma20"], backend=name)
+        for cond in conditions:
+            assert masks.masks[cond].tolist() == df.eval(cond).tolist()
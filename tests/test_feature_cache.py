@@ -0,0 +1,123 @@
+import os
+
+import pandas as pd
+
+import feature_loader
+from data_manifest import ManifestStore
+from feature_cache import _parse_tail, read_features_cached, refresh_cache
+from feature_schema import frame_schema
+from feature_loader import FeatureStore, feature_path, parse_feature_csv
+
+
+def _recording_stores(monkeypatch):
+    parsed = []
+
+    def recording(path, columns=None, backend=None):
+        parsed.append(None if columns is None else sorted(columns))
+        return parse_feature_csv(path, columns, backend)
+
+    monkeypatch.setattr(feature_loader, "parse_feature_csv", recording)
+    return FeatureStore(ManifestStore(recording)), parsed
+
+
+def test_cold_get_parses_only_requested_columns(data_folder, monkeypatch):
+    path = feature_path("000660", data_folder("000660"))
+    full = parse_feature_csv(path)
+
+    store, parsed = _recording_stores(monkeypatch)
+    df = store.get(path, columns=("close",))
+    assert None not in parsed  # 전체 컬럼 파싱 없음
+    pd.testing.assert_frame_equal(df, full[["date", "close"]])
+
+    df = store.get(path, columns=("close", "rsi"))
+    assert parsed[-1] == ["close", "date", "rsi"]  # 캐시를 컬럼만 늘려 다시 만듦
+    pd.testing.assert_frame_equal(df, full[["date", "close", "rsi"]])
+
+    store, parsed = _recording_stores(monkeypatch)  # 재시작: 캐시에서만 읽음
+    df = store.get(path, columns=("rsi",))
+    assert parsed == []
+    pd.testing.assert_frame_equal(df, full[["date", "rsi"]])
+
+    df = store.get(path)
+    assert len(parsed) == 1
+    pd.testing.assert_frame_equal(df, full)
+
+
+def test_feature_store_is_bounded(data_folder):
+    folder = data_folder("000660", "373220", "005380")
+    store = FeatureStore(ManifestStore(parse_feature_csv), max_frames=2)
+    for code in ("000660", "373220", "005380"):
+        store.get(feature_path(code, folder), columns=("close",))
+    assert [key[0] for key in store._frames] == [feature_path(code, folder) for code in ("373220", "005380")]
+
+
+def _write_rows(path, lines, n):
+    with open(path, "wb") as f:
+        f.write(b"".join(lines[:n + 1]))  # 헤더 + 앞쪽 n 행
+
+
+def _source_lines(folder, code):
+    with open(feature_path(code, folder), "rb") as f:
+        return f.read().splitlines(keepends=True)
+
+
+def test_append_parses_only_new_rows(data_folder):
+    folder = data_folder("000660")
+    path = feature_path("000660", folder)
+    lines = _source_lines(folder, "000660")
+    full = parse_feature_csv(path)
+
+    _write_rows(path, lines, 200)  # sma240 은 아직 warm-up 중 (모두 NaN)
+    old = refresh_cache(path, parse_feature_csv)
+    assert old["rows"] == 200 and old["schema"]["sma240"]["first_valid"] is None
+
+    parsed = []
+
+    def recording(source, columns=None):
+        parsed.append(type(source).__name__)
+        return parse_feature_csv(source, columns)
+
+    _write_rows(path, lines, len(lines) - 1)
+    meta = refresh_cache(path, recording)
+    assert parsed == ["BytesIO"]  # 추가된 부분만 파싱
+    assert meta["history"][0] == old["hash"]
+    assert meta["rows"] == len(full)
+    # 경계를 넘어 warm-up 이 끝나는 지표도 전체 파싱과 같음
+    assert meta["schema"] == frame_schema(full)
+    pd.testing.assert_frame_equal(read_features_cached(path, parse_feature_csv), full)
+
+
+def test_changed_prefix_rebuilds_cache(data_folder):
+    folder = data_folder("000660")
+    path = feature_path("000660", folder)
+    lines = _source_lines(folder, "000660")
+    _write_rows(path, lines, 100)
+    refresh_cache(path, parse_feature_csv)
+
+    lines[5] = lines[5].replace(b",", b",1", 1)  # 기존 행 수정 + 행 추가
+    _write_rows(path, lines, len(lines) - 1)
+    parsed = []
+
+    def recording(source, columns=None):
+        parsed.append(type(source).__name__)
+        return parse_feature_csv(source, columns)
+
+    meta = refresh_cache(path, recording)
+    assert parsed == ["str"]  # 전체 재생성
+    assert meta["history"] == []
+    pd.testing.assert_frame_equal(read_features_cached(path, parse_feature_csv), parse_feature_csv(path))
+
+
+def test_parse_tail_needs_row_boundary(data_folder):
+    folder = data_folder("000660")
+    path = feature_path("000660", folder)
+    lines = _source_lines(folder, "000660")
+    with open(path, "wb") as f:
+        f.write(b"".join(lines[:51]).rstrip(b"\r\n"))  # 마지막 행이 줄바꿈 없이 끝남
+    offset = os.path.getsize(path)
+    _write_rows(path, lines, 60)
+    assert _parse_tail(path, offset, parse_feature_csv) is None
+
+    offset = len(b"".join(lines[:51]))
+    tail = _parse_tail(path, offset, parse_feature_csv)
+    pd.testing.assert_frame_equal(tail, parse_feature_csv(path).iloc[50:].reset_index(drop=True))
@@ -0,0 +1,88 @@
+import datetime as dt
+import json
+import os
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+from feature_cache import CACHE_DIRNAME
+from feature_loader import ENGINE_COLUMNS, feature_path, find_column, parse_feature_csv
+from feature_panel import FeaturePanel, load_feature_panel, open_panel_memmap, write_panel_memmap
+
+CODES = ("000660", "373220")
+
+
+def test_panel_limited_to_codes_and_columns(data_folder):
+    folder = data_folder(*CODES, "005380")
+    panel = load_feature_panel(folder, ["373220"], ENGINE_COLUMNS)
+    assert panel.tickers == ["373220"]
+    assert panel.features == ["open", "high", "low", "close"]
+
+    df = parse_feature_csv(feature_path("373220", folder))
+    last = df.iloc[-1]
+    assert panel.value(last["date"], "373220", "close") == float(last["close"])
+    assert panel.value(last["date"], "000660", "close") is None
+
+
+def test_memmap_round_trip_groups_dtypes(tmp_path):
+    dates = np.array(["2024-01-02", "2024-01-03", "2024-01-04"], dtype="datetime64[D]")
+    values = {
+        "close": np.array([[100, np.nan], [101, 50], [102, 51]], dtype=np.float32),
+        "volume": np.array([[2 ** 25 + 1, np.nan], [1, 2], [3, 4]], dtype=np.float64),  # float32 로 표현 불가
+        "rsi": np.array([[np.nan, np.nan], [30.5, 70.25], [31, 69]], dtype=np.float32),
+    }
+    present = np.array([[True, False], [True, True], [True, True]])
+    panel = FeaturePanel(dates, ["A", "B"], ["close", "volume", "rsi"], values, present)
+
+    write_panel_memmap(panel, str(tmp_path), "tag")
+    opened = open_panel_memmap(str(tmp_path), "tag")
+    assert opened.features == panel.features
+    assert opened.tickers == panel.tickers
+    np.testing.assert_array_equal(opened.dates, dates)
+    np.testing.assert_array_equal(opened.present, present)
+    for feature, arr in values.items():
+        assert isinstance(opened.values[feature], np.memmap)
+        assert opened.values[feature].dtype == arr.dtype
+        np.testing.assert_array_equal(opened.values[feature], arr)
+
+    header_path = os.path.join(str(tmp_path), CACHE_DIRNAME, "panel", "panel_tag.json")
+    with open(header_path, encoding="utf-8") as f:
+        assert json.load(f)["groups"] == {"float32": ["close", "rsi"], "float64": ["volume"]}
+
+    assert not opened.has_bar(dt.date(2024, 1, 2), "B")
+    assert opened.value(dt.date(2024, 1, 2), "B", "close") is None
+    assert opened.has_bar(dt.date(2024, 1, 3), "B")
+    assert opened.value(dt.date(2024, 1, 3), "B", "rsi") == 70.25
+    assert not opened.has_bar(dt.date(2024, 1, 5), "A")  # 달력에 없는 날짜
+
+
+def test_panel_missing_bars_before_listing(data_folder):
+    folder = data_folder(*CODES)
+    panel = load_feature_panel(folder, CODES, ENGINE_COLUMNS)
+    listed = parse_feature_csv(feature_path("373220", folder), columns=["date"])["date"].iloc[0].date()
+    before = panel.dates[panel.dates < np.datetime64(listed)][-1]
+
+    assert panel.has_bar(before, "000660")
+    assert not panel.has_bar(before, "373220")
+    assert panel.value(before, "373220", "close") is None
+    assert np.isnan(panel.cross_section(before, "close")[panel.ticker_index("373220")])
+    assert panel.has_bar(listed, "373220")
+
+
+def test_panel_rebuilt_when_source_changes(data_folder):
+    folder = data_folder(*CODES)
+    path = feature_path("373220", folder)
+    panel = load_feature_panel(folder, CODES, ENGINE_COLUMNS)
+    last_date = panel.dates[-1]
+    old_close = panel.value(last_date, "373220", "close")
+
+    raw = pd.read_csv(path)
+    close_col = find_column(raw, ["close"])
+    raw.loc[len(raw) - 1, close_col] = old_close + 1000
+    raw.to_csv(path, index=False)
+
+    panel = load_feature_panel(folder, CODES, ENGINE_COLUMNS)
+    assert panel.value(last_date, "373220", "close") == old_close + 1000
+    headers = glob(os.path.join(folder, CACHE_DIRNAME, "panel", "panel_*.json"))
+    assert len(headers) == 1  # 이전 버전 패널 파일은 정리됨
@@ -0,0 +1,31 @@
+import os
+
+from feature_cache import CACHE_DIRNAME, META_SAMPLE_ROWS, read_feature_meta
+from feature_loader import feature_path, parse_feature_csv
+from feature_registry import build_feature_registry
+from feature_schema import frame_schema
+
+
+def test_cold_registry_reads_only_a_sample(data_folder):
+    folder = data_folder("000660", "005380")
+    parsed_rows = []
+
+    def counting_parse(path, columns=None):
+        df = parse_feature_csv(path, columns)
+        parsed_rows.append(len(df))
+        return df
+
+    meta = read_feature_meta(feature_path("000660", folder), counting_parse)
+    assert parsed_rows == [META_SAMPLE_ROWS + 1]  # 앞쪽 행 + 마지막 행
+    assert meta["rows"] is None
+
+    full = frame_schema(parse_feature_csv(feature_path("000660", folder)))
+    assert list(meta["schema"]) == list(full)
+    for col, entry in meta["schema"].items():
+        if entry["first_valid"] is not None:
+            assert entry["first_valid"] == full[col]["first_valid"]
+            assert entry["warmup"] == full[col]["warmup"]
+
+    registry = build_feature_registry(["000660", "005380"], folder)
+    assert registry.has("005380", "rsi")
+    assert not os.path.exists(os.path.join(folder, CACHE_DIRNAME))  # 캐시도 만들지 않음
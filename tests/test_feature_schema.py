@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from condition_compiler import compile_condition
+from feature_loader import load_features
+from feature_schema import FLAG_DTYPE, apply_feature_schema
+
+OVERFLOWING = [
+    "volume * 200 > 1e9",
+    "volume * 100 > volume_ma20 * 300",
+    "volume ** 2 > 1e14",
+]
+
+
+def test_integer_columns_stay_int64(data_folder):
+    df = load_features("000660", data_folder("000660"))
+    assert df["volume"].dtype == np.int64
+    assert df["close"].dtype == np.int64
+
+
+@pytest.mark.parametrize("cond", OVERFLOWING)
+def test_overflowing_expression_matches_csv_values(data_folder, cond):
+    folder = data_folder("000660")
+    raw = pd.read_csv(f"{folder}/000660_features.csv")  # 원본 int64/float64
+    expected = raw.eval(cond).to_numpy()
+
+    df = load_features("000660", folder)
+    assert np.array_equal(compile_condition(cond).evaluate(df), expected)
+    assert np.array_equal(df.eval(cond).to_numpy(), expected)
+
+
+def test_small_int_flags_are_widened_before_arithmetic():
+    df = apply_feature_schema(pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+        "cdl_doji": [100, 0],
+        "cdl_hammer": [100, 100],
+    }))
+    assert df["cdl_doji"].dtype == FLAG_DTYPE
+    mask = compile_condition("cdl_doji + cdl_hammer > 150").evaluate(df)
+    assert mask.tolist() == [True, False]
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from point_in_time import AsOfView, LookAheadError, PointInTime
+
+
+@pytest.fixture
+def df():
+    dates = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-05", "2024-01-08"])
+    return pd.DataFrame({"date": dates, "close": [10.0, 11.0, 12.0, 13.0]})
+
+
+def test_point_in_time_lookups(df):
+    pit = PointInTime(df)
+    assert pit.on("2024-01-03")["close"].tolist() == [11.0]
+    assert len(pit.on("2024-01-04")) == 0
+    assert pit.asof("2024-01-04")["close"].tolist() == [11.0]
+    assert pit.asof("2024-01-05")["close"].tolist() == [12.0]
+    assert pit.asof("2024-01-05", inclusive=False)["close"].tolist() == [11.0]
+    assert len(pit.asof("2024-01-01")) == 0
+    assert pit.next_after("2024-01-03")["close"].tolist() == [12.0]
+    assert pit.next_after("2024-01-03", inclusive=True)["close"].tolist() == [11.0]
+    assert len(pit.next_after("2024-01-08")) == 0
+    assert pit.window("2024-01-03", "2024-01-05")["close"].tolist() == [11.0, 12.0]
+    assert pit.window(end="2024-01-02")["close"].tolist() == [10.0]
+    assert pit.window("2024-01-06")["close"].tolist() == [13.0]
+
+
+def test_as_of_view_hides_the_future(df):
+    view = PointInTime(df).until("2024-01-05")
+    assert isinstance(view, AsOfView)
+    assert len(view) == 3
+    assert view.cutoff == pd.Timestamp("2024-01-05")
+    assert view.last()["close"].tolist() == [12.0]
+    assert view.asof("2024-01-04")["close"].tolist() == [11.0]
+    assert len(view.query("close > 11.5")) == 1  # 기준 시점 이후 행(13.0)은 보이지 않음
+
+    with pytest.raises(LookAheadError):
+        view.on("2024-01-08")
+    with pytest.raises(LookAheadError):
+        view.asof("2024-01-06")
+    with pytest.raises(LookAheadError):
+        view.window("2024-01-02", "2024-01-08")
+    with pytest.raises(TypeError):
+        view["close"] = 0
+
+    exclusive = PointInTime(df).until("2024-01-05", inclusive=False)
+    assert exclusive.cutoff == pd.Timestamp("2024-01-03")
+
+
+def test_with_columns_returns_new_view(df):
+    view = PointInTime(df).until("2024-01-03")
+    extended = view.with_columns(double=view["close"] * 2)
+    assert "double" in extended and "double" not in view
+    assert extended["double"].tolist() == [20.0, 22.0]
+    assert "double" not in df.columns
+    with pytest.raises(LookAheadError):
+        extended.on("2024-01-05")
@@ -0,0 +1,58 @@
+import datetime as dt
+
+import trading_calendar
+from feature_loader import feature_path, parse_feature_csv
+from trading_calendar import TradingCalendar, load_trading_calendar
+
+CODES = ("000660", "373220", "005380")
+
+
+def test_fallback_reads_only_given_codes(data_folder, monkeypatch):
+    folder = data_folder(*CODES)  # KODEX 200 파일 없음
+    loaded = []
+    load_features = trading_calendar.load_features
+
+    def _recording(code, *args, **kwargs):
+        loaded.append(code)
+        return load_features(code, *args, **kwargs)
+
+    monkeypatch.setattr(trading_calendar, "load_features", _recording)
+    monkeypatch.setattr("feature_loader.load_manifest", _forbidden)  # 캐시 키 때문에 전체 스캔을 하지 않아야 함
+
+    calendar = load_trading_calendar(folder, ["373220"])
+    assert loaded == ["373220"]
+    assert calendar.source != "KODEX 200"
+    expected = parse_feature_csv(feature_path("373220", folder), columns=["date"])["date"].dt.date
+    assert calendar.dates == sorted(set(expected))
+
+    assert len(load_trading_calendar(folder, []).dates) == 0
+    assert loaded == ["373220"]
+
+
+def _forbidden(*args, **kwargs):
+    raise AssertionError("manifest scan")
+
+
+def test_calendar_offsets():
+    dates = [dt.date(2024, 1, d) for d in (2, 3, 5, 8, 9)]  # 1/4, 1/6~7 휴장
+    calendar = TradingCalendar(dates + [dt.date(2024, 1, 3)])
+    assert calendar.dates == dates
+
+    assert calendar.offset(dt.date(2024, 1, 3), 1) == dt.date(2024, 1, 5)
+    assert calendar.offset(dt.date(2024, 1, 3), 2) == dt.date(2024, 1, 8)
+    assert calendar.offset(dt.date(2024, 1, 5), -2) == dt.date(2024, 1, 2)
+    assert calendar.offset(dt.date(2024, 1, 5), 0) == dt.date(2024, 1, 5)
+    # 휴장일 기준: 다음 거래일이 +1, 이전 거래일이 -1
+    assert calendar.offset(dt.date(2024, 1, 4), 1) == dt.date(2024, 1, 5)
+    assert calendar.offset(dt.date(2024, 1, 6), -1) == dt.date(2024, 1, 5)
+    assert calendar.offset(dt.date(2024, 1, 9), 1) is None
+    assert calendar.offset(dt.date(2024, 1, 2), -1) is None
+
+    assert calendar.next(dt.date(2024, 1, 5)) == dt.date(2024, 1, 8)
+    assert calendar.next(dt.date(2024, 1, 5), inclusive=True) == dt.date(2024, 1, 5)
+    assert calendar.prev(dt.date(2024, 1, 7)) == dt.date(2024, 1, 5)
+    assert calendar.prev(dt.date(2024, 1, 2)) is None
+    assert calendar.index(dt.date(2024, 1, 4)) == -1
+    assert calendar.range(dt.date(2024, 1, 3), dt.date(2024, 1, 8), include_end=False) == dates[1:3]
+    assert calendar.week_firsts() == [dt.date(2024, 1, 2), dt.date(2024, 1, 8)]
+    assert calendar.month_firsts() == [dt.date(2024, 1, 2)]
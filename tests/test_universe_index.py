@@ -0,0 +1,28 @@
+import datetime as dt
+import os
+
+from feature_cache import CACHE_DIRNAME
+from feature_loader import feature_path, parse_feature_csv
+from universe_index import load_universe_index
+
+CODES = ("000660", "373220")
+
+
+def test_cold_start_reads_no_full_file(data_folder, monkeypatch):
+    folder = data_folder(*CODES)
+    monkeypatch.setattr("data_manifest.ManifestStore.entry", _forbidden)  # 매니페스트/캐시를 만들지 않아야 함
+
+    index = load_universe_index(folder, CODES)
+    for code in CODES:
+        df = parse_feature_csv(feature_path(code, folder), columns=["date"])
+        assert index.first_dates[code] == df["date"].iloc[0].date()
+        assert index.last_dates[code] == df["date"].iloc[-1].date()
+        assert index.rows[code] is None  # 행 수는 캐시가 만들어진 뒤에야 안다
+
+    assert not index.listed("373220", dt.date(2020, 1, 2))
+    assert index.listed_codes(list(CODES), dt.date(2020, 1, 2)) == ["000660"]
+    assert not os.path.exists(os.path.join(folder, CACHE_DIRNAME))
+
+
+def _forbidden(self, path):
+    raise AssertionError(f"manifest scan: {path}")
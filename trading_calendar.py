@@ -0,0 +1,193 @@
+import datetime as dt
+import os
+from bisect import bisect_left, bisect_right
+
+import streamlit as st
+
+from feature_loader import DATA_FOLDER, KODEX_CODE, feature_path, list_feature_codes, load_features
+from feature_panel import to_date
+from feature_registry import file_stamps
+
+
+class TradingCalendar:
+    """
+    정렬된 거래일 목록과 O(log n) 날짜 조회
+
+    거래일 목록을 매번 처음부터 훑던 "다음 거래일 찾기"와 기간 필터링 리스트 컴프리헨션을
+    이진 탐색(bisect)으로 대신한다. 주/월 키는 만들 때 한 번 계산해 둔다.
+
+    Attributes:
+        dates: 거래일 목록 (datetime.date, 오름차순, 중복 없음)
+        week_keys: 거래일별 주 키 (해당 주 월요일 날짜)
+        month_keys: 거래일별 월 키 ((연도, 월))
+        source: 달력을 만든 데이터 ("KODEX 200" 또는 "종목 합집합")
+    """
+
+    def __init__(self, dates, source="KODEX 200"):
+        self.dates = sorted({to_date(d) for d in dates})
+        self.week_keys = [d - dt.timedelta(days=d.weekday()) for d in self.dates]
+        self.month_keys = [(d.year, d.month) for d in self.dates]
+        self.source = source
+        self._groups = {}  # {(start, end): {연도: {월: [일, ...]}}}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __iter__(self):
+        return iter(self.dates)
+
+    def __contains__(self, d):
+        i = bisect_left(self.dates, to_date(d))
+        return i < len(self.dates) and self.dates[i] == to_date(d)
+
+    @property
+    def first(self):
+        return self.dates[0] if self.dates else None
+
+    @property
+    def last(self):
+        return self.dates[-1] if self.dates else None
+
+    def index(self, d):
+        """거래일의 위치 (거래일이 아니면 -1)"""
+        i = bisect_left(self.dates, to_date(d))
+        return i if i < len(self.dates) and self.dates[i] == to_date(d) else -1
+
+    def next(self, d, inclusive=False):
+        """
+        d 이후의 첫 거래일
+
+        Args:
+            d: 기준 날짜 (거래일이 아니어도 됨)
+            inclusive: True 면 d 가 거래일일 때 d 자신을 반환
+
+        Returns:
+            date (없으면 None)
+        """
+        d = to_date(d)
+        i = bisect_left(self.dates, d) if inclusive else bisect_right(self.dates, d)
+        return self.dates[i] if i < len(self.dates) else None
+
+    def prev(self, d, inclusive=False):
+        """
+        d 이전의 마지막 거래일
+
+        Args:
+            d: 기준 날짜 (거래일이 아니어도 됨)
+            inclusive: True 면 d 가 거래일일 때 d 자신을 반환
+
+        Returns:
+            date (없으면 None)
+        """
+        d = to_date(d)
+        i = bisect_right(self.dates, d) if inclusive else bisect_left(self.dates, d)
+        return self.dates[i - 1] if i > 0 else None
+
+    def offset(self, d, n):
+        """
+        d 로부터 n 거래일 뒤(음수면 앞)의 거래일
+
+        d 가 거래일이 아니면 n > 0 일 때는 d 이후 첫 거래일을 1, n < 0 일 때는 d 이전
+        마지막 거래일을 -1 로 센다. 범위를 벗어나면 None.
+        """
+        d = to_date(d)
+        if n >= 0:
+            i = bisect_left(self.dates, d)
+            if n > 0 and (i >= len(self.dates) or self.dates[i] != d):
+                i -= 1
+        else:
+            i = bisect_right(self.dates, d) - 1
+            if i >= 0 and self.dates[i] != d:
+                i += 1
+        i += n
+        return self.dates[i] if 0 <= i < len(self.dates) else None
+
+    def bounds(self, start=None, end=None, include_end=True):
+        """range(start, end) 에 해당하는 dates 의 위치 (lo, hi)"""
+        lo = 0 if start is None else bisect_left(self.dates, to_date(start))
+        if end is None:
+            hi = len(self.dates)
+        else:
+            hi = (bisect_right if include_end else bisect_left)(self.dates, to_date(end))
+        return lo, max(lo, hi)
+
+    def range(self, start=None, end=None, include_end=True):
+        """
+        start <= 날짜 <= end 인 거래일 목록 (include_end=False 면 날짜 < end)
+
+        None 이면 해당 방향 끝까지.
+        """
+        lo, hi = self.bounds(start, end, include_end)
+        return self.dates[lo:hi]
+
+    def groups(self, start=None, end=None):
+        """
+        기간 안의 거래일을 연도 → 월 → 일 로 묶은 딕셔너리 (연/월/일 선택 위젯용, 한 번만 계산)
+
+        Returns:
+            groups: {연도: {월: [일, ...]}} (모두 오름차순)
+        """
+        key = (start, end)
+        if key not in self._groups:
+            groups = {}
+            for d in self.range(start, end):
+                groups.setdefault(d.year, {}).setdefault(d.month, []).append(d.day)
+            self._groups[key] = groups
+        return self._groups[key]
+
+    def week_firsts(self, start=None, end=None):
+        """기간 안의 주별 첫 거래일 목록"""
+        lo, hi = self.bounds(start, end, True)
+        return [self.dates[i] for i in range(lo, hi) if i == lo or self.week_keys[i] != self.week_keys[i - 1]]
+
+    def month_firsts(self, start=None, end=None):
+        """기간 안의 월별 첫 거래일 목록"""
+        lo, hi = self.bounds(start, end, True)
+        return [self.dates[i] for i in range(lo, hi) if i == lo or self.month_keys[i] != self.month_keys[i - 1]]
+
+
+def build_trading_calendar(data_folder=DATA_FOLDER, codes=None):
+    """
+    KODEX 200 의 날짜로 거래일 달력을 만드는 함수
+    (KODEX 200 파일이 없으면 모든 종목 날짜의 합집합을 사용)
+
+    Args:
+        data_folder: feature 파일이 있는 폴더
+        codes: KODEX 200 이 없을 때 합집합을 만들 종목 목록 (None 이면 폴더의 모든 종목)
+
+    Returns:
+        calendar: TradingCalendar
+    """
+    if os.path.exists(feature_path(KODEX_CODE, data_folder)):
+        df = load_features(KODEX_CODE, data_folder, columns=["date"])
+        return TradingCalendar(df["date"].dt.date, source="KODEX 200")
+
+    dates = set()
+    for code in list_feature_codes(data_folder) if codes is None else codes:
+        dates.update(load_features(code, data_folder, columns=["date"])["date"].dt.date)
+    return TradingCalendar(dates, source="종목 합집합")
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_calendar(data_folder, codes, stamps):
+    return build_trading_calendar(data_folder, None if codes is None else list(codes))
+
+
+def load_trading_calendar(data_folder=DATA_FOLDER, codes=None):
+    """
+    거래일 달력을 캐시에서 가져오는 함수 (KODEX 200 또는 종목 파일이 바뀌면 다시 만든다)
+
+    캐시 키는 파일 크기/수정시각이라 매니페스트를 만들지 않는다. KODEX 200 이 없으면 codes 의 파일만
+    읽으므로, 앱에서는 선택한 종목만 넘겨서 시작할 때 모든 종목 파일을 읽지 않게 한다.
+
+    Args:
+        data_folder: feature 파일이 있는 폴더
+        codes: KODEX 200 이 없을 때 합집합을 만들 종목 목록 (None 이면 폴더의 모든 종목, 빈 목록이면 빈 달력)
+
+    Returns:
+        calendar: TradingCalendar
+    """
+    if os.path.exists(feature_path(KODEX_CODE, data_folder)):
+        return _cached_calendar(data_folder, None, file_stamps([KODEX_CODE], data_folder))
+    codes = tuple(codes) if codes is not None else tuple(list_feature_codes(data_folder))
+    return _cached_calendar(data_folder, codes, file_stamps(codes, data_folder))
@@ -0,0 +1,91 @@
+import pandas as pd
+import streamlit as st
+
+from feature_loader import DATA_FOLDER, list_feature_codes
+from feature_registry import file_stamps, load_feature_registry
+
+
+def _to_date(value):
+    return pd.Timestamp(value).date() if value else None
+
+
+class UniverseIndex:
+    """
+    종목별 메타데이터 색인 (첫/마지막 날짜, 행 수, 지표별 warm-up 길이)
+
+    캐시 메타데이터(feature_registry)로만 만들어진다. 캐시가 없는 파일도 헤더와 앞쪽 일부 행,
+    마지막 행만 읽으므로(feature_cache.read_feature_meta) 앱 시작 시 CSV 전체를 파싱하지 않는다.
+    엔진은 listed 로 아직 데이터가 시작되지 않은 종목을 파일을 열지 않고 건너뛴다.
+
+    Attributes:
+        codes: 종목 코드 목록
+        first_dates: {종목: 첫 날짜 (datetime.date)}
+        last_dates: {종목: 마지막 날짜 (datetime.date)}
+        rows: {종목: 행 수 (캐시가 아직 없으면 None)}
+        registry: FeatureRegistry (컬럼별 dtype/첫 유효 날짜/warm-up 길이)
+    """
+
+    def __init__(self, registry):
+        self.codes = registry.codes
+        self.first_dates = {code: registry.first_valid(code, "date") for code in self.codes}
+        self.last_dates = {code: _to_date(registry.last_dates.get(code)) for code in self.codes}
+        self.rows = {code: registry.rows.get(code) for code in self.codes}
+        self.registry = registry
+
+    def listed(self, code, d):
+        """d 시점에 종목 데이터가 시작되었는지 여부 (모르는 종목이면 True)"""
+        first = self.first_dates.get(code)
+        return first is None or first <= d
+
+    def listed_codes(self, codes, d):
+        """d 시점에 데이터가 있는 종목만 (순서 유지)"""
+        return [code for code in codes if self.listed(code, d)]
+
+    def warmup(self, code, col):
+        """지표 컬럼의 warm-up 길이 (첫 유효값 앞의 결측 행 수)"""
+        return self.registry.warmup(code, col)
+
+    def summary(self, codes=None, names=None):
+        """
+        종목별 요약 표
+
+        Args:
+            codes: 종목 코드 목록 (None 이면 전체)
+            names: {종목: 이름}
+
+        Returns:
+            df: 종목, 이름, 첫 날짜, 마지막 날짜, 행 수, 최대 warm-up(행)
+        """
+        names = names or {}
+        rows = []
+        for code in self.codes if codes is None else codes:
+            warmups = [self.warmup(code, col) or 0 for col in self.registry.columns(code)]
+            rows.append({
+                "종목": code,
+                "이름": names.get(code, code),
+                "첫 날짜": self.first_dates.get(code),
+                "마지막 날짜": self.last_dates.get(code),
+                "행 수": self.rows.get(code),
+                "최대 warm-up(행)": max(warmups) if warmups else None,
+            })
+        return pd.DataFrame(rows)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_index(codes, data_folder, stamps):
+    return UniverseIndex(load_feature_registry(data_folder, codes))
+
+
+def load_universe_index(data_folder=DATA_FOLDER, codes=None):
+    """
+    데이터 폴더 전체(또는 지정 종목)의 UniverseIndex 를 캐시에서 가져오는 함수
+
+    Args:
+        data_folder: feature 파일이 있는 폴더
+        codes: 종목 코드 목록 (None 이면 폴더의 모든 종목)
+
+    Returns:
+        index: 파일이 바뀌면(크기/수정시각) 다시 만들어지는 UniverseIndex
+    """
+    codes = tuple(codes) if codes is not None else tuple(list_feature_codes(data_folder))
+    return _cached_index(codes, data_folder, file_stamps(codes, data_folder))